@@ -1,10 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from PIL import Image
-import pickle
-import re
-from model import MedicineRecommender
+import os
+from live import LiveSession
+from model import load_recommender
+from result_cache import make_cache_key
 
 # Set page configuration
 st.set_page_config(
@@ -147,10 +145,74 @@ st.markdown("""
 # Initialize the recommender model
 @st.cache_resource
 def load_model():
-    return MedicineRecommender()
+    # Use the prefitted artifact and on-disk knowledge base when configured. The result
+    # cache is shared by every session, so a popular query is only scored once per process
+    return load_recommender(
+        artifact_path=os.environ.get('MEDICINE_MODEL_ARTIFACT'),
+        knowledge_base_path=os.environ.get('MEDICINE_KNOWLEDGE_BASE'),
+        cache_size=int(os.environ.get('MEDICINE_RESULT_CACHE_SIZE', 4096))
+    )
 
 recommender = load_model()
 
+common_symptoms = [
+    "Headache", "Fever", "Cold", "Cough", 
+    "Sore throat", "Stomach pain", "Nausea",
+    "Joint pain", "Muscle pain", "Allergies"
+]
+
+
+def submit_symptom(symptom):
+    # Runs before the rerun, so the chip pre-fills the text box and submits in one go
+    st.session_state.symptoms_text = symptom
+    st.session_state.submit_requested = True
+
+
+def render_result(result):
+    """
+    Build the HTML for a result once; reruns of the session reuse it
+
+    Returns:
+        list: ('markdown' or 'info', content) steps for show_result()
+    """
+    if result.is_critical:
+        return [('markdown', f"""
+        <div class="critical-warning">
+            <p class="critical-text">⚠️ Medical Attention Recommended</p>
+            <p>{result.recommendation}</p>
+        </div>
+        """)]
+
+    steps = [('markdown', f'<div class="result-card" style="text-align: center;"><p><strong>Analysis:</strong> {result.recommendation}</p></div>')]
+    if 'long_duration' in result.flags:
+        steps.append(('info', "Symptoms lasting more than a week should be checked by a doctor."))
+    if 'contraindications_removed' in result.flags:
+        steps.append(('info', "Some medicines were left out because of your pre-existing conditions or current medications."))
+
+    if result.medicine_ids:
+        # All medicine cards go out as one element instead of one element per medicine
+        cards = ["<h3>Recommended Medicines</h3>"]
+        for medicine in result.medicines:
+            priority = "PRIORITY: " if result.is_priority(medicine) else ""
+            cards.append(f"""
+            <div class="medicine-card">
+                <p class="medicine-name">{medicine.name}</p>
+                <p class="medicine-dosage">Dosage: {medicine.dosage}</p>
+                <p class="medicine-desc">{priority}{medicine.description}</p>
+                <a href="{medicine.url}" target="_blank" style="color: #1565c0; text-decoration: underline;">More Information</a>
+            </div>
+            """)
+        steps.append(('markdown', ''.join(cards)))
+    return steps
+
+
+def show_result(steps):
+    for kind, content in steps:
+        if kind == 'info':
+            st.info(content)
+        else:
+            st.markdown(content, unsafe_allow_html=True)
+
 # Centered Header
 st.markdown('<div style="display: flex; justify-content: center; align-items: center; flex-direction: column;">', unsafe_allow_html=True)
 st.markdown('<h1 class="main-header">AI Medicine Recommendation System</h1>', unsafe_allow_html=True)
@@ -187,12 +249,22 @@ with col1:
     """, unsafe_allow_html=True)
     symptoms_text = st.text_area(
         "Please describe what you're experiencing in detail:",
+        key="symptoms_text",
         height=150,
         placeholder="Example: I have a headache and slight fever since yesterday. The pain is concentrated on the front of my head.",
         label_visibility="visible"
     )
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # Live suggestions; the session only rescores the words that changed since the last run
+    if 'live_session' not in st.session_state:
+        st.session_state.live_session = LiveSession(recommender)
+    suggestions = st.session_state.live_session.set_text(symptoms_text)
+    if suggestions.is_critical:
+        st.warning(f"\"{suggestions.critical_keyword}\" may need urgent medical attention. Submit to see our advice.")
+    elif suggestions.matches:
+        st.caption("Possible matches: " + ", ".join(match.condition for match in suggestions.matches))
+    
     # Additional questions to improve recommendation
     with st.expander("Additional Information (Optional)", expanded=False):
         duration = st.selectbox(
@@ -215,48 +287,31 @@ with col1:
             placeholder="List any current medications"
         )
 
-    # Submit button
-    if st.button("Get Recommendations", type="primary"):
+    additional_info = {
+        'duration': duration,
+        'severity': severity,
+        'conditions': previous_conditions,
+        'medications': medications
+    }
+    request_key = make_cache_key(symptoms_text, additional_info)
+
+    # Submit button, or a common symptom chip clicked in the previous run
+    submitted = st.button("Get Recommendations", type="primary")
+    submitted = st.session_state.pop('submit_requested', False) or submitted
+    if submitted:
         if not symptoms_text:
             st.error("Please describe your symptoms before submitting.")
-        else:
+        elif st.session_state.get('result_key') != request_key:
             with st.spinner("Analyzing your symptoms..."):
                 # Process the input and get recommendations
-                result = recommender.recommend(
-                    symptoms_text, 
-                    {
-                        'duration': duration,
-                        'severity': severity,
-                        'conditions': previous_conditions,
-                        'medications': medications
-                    }
-                )
-                
-                # Display results
-                if result['is_critical']:
-                    st.markdown(f"""
-                    <div class="critical-warning">
-                        <p class="critical-text">⚠️ Medical Attention Recommended</p>
-                        <p>{result['recommendation']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown('<div class="result-card" style="text-align: center;">', unsafe_allow_html=True)
-                    st.markdown(f"<p><strong>Analysis:</strong> {result['recommendation']}</p>", unsafe_allow_html=True)
-                    
-                    if result['medicines']:
-                        st.markdown("<h3>Recommended Medicines</h3>", unsafe_allow_html=True)
-                        for medicine in result['medicines']:
-                            st.markdown(f"""
-                            <div class="medicine-card">
-                                <p class="medicine-name">{medicine['name']}</p>
-                                <p class="medicine-dosage">Dosage: {medicine['dosage']}</p>
-                                <p class="medicine-desc">{medicine['description']}</p>
-                                <a href="{medicine['url']}" target="_blank" style="color: #1565c0; text-decoration: underline;">More Information</a>
-                            </div>
-                            """, unsafe_allow_html=True)
-                    
-                    st.markdown('</div>', unsafe_allow_html=True)
+                result = recommender.recommend(symptoms_text, additional_info)
+                st.session_state.result_key = request_key
+                st.session_state.result_steps = render_result(result)
+    
+    # Display results; they stay on screen across reruns for as long as the inputs match,
+    # without scoring or building the HTML again
+    if st.session_state.get('result_key') == request_key and 'result_steps' in st.session_state:
+        show_result(st.session_state.result_steps)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -293,19 +348,13 @@ st.markdown("""
 # Common symptoms section
 st.markdown("---")  # Add another horizontal line for separation
 st.markdown('<div style="text-align: center;"><h2>Common Symptoms</h2></div>', unsafe_allow_html=True)
-common_symptoms = [
-    "Headache", "Fever", "Cold", "Cough", 
-    "Sore throat", "Stomach pain", "Nausea",
-    "Joint pain", "Muscle pain", "Allergies"
-]
-
-# Display as clickable chips
-symptom_html = '<div style="text-align: center;">'
-for symptom in common_symptoms:
-    symptom_html += f'<span style="display: inline-block; background-color: #1565c0; color: white; padding: 8px 16px; margin: 6px; border-radius: 20px; font-size: 0.95rem; cursor: pointer; transition: all 0.2s ease;" onmouseover="this.style.backgroundColor=\'#64b5f6\'" onmouseout="this.style.backgroundColor=\'#1565c0\'">{symptom}</span>'
-symptom_html += '</div>'
 
-st.markdown(symptom_html, unsafe_allow_html=True)
+# Clicking a chip fills in the symptom and submits it
+chip_columns = st.columns(5)
+for i, symptom in enumerate(common_symptoms):
+    chip_columns[i % len(chip_columns)].button(
+        symptom, key=f"chip_{symptom}", on_click=submit_symptom, args=(symptom,), use_container_width=True
+    )
 
 # Footer
 st.markdown("""
@@ -0,0 +1,180 @@
+"""
+Async front-end for MedicineRecommender with micro-batching.
+
+Concurrent recommend() calls arriving within a few milliseconds of each other
+are gathered into one batch, scored with a single vectorised transform and
+similarity product (MedicineRecommender.recommend_many) in a worker thread,
+and fanned back out to the awaiting callers. Identical in-flight queries are
+coalesced and computed once, see batching.py.
+
+    async with AsyncRecommender(recommender) as service:
+        result = await service.recommend("headache and fever")
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import InFlightQueries
+
+
+class AsyncRecommender:
+    def __init__(self, recommender, max_batch_size=64, max_wait=0.002, max_queue_size=1024,
+                 max_concurrent_batches=1, reject_when_full=False):
+        """
+        Args:
+            recommender (MedicineRecommender): Shared recommender doing the scoring
+            max_batch_size (int): Maximum number of queries scored together
+            max_wait (float): Seconds to wait for more queries after the first one of a batch arrives
+            max_queue_size (int): Maximum number of queued queries before callers are held back
+            max_concurrent_batches (int): Number of batches that may be scored at the same time
+            reject_when_full (bool): Raise asyncio.QueueFull instead of waiting when the queue is full
+        """
+        if max_batch_size < 1 or max_queue_size < 1 or max_concurrent_batches < 1:
+            raise ValueError("max_batch_size, max_queue_size and max_concurrent_batches must be positive")
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self.reject_when_full = reject_when_full
+
+        self._queue = None
+        self._in_flight = InFlightQueries(recommender, max_batch_size, "AsyncRecommender was closed")
+        self._batcher = None
+        self._batch_slots = None
+        self._batch_tasks = set()
+        self._executor = None
+
+        # Queries refused because the queue was full
+        self.rejected = 0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        """
+        Start the background batching task on the running event loop
+        """
+        if self._batcher is not None:
+            return
+        self._queue = asyncio.Queue(self.max_queue_size)
+        self._batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._executor = ThreadPoolExecutor(self.max_concurrent_batches, thread_name_prefix='recommend-batch')
+        self._batcher = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def close(self):
+        """
+        Stop batching after the batches already being scored have finished
+        """
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+        # Fail anything still queued rather than leaving callers waiting forever
+        while not self._queue.empty():
+            self._in_flight.fail([self._queue.get_nowait()])
+
+        # Nothing will resolve the remaining futures, and a later start() must not coalesce onto them
+        self._in_flight.fail_all()
+
+        self._executor.shutdown(wait=True)
+        self._batcher = None
+
+    async def recommend(self, symptoms_text, additional_info=None):
+        """
+        Analyze symptoms, sharing the work with concurrent and identical requests
+
+        Args:
+            symptoms_text (str): User's description of symptoms
+            additional_info (dict): Additional information like duration, severity, etc.
+
+        Returns:
+            Recommendation: Same result as MedicineRecommender.recommend()
+        """
+        self.start()
+
+        # Coalesce identical queries that are already queued or being scored
+        future, item = self._in_flight.add(symptoms_text, additional_info, asyncio.get_running_loop().create_future)
+        if item is None:
+            return await asyncio.shield(future)
+
+        try:
+            if self.reject_when_full:
+                self._queue.put_nowait(item)
+            else:
+                # Waits while the queue is full, pushing back on callers
+                await self._queue.put(item)
+        except BaseException as e:
+            self._in_flight.discard(item)
+            if isinstance(e, asyncio.QueueFull):
+                self.rejected += 1
+            if not future.done():
+                future.cancel()
+            raise
+
+        # Shielded so one cancelled caller does not cancel the result for coalesced callers
+        return await asyncio.shield(future)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            try:
+                # Collect more queries until the batch is full or the wait budget is spent
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._batch_slots.acquire()
+            except asyncio.CancelledError:
+                # close() cancelled the loop while it held a batch that is no longer in the queue
+                self._in_flight.fail(batch)
+                raise
+            task = loop.create_task(self._score_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _score_batch(self, batch):
+        try:
+            try:
+                # Scoring runs in a worker thread so the event loop stays responsive
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._in_flight.score, batch
+                )
+            except Exception as e:
+                self._in_flight.fail(batch, e)
+                return
+            # Futures of the event loop are resolved on the loop, not in the worker thread
+            self._in_flight.resolve(batch, results)
+        finally:
+            self._batch_slots.release()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Queue depth and batching/coalescing counters
+        """
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            **self._in_flight.stats(),
+            'rejected': self.rejected
+        }
@@ -0,0 +1,119 @@
+"""
+Query coalescing and batch fan-out shared by the async and threaded front-ends.
+
+AsyncRecommender and ThreadedRecommender both queue (symptoms_text,
+additional_info, key, future) items, gather them into batches and score each
+batch with MedicineRecommender.recommend_many(). InFlightQueries holds the
+future of every query that is queued or being scored, so identical queries
+share one future, and resolves or fails the futures of a batch. It works with
+asyncio and concurrent.futures futures alike; asyncio futures must only be
+resolved from their event loop.
+"""
+import threading
+
+from result_cache import make_cache_key
+
+
+class InFlightQueries:
+    def __init__(self, recommender, max_batch_size, closed_message):
+        """
+        Args:
+            recommender (MedicineRecommender): Shared recommender doing the scoring
+            max_batch_size (int): Maximum number of queries scored together
+            closed_message (str): Error message for queries failed because the front-end closed
+        """
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self.closed_message = closed_message
+        self._futures = {}
+        self._lock = threading.Lock()
+
+        # Counters for monitoring how well batching and coalescing work
+        self.batches = 0
+        self.batched_queries = 0
+        self.coalesced = 0
+
+    def add(self, symptoms_text, additional_info, new_future):
+        """
+        Join an identical query in flight, or register a new one
+
+        Args:
+            new_future (callable): Makes the future of a new query
+
+        Returns:
+            tuple: (future for the caller, queue item to enqueue or None when the query was coalesced)
+        """
+        key = make_cache_key(symptoms_text, additional_info)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, None
+            future = self._futures[key] = new_future()
+        return future, (symptoms_text, additional_info, key, future)
+
+    def discard(self, item):
+        """
+        Forget a query that never made it into the queue
+        """
+        with self._lock:
+            self._forget(item)
+
+    def _forget(self, item):
+        # A newer query may have taken the key over after this one was failed
+        if self._futures.get(item[2]) is item[3]:
+            del self._futures[item[2]]
+
+    def score(self, batch):
+        """
+        Returns:
+            list: Recommendations for the batch, in order
+        """
+        return self.recommender.recommend_many(
+            [item[0] for item in batch], [item[1] for item in batch], self.max_batch_size
+        )
+
+    def resolve(self, batch, results):
+        with self._lock:
+            self.batches += 1
+            self.batched_queries += len(batch)
+            for item in batch:
+                self._forget(item)
+        for item, result in zip(batch, results):
+            if not item[3].done():
+                item[3].set_result(result)
+
+    def fail(self, batch, error=None):
+        """
+        Fail a batch with error, by default the front-end being closed
+        """
+        with self._lock:
+            for item in batch:
+                self._forget(item)
+        for item in batch:
+            if not item[3].done():
+                item[3].set_exception(error or RuntimeError(self.closed_message))
+
+    def fail_all(self):
+        """
+        Fail every query still in flight, e.g. ones a stopped batcher will never score
+        """
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError(self.closed_message))
+
+    def stats(self):
+        """
+        Returns:
+            dict: In-flight and batching/coalescing counters
+        """
+        with self._lock:
+            return {
+                'in_flight': len(self._futures),
+                'batches': self.batches,
+                'batched_queries': self.batched_queries,
+                'coalesced': self.coalesced
+            }
@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the medicine recommender, run with `python -m benchmarks.run`.
+"""
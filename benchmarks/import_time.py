@@ -0,0 +1,121 @@
+"""
+Check the import-time and memory budget of the serving path.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 600 --artifact model.pkl
+
+Every module is imported in a fresh interpreter under `python -X importtime`
+and its cumulative import time is compared against a budget. The check also
+fails if importing the recommender core, or loading a saved artifact, pulls
+in a module that only fitting or offline tools need (scikit-learn, pandas,
+PIL). Exits non-zero when a budget is exceeded. tests/test_import_time.py
+runs the same checks with the default budgets.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modules the serving path must never import
+FORBIDDEN = ('sklearn', 'pandas', 'PIL', 'matplotlib')
+
+# Cumulative import time budget per module, in milliseconds
+DEFAULT_BUDGETS_MS = {
+    'model': 800,
+    'service': 900,
+    'bulk_score': 900
+}
+
+_PROBE = """
+import json, resource, sys
+{statement}
+print(json.dumps({{
+    'modules': sorted(m.split('.')[0] for m in sys.modules),
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+}}))
+"""
+
+
+def _run_probe(statement, cwd):
+    """
+    Run a statement in a fresh interpreter
+
+    Returns:
+        tuple: (cumulative import microseconds per top-level module, probe output dict)
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(statement=statement)],
+        capture_output=True, text=True, cwd=cwd, check=True
+    )
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            # Only top-level imports count, nested ones are included in their parent
+            cumulative[name.strip()] = cumulative.get(name.strip(), 0) + int(cumulative_us)
+    return cumulative, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_module(module, budget_ms, cwd):
+    cumulative, probe = _run_probe(f'import {module}', cwd)
+    forbidden = sorted(set(probe['modules']) & set(FORBIDDEN))
+    import_ms = cumulative.get(module, 0) / 1000
+    return {
+        'check': f'import {module}',
+        'import_ms': import_ms,
+        'budget_ms': budget_ms,
+        'max_rss_mb': probe['max_rss_kb'] / 1024,
+        'forbidden_modules': forbidden,
+        'ok': import_ms <= budget_ms and not forbidden
+    }
+
+
+def check_artifact_load(artifact, cwd):
+    """
+    Loading a prefitted artifact, as every worker does, must not import fit-time dependencies
+    """
+    statement = f'from model import MedicineRecommender; MedicineRecommender.load({artifact!r})'
+    _, probe = _run_probe(statement, cwd)
+    forbidden = sorted(set(probe['modules']) & set(FORBIDDEN))
+    return {
+        'check': 'load artifact',
+        'max_rss_mb': probe['max_rss_kb'] / 1024,
+        'forbidden_modules': forbidden,
+        'ok': not forbidden
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import time and serving-path dependencies")
+    parser.add_argument('--budget-ms', type=float, help="Override the import budget of every module")
+    parser.add_argument('--artifact', help="Artifact to load, a fresh one is fitted when omitted")
+    args = parser.parse_args(argv)
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = [
+        check_module(module, args.budget_ms or budget_ms, cwd)
+        for module, budget_ms in DEFAULT_BUDGETS_MS.items()
+    ]
+
+    artifact = args.artifact
+    with tempfile.TemporaryDirectory() as tmp:
+        if artifact is None:
+            artifact = os.path.join(tmp, 'model.pkl')
+            subprocess.run([sys.executable, 'knowledge_base.py', 'fit', artifact], cwd=cwd, check=True,
+                           capture_output=True)
+        report.append(check_artifact_load(os.path.abspath(artifact), cwd))
+
+    print(json.dumps(report, indent=2))
+    failed = [r['check'] for r in report if not r['ok']]
+    if failed:
+        print(f"Import budget exceeded: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Check LiveSession against recommend() while text is typed and edited.
+
+    python -m benchmarks.live_typing --conditions 1000 --queries 200
+
+Every query is typed one character at a time, then edited in the middle and
+partly deleted again. After each keystroke the session's suggestions must
+name the same critical condition as recommend(), or the same matching
+conditions with scores equal up to rounding. Reports the mean latency of a
+keystroke against scoring the whole text from scratch. Exits non-zero on any
+mismatch.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.synthetic import make_queries, make_symptom_db
+from live import LiveSession
+from model import MedicineRecommender
+
+DEFAULT_TOLERANCE = 1e-6
+
+
+def _keystrokes(text, rng):
+    """
+    Yield the texts a user produces while typing text, fixing a typo and trimming the end
+    """
+    for end in range(1, len(text) + 1):
+        yield text[:end]
+    middle = rng.randrange(len(text) + 1)
+    edited = text[:middle] + 'x' + text[middle:]
+    yield edited
+    yield text
+    for end in range(len(text) - 1, max(len(text) // 2, 0) - 1, -1):
+        yield text[:end]
+
+
+def _reference(recommender, text):
+    state = recommender._state
+    tokenized = recommender._tokenize(text, state)
+    critical = recommender._check_critical_match(tokenized, state)
+    if critical is not None:
+        return critical[0]['condition'], []
+    return None, [(condition['id'], score) for condition, score in
+                  recommender._find_matching_conditions(tokenized, state)]
+
+
+def check_live(symptom_db, n_queries, tolerance=DEFAULT_TOLERANCE, seed=0):
+    """
+    Type synthetic queries into a LiveSession and compare every keystroke with recommend()
+
+    Returns:
+        dict: Keystrokes checked, mismatches and mean latencies
+    """
+    rng = random.Random(seed)
+    # The exact index scores in float64 like the session does
+    recommender = MedicineRecommender(symptom_db=symptom_db, index='exact')
+    texts = [text for text, _ in make_queries(recommender.symptom_db, n_queries, seed=seed + 1)]
+
+    keystrokes = 0
+    mismatches = 0
+    live_elapsed = 0.0
+    full_elapsed = 0.0
+    for text in texts:
+        session = LiveSession(recommender)
+        for typed in _keystrokes(text, rng):
+            start = time.perf_counter()
+            suggestions = session.set_text(typed)
+            live_elapsed += time.perf_counter() - start
+
+            start = time.perf_counter()
+            critical, matches = _reference(recommender, typed)
+            full_elapsed += time.perf_counter() - start
+            keystrokes += 1
+
+            got = [(match.condition_id, match.score) for match in suggestions.matches]
+            same = suggestions.critical_condition == critical and len(got) == len(matches) and all(
+                a_id == b_id and abs(a - b) <= tolerance for (a_id, a), (b_id, b) in zip(got, matches)
+            )
+            if not same:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"Mismatch for {typed!r}: {suggestions} vs {critical} {matches}", file=sys.stderr)
+
+    return {
+        'conditions': len(recommender.symptom_db),
+        'keystrokes': keystrokes,
+        'mismatches': mismatches,
+        'live_keystroke_us': live_elapsed / keystrokes * 1e6,
+        'full_rescore_us': full_elapsed / keystrokes * 1e6,
+        'ok': mismatches == 0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check incremental live matching against recommend()")
+    parser.add_argument('--conditions', type=int, nargs='+', default=[100, 1000],
+                        help="Synthetic catalogue sizes; the built-in catalogue is always checked")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    symptom_dbs = [None] + [make_symptom_db(n, seed=n) for n in args.conditions]
+    report = [check_live(symptom_db, args.queries, args.tolerance) for symptom_db in symptom_dbs]
+    print(json.dumps(report, indent=2))
+
+    if not all(r['ok'] for r in report):
+        print("Live suggestions disagree with recommend()", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
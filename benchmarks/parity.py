@@ -0,0 +1,102 @@
+"""
+Check that every scoring backend matches scikit-learn.
+
+    python -m benchmarks.parity --conditions 10 100 1000 --queries 500
+
+The reference is the original scoring path: TfidfVectorizer.transform() of
+the query and cosine_similarity() against the conditions. Each condition
+index (dense float32, exact and inverted) scores the same queries through
+the recommender's own vectorizer, and every score must agree with the
+reference within a tolerance. Exits non-zero on any mismatch.
+tests/test_backends.py checks the indexes against each other on fixed
+catalogues as part of the test suite.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmarks.synthetic import make_queries, make_symptom_db
+from condition_index import build_index, top_rows
+from model import MedicineRecommender, ModelState
+from text_processing import tokenize
+
+# float32 scores carry about 7 significant digits
+DEFAULT_TOLERANCE = 1e-5
+
+
+def check_parity(n_conditions, n_queries, threshold=0.1, top_k=3, tolerance=DEFAULT_TOLERANCE, seed=0):
+    """
+    Compare every index kind against scikit-learn on one synthetic catalogue
+
+    Returns:
+        list: One dict per index kind with its worst score error and latency
+    """
+    symptom_db = make_symptom_db(n_conditions, seed=seed)
+    texts = [text for text, _ in make_queries(symptom_db, n_queries, seed=seed + 1)]
+    recommender = MedicineRecommender(symptom_db=symptom_db)
+    state = recommender._state
+
+    # Reference scores straight from scikit-learn
+    vectorizer = ModelState.new_vectorizer()
+    vectorizer.fit([keyword for condition in symptom_db for keyword in condition['keywords']])
+    condition_texts = [' '.join(c['keywords']) for c in state.condition_rows]
+    expected = cosine_similarity(vectorizer.transform(texts), vectorizer.transform(condition_texts))
+
+    query_vectors = [state.query_vectorizer.vectorize(tokenize(text)) for text in texts]
+    report = []
+    for kind in ('dense', 'exact', 'inverted'):
+        index = build_index(state.condition_matrix, kind)
+        max_error = 0.0
+        rank_mismatches = 0
+        elapsed = 0.0
+        for query_vector, reference in zip(query_vectors, expected):
+            start = time.perf_counter()
+            rows, scores = index.search(query_vector, threshold, top_k)
+            elapsed += time.perf_counter() - start
+
+            expected_rows, _ = top_rows(reference, threshold, top_k)
+            if len(rows):
+                max_error = max(max_error, float(np.max(np.abs(scores - reference[rows]))))
+            if rows.tolist() != expected_rows.tolist():
+                # Rows may only swap places when their scores tie within the tolerance
+                near_threshold = np.abs(reference - threshold) <= tolerance
+                swapped = set(rows.tolist()) ^ set(expected_rows.tolist())
+                kth = np.sort(reference)[::-1][min(top_k, len(reference)) - 1]
+                if not all(near_threshold[row] or abs(reference[row] - kth) <= tolerance for row in swapped):
+                    rank_mismatches += 1
+
+        report.append({
+            'conditions': n_conditions,
+            'index': kind,
+            'max_score_error': max_error,
+            'rank_mismatches': rank_mismatches,
+            'mean_latency_us': elapsed / len(texts) * 1e6,
+            'ok': max_error <= tolerance and rank_mismatches == 0
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check scoring backends against scikit-learn")
+    parser.add_argument('--conditions', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = []
+    for n_conditions in args.conditions:
+        report.extend(check_parity(n_conditions, args.queries, tolerance=args.tolerance))
+    print(json.dumps(report, indent=2))
+
+    failed = [f"{r['index']}@{r['conditions']}" for r in report if not r['ok']]
+    if failed:
+        print(f"Scores disagree with scikit-learn: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure recall and latency of the condition indexes against brute force.
+
+    python -m benchmarks.recall --conditions 10000 --queries 1000
+
+Recall is the fraction of the exact top-k matches (ExactIndex) that an index
+also returns. The exact inverted index must always report a recall of 1.0;
+the approximate settings show what each knob trades away. Exits non-zero if
+the exact inverted index ever disagrees with brute force.
+tests/test_backends.py runs the same comparison on a fixed 1000-condition
+catalogue with a recall floor for every approximate setting.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_queries, make_symptom_db
+from condition_index import ExactIndex, InvertedIndex
+from model import MedicineRecommender
+from text_processing import tokenize
+
+# (max_terms, max_postings) settings to sweep, (None, None) is the exact inverted index
+SETTINGS = [(None, None), (4, None), (2, None), (1, None), (None, 100), (None, 20), (2, 20)]
+
+
+def _search_all(index, query_vectors, threshold, top_k):
+    start = time.perf_counter()
+    results = [index.search(query_vectors[i], threshold, top_k) for i in range(query_vectors.shape[0])]
+    return results, (time.perf_counter() - start) / query_vectors.shape[0]
+
+
+def measure_recall(n_conditions, n_queries, threshold=0.1, top_k=3, seed=0):
+    """
+    Compare every index setting against brute force on a synthetic catalogue
+
+    Returns:
+        list: One dict per index setting with recall and mean latency
+    """
+    symptom_db = make_symptom_db(n_conditions, seed=seed)
+    recommender = MedicineRecommender(symptom_db=symptom_db, index='exact')
+    texts = [tokenize(text) for text, _ in make_queries(symptom_db, n_queries, seed=seed + 1)]
+    query_vectors = recommender._state.query_vectorizer.transform(texts)
+    condition_matrix = recommender._state.condition_matrix
+
+    exact_results, exact_latency = _search_all(ExactIndex(condition_matrix), query_vectors, threshold, top_k)
+    expected = [set(rows.tolist()) for rows, _ in exact_results]
+    total_expected = sum(len(rows) for rows in expected)
+
+    report = [{'index': 'exact', 'recall': 1.0, 'mean_latency_us': exact_latency * 1e6}]
+    for max_terms, max_postings in SETTINGS:
+        index = InvertedIndex(condition_matrix, max_terms=max_terms, max_postings=max_postings)
+        results, latency = _search_all(index, query_vectors, threshold, top_k)
+        found = sum(len(want & set(rows.tolist())) for want, (rows, _) in zip(expected, results))
+        report.append({
+            'index': 'inverted',
+            'max_terms': max_terms,
+            'max_postings': max_postings,
+            'recall': found / total_expected if total_expected else 1.0,
+            'mean_latency_us': latency * 1e6,
+            'score_mismatches': int(sum(
+                not np.allclose(scores, exact_scores) for (_, scores), (_, exact_scores) in zip(results, exact_results)
+                if len(scores) == len(exact_scores)
+            ))
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check condition index recall against brute force")
+    parser.add_argument('--conditions', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    report = measure_recall(args.conditions, args.queries, args.threshold, args.top_k)
+    print(json.dumps(report, indent=2))
+
+    exact_inverted = report[1]
+    if exact_inverted['recall'] < 1.0 or exact_inverted['score_mismatches']:
+        print("Exact inverted index disagrees with brute force", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark the recommend pipeline on synthetic catalogues of increasing size.
+
+    python -m benchmarks.run --sizes 10 100 1000 10000 --queries 2000 --output bench.json
+    python -m benchmarks.run --output new.json --baseline old.json
+
+Every stage is timed per call and reported as p50/p95/p99 latency in
+microseconds plus throughput in calls per second. Results are written as JSON
+so runs from different commits can be compared with --baseline.
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_queries, make_symptom_db
+from model import MedicineRecommender
+from text_processing import tokenize
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def _summarise(durations):
+    """
+    Summarise per-call durations in seconds
+
+    Returns:
+        dict: Latency percentiles in microseconds, throughput and call count
+    """
+    durations = np.asarray(durations)
+    p50, p95, p99 = np.percentile(durations, [50, 95, 99]) * 1e6
+    total = durations.sum()
+    return {
+        'calls': int(len(durations)),
+        'p50_us': float(p50),
+        'p95_us': float(p95),
+        'p99_us': float(p99),
+        'mean_us': float(durations.mean() * 1e6),
+        'per_second': float(len(durations) / total) if total > 0 else float('inf')
+    }
+
+
+def _time_calls(func, args_list):
+    durations = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_size(n_conditions, n_queries, cold_start_runs=3, seed=0):
+    """
+    Benchmark every pipeline stage against one synthetic catalogue size
+
+    Returns:
+        dict: Stage summaries keyed by stage name, plus catalogue details
+    """
+    symptom_db = make_symptom_db(n_conditions, seed=seed)
+    queries = make_queries(symptom_db, n_queries, seed=seed + 1)
+
+    cold_starts = []
+    for _ in range(cold_start_runs):
+        start = time.perf_counter()
+        recommender = MedicineRecommender(symptom_db=symptom_db)
+        cold_starts.append(time.perf_counter() - start)
+
+    texts = [(tokenize(text),) for text, _ in queries]
+
+    # Medicine candidates for the refinement stage come from the real matching stage
+    refine_args = []
+    for (text,), (_, additional_info) in zip(texts, queries):
+        medicine_ids = []
+        for condition, _ in recommender._find_matching_conditions(text):
+            medicine_ids.extend(recommender._state.condition_medicine_ids[condition['id']])
+        refine_args.append((medicine_ids, additional_info))
+
+    stages = {
+        'cold_start': _summarise(cold_starts),
+        'tokenize': _summarise(_time_calls(tokenize, [(text,) for text, _ in queries])),
+        'check_critical_match': _summarise(_time_calls(recommender._check_critical_match, texts)),
+        'find_matching_conditions': _summarise(_time_calls(recommender._find_matching_conditions, texts)),
+        'refine_with_additional_info': _summarise(_time_calls(recommender._refine_with_additional_info, refine_args)),
+        'recommend': _summarise(_time_calls(recommender.recommend, queries))
+    }
+
+    start = time.perf_counter()
+    recommender.recommend_many([text for text, _ in queries], [info for _, info in queries])
+    batch_seconds = time.perf_counter() - start
+    stages['recommend_many'] = {'calls': n_queries, 'per_second': n_queries / batch_seconds}
+
+    return {
+        'conditions': n_conditions,
+        'vocabulary_size': len(recommender._state.query_vectorizer.vocabulary),
+        'queries': n_queries,
+        'stages': stages,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """
+    Print the p50 latency change of every stage against a baseline run
+    """
+    baseline_sizes = {run['conditions']: run for run in baseline['runs']}
+    for run in current['runs']:
+        old = baseline_sizes.get(run['conditions'])
+        if old is None:
+            continue
+        for stage, summary in run['stages'].items():
+            old_summary = old['stages'].get(stage, {})
+            if 'p50_us' in summary and old_summary.get('p50_us'):
+                ratio = summary['p50_us'] / old_summary['p50_us']
+                print(f"{run['conditions']:>6} conditions  {stage:<28} p50 {old_summary['p50_us']:10.1f}us -> "
+                      f"{summary['p50_us']:10.1f}us  ({ratio:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the medicine recommendation pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Synthetic catalogue sizes (number of conditions)")
+    parser.add_argument('--queries', type=int, default=1000, help="Synthetic queries per catalogue size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    results = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'runs': []
+    }
+    for size in args.sizes:
+        run = benchmark_size(size, args.queries, seed=args.seed)
+        results['runs'].append(run)
+        recommend = run['stages']['recommend']
+        print(f"{size:>6} conditions: recommend p50 {recommend['p50_us']:.1f}us "
+              f"p99 {recommend['p99_us']:.1f}us, {recommend['per_second']:.0f}/s, "
+              f"cold start {run['stages']['cold_start']['p50_us'] / 1000:.1f}ms, "
+              f"peak RSS {run['peak_rss_mb']:.0f}MB", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic knowledge bases and symptom corpora for benchmarking.
+"""
+import random
+
+_SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ha', 'ke', 'li', 'mo', 'nu', 'pa', 're', 'si', 'to', 'vu', 'za']
+
+_FILLER = ['i', 'have', 'a', 'and', 'since', 'yesterday', 'my', 'feels', 'really', 'bad', 'with', 'some']
+
+DURATIONS = ["Less than 24 hours", "1-3 days", "4-7 days", "More than a week"]
+PRE_EXISTING = ["None", "Diabetes", "High Blood Pressure", "Heart Disease", "Asthma", "Allergies", "Other"]
+# Current medications answers, mostly empty like in the app
+MEDICATIONS = ["", "", "", "warfarin 5mg", "lisinopril and metformin", "Zoloft 50mg daily, levothyroxine", "advil"]
+
+
+def _make_words(count, rng):
+    """
+    Make count distinct pronounceable pseudo-words
+    """
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_symptom_db(n_conditions, critical_ratio=0.1, seed=0):
+    """
+    Generate a catalogue in the MedicineRecommender.symptom_db format
+
+    Args:
+        n_conditions (int): Number of conditions to generate
+        critical_ratio (float): Fraction of conditions marked critical
+        seed (int): Random seed, the same seed always gives the same catalogue
+
+    Returns:
+        list: Synthetic conditions with keywords and medicines
+    """
+    rng = random.Random(seed)
+
+    # The vocabulary grows with the catalogue so conditions stay distinguishable
+    words = _make_words(max(50, n_conditions * 4), rng)
+    medicines = [
+        {
+            'name': f"Medicine {i}",
+            'dosage': f"{rng.choice([5, 10, 20, 50, 100, 200])}mg every {rng.choice([4, 6, 8, 12])} hours",
+            'description': f"Synthetic medicine number {i}.",
+            'url': f"https://example.org/medicines/{i}"
+        }
+        for i in range(max(5, n_conditions // 2))
+    ]
+    # Keep the names the refinement rules look for in the catalogue
+    medicines[0]['name'] = 'Ibuprofen'
+    medicines[1]['name'] = 'Aspirin'
+
+    n_critical = int(round(n_conditions * critical_ratio))
+    symptom_db = []
+    for i in range(n_conditions):
+        is_critical = i >= n_conditions - n_critical
+        keywords = []
+        for _ in range(rng.randint(6, 10)):
+            keywords.append(' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))))
+        symptom_db.append({
+            'id': i + 1,
+            'condition': f"Condition {i + 1}",
+            'keywords': keywords,
+            'medicines': [] if is_critical else rng.sample(medicines, rng.randint(1, 3)),
+            'recommendation': f"Synthetic advice for condition {i + 1}.",
+            'is_critical': is_critical
+        })
+    return symptom_db
+
+
+def make_queries(symptom_db, n_queries, seed=0):
+    """
+    Generate symptom descriptions that mention keywords from the catalogue
+
+    Args:
+        symptom_db (list): Catalogue to draw keywords from
+        n_queries (int): Number of texts to generate
+        seed (int): Random seed
+
+    Returns:
+        list: (symptoms text, additional info) tuples
+    """
+    rng = random.Random(seed)
+    non_critical = [c for c in symptom_db if not c['is_critical']] or symptom_db
+    queries = []
+    for _ in range(n_queries):
+        # Mostly everyday conditions, occasionally an emergency
+        pool = symptom_db if rng.random() < 0.05 else non_critical
+        parts = []
+        for condition in rng.sample(pool, min(len(pool), rng.randint(1, 3))):
+            parts.append(rng.choice(condition['keywords']))
+            parts.extend(rng.sample(_FILLER, rng.randint(0, 3)))
+        additional_info = {
+            'duration': rng.choice(DURATIONS),
+            'severity': rng.randint(1, 10),
+            'conditions': rng.sample(PRE_EXISTING, rng.randint(0, 2)),
+            'medications': rng.choice(MEDICATIONS)
+        }
+        queries.append((' '.join(parts), additional_info))
+    return queries
+
+
+def make_labelled_corpus(symptom_db, n_items, typo_rate=0.0, seed=0):
+    """
+    Generate symptom descriptions labelled with the conditions they describe, for evaluate.py
+
+    Args:
+        symptom_db (list): Catalogue to draw keywords from
+        n_items (int): Number of texts to generate
+        typo_rate (float): Chance that a keyword word longer than four letters loses a letter
+        seed (int): Random seed
+
+    Returns:
+        list: Dicts with 'symptoms', 'conditions' (condition ids) and 'is_critical'
+    """
+    rng = random.Random(seed)
+    non_critical = [c for c in symptom_db if not c['is_critical']] or symptom_db
+    corpus = []
+    for _ in range(n_items):
+        pool = symptom_db if rng.random() < 0.05 else non_critical
+        conditions = rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+        parts = []
+        for condition in conditions:
+            words = rng.choice(condition['keywords']).split()
+            for i, word in enumerate(words):
+                if len(word) > 4 and rng.random() < typo_rate:
+                    position = rng.randrange(len(word))
+                    words[i] = word[:position] + word[position + 1:]
+            parts.append(' '.join(words))
+            parts.extend(rng.sample(_FILLER, rng.randint(0, 3)))
+        corpus.append({
+            'symptoms': ' '.join(parts),
+            'conditions': [c['id'] for c in conditions],
+            'is_critical': any(c['is_critical'] for c in conditions)
+        })
+    return corpus
@@ -0,0 +1,117 @@
+"""
+Hammer one shared recommender from many threads and check the results are deterministic.
+
+    python -m benchmarks.thread_stress --threads 16 --queries 2000
+    python -m benchmarks.thread_stress --conditions 1000 --cache-size 512
+
+Expected results come from a single-threaded pass. The same queries are then
+sent in a different order by every thread, straight to recommend(), in
+batches to recommend_many() and through ThreadedRecommender, and every result
+must equal the single-threaded one. Reports the throughput of each mode and
+exits non-zero on any mismatch or error.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+from benchmarks.synthetic import make_queries, make_symptom_db
+from model import MedicineRecommender
+from threaded_recommender import ThreadedRecommender
+
+
+def _hammer(n_threads, n_items, call):
+    """
+    Run call(thread number, item order) on n_threads threads at once
+
+    Returns:
+        tuple: (seconds, list of (item, result) from every thread, errors)
+    """
+    outputs = [None] * n_threads
+    errors = []
+    barrier = threading.Barrier(n_threads)
+
+    def run(number):
+        order = list(range(n_items))
+        random.Random(number).shuffle(order)
+        barrier.wait()
+        try:
+            outputs[number] = list(zip(order, call(number, order)))
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, [pair for output in outputs if output for pair in output], errors
+
+
+def stress(recommender, queries, n_threads, batch_size=64):
+    """
+    Returns:
+        list: One dict per mode with throughput, mismatches and errors
+    """
+    texts = [text for text, _ in queries]
+    infos = [info for _, info in queries]
+    expected = [recommender.recommend(text, info) for text, info in queries]
+
+    def direct(number, order):
+        return [recommender.recommend(texts[i], infos[i]) for i in order]
+
+    def batched(number, order):
+        results = []
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            results.extend(recommender.recommend_many([texts[i] for i in chunk], [infos[i] for i in chunk]))
+        return results
+
+    pool = ThreadedRecommender(recommender, workers=min(n_threads, 8), max_batch_size=batch_size)
+
+    def threaded(number, order):
+        futures = [pool.submit(texts[i], infos[i]) for i in order]
+        return [future.result() for future in futures]
+
+    report = []
+    with pool:
+        for mode, call in (('recommend', direct), ('recommend_many', batched), ('threaded', threaded)):
+            elapsed, results, errors = _hammer(n_threads, len(queries), call)
+            report.append({
+                'mode': mode,
+                'threads': n_threads,
+                'requests': len(results),
+                'requests_per_second': len(results) / elapsed if elapsed else 0.0,
+                'mismatches': sum(result != expected[i] for i, result in results),
+                'errors': errors[:5],
+                'ok': not errors and all(result == expected[i] for i, result in results)
+            })
+        report[-1]['pool'] = pool.stats()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check one recommender shared by many threads")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--conditions', type=int, help="Synthetic catalogue size, the built-in one when omitted")
+    parser.add_argument('--cache-size', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    symptom_db = make_symptom_db(args.conditions) if args.conditions else None
+    recommender = MedicineRecommender(symptom_db=symptom_db, cache_size=args.cache_size)
+    queries = make_queries(recommender.symptom_db, args.queries, seed=1)
+    report = stress(recommender, queries, args.threads)
+    print(json.dumps(report, indent=2))
+
+    if not all(r['ok'] for r in report):
+        print("Results differ between threads", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
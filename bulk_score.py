@@ -0,0 +1,314 @@
+"""
+Score large CSV/JSONL symptom files with a pool of worker processes.
+
+The input is streamed in chunks, each chunk is scored by a worker that loads
+the recommender once, and results are written back in input order. Memory
+stays constant regardless of input size because only a bounded number of
+chunks is in flight at any time.
+
+    python bulk_score.py intake.jsonl scored.jsonl
+    python bulk_score.py intake.csv scored_parquet/ --text-column notes --format parquet
+
+JSONL input rows may carry an "additional_info" object next to the text.
+Bad rows do not stop a run: a line that is not a JSON object is written as a
+record with only an "error", and mistyped additional info is dropped, the
+row scored without it and the reason noted in the record's "error".
+CSV input and parquet output need pandas, parquet also a parquet engine such as pyarrow.
+Progress is checkpointed after every chunk, so an interrupted run continues
+where it stopped when started again with the same arguments.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from contraindications import validate_additional_info
+from model import load_recommender
+
+# Set in each worker process by _init_worker
+_recommender = None
+
+
+def _init_worker(artifact_path, knowledge_base_path):
+    global _recommender
+    _recommender = load_recommender(artifact_path=artifact_path, knowledge_base_path=knowledge_base_path)
+
+
+def _score_chunk(texts, additional_infos):
+    """
+    Returns:
+        list: Result dict per text, None for the unreadable rows whose text is None
+    """
+    rows = [i for i, text in enumerate(texts) if text is not None]
+    results = [None] * len(texts)
+    scored = _recommender.recommend_many([texts[i] for i in rows], [additional_infos[i] for i in rows])
+    for i, result in zip(rows, scored):
+        # Results go back as plain dicts; Recommendation objects would drag the catalogue along
+        results[i] = result.to_dict()
+    return results
+
+
+def _parse_jsonl_row(line, line_number, text_column, id_column):
+    """
+    Returns:
+        tuple: (id, text or None when the line is unreadable, additional info, error or None)
+    """
+    try:
+        record = json.loads(line) if line.strip() else {}
+    except ValueError:
+        record = None
+    if not isinstance(record, dict):
+        return None, None, None, f"Line {line_number + 1} is not a JSON object"
+
+    row_id = record.get(id_column) if id_column else None
+    info = record.get('additional_info')
+    if info is not None:
+        try:
+            validate_additional_info(info)
+        except ValueError as e:
+            return row_id, str(record.get(text_column) or ''), None, f"additional_info ignored: {e}"
+    return row_id, str(record.get(text_column) or ''), info, None
+
+
+def iter_jsonl_chunks(path, text_column, id_column=None, chunk_size=1000, skip_rows=0):
+    """
+    Stream a JSONL file as chunks of (ids, texts, additional infos, errors)
+    """
+    chunk = ([], [], [], [])
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            if line_number < skip_rows:
+                continue
+            for column, value in zip(chunk, _parse_jsonl_row(line, line_number, text_column, id_column)):
+                column.append(value)
+            if len(chunk[1]) == chunk_size:
+                yield chunk
+                chunk = ([], [], [], [])
+    if chunk[1]:
+        yield chunk
+
+
+def iter_csv_chunks(path, text_column, id_column=None, chunk_size=1000, skip_rows=0):
+    """
+    Stream a CSV file as chunks of (ids, texts, additional infos, errors)
+    """
+    # pandas is only imported for CSV input or parquet output, JSONL runs never pay for it
+    import pandas as pd
+
+    columns = [text_column] + ([id_column] if id_column else [])
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+        # Keep the header row, skip data rows already scored
+        skiprows=range(1, skip_rows + 1) if skip_rows else None
+    )
+    for frame in reader:
+        texts = frame[text_column].tolist()
+        ids = frame[id_column].tolist() if id_column else [None] * len(texts)
+        yield ids, texts, [None] * len(texts), [None] * len(texts)
+
+
+class JsonlWriter:
+    """
+    Appends one JSON object per row to a single file
+    """
+    def __init__(self, path, resume_offset):
+        self.path = path
+        if not resume_offset:
+            self._file = open(path, 'wb')
+            return
+        if not os.path.exists(path):
+            raise ValueError(f"Cannot resume, {path} is missing; rerun with --restart")
+        self._file = open(path, 'r+b')
+        # Drop anything written after the last checkpoint
+        self._file.seek(resume_offset)
+        self._file.truncate()
+
+    def write(self, records, chunk_index):
+        self._file.write(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes every chunk as its own columnar part file in an output directory
+    """
+    def __init__(self, path, resume_offset):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, records, chunk_index):
+        import pandas as pd
+
+        # Unreadable rows only have an error
+        frame = pd.DataFrame({
+            'row': [r['row'] for r in records],
+            'id': [r.get('id') for r in records],
+            'is_critical': [r.get('is_critical') for r in records],
+            'recommendation': [r.get('recommendation') for r in records],
+            'medicines': [[m['name'] for m in r.get('medicines', ())] for r in records],
+            'priority_medicines': [[m['name'] for m in r.get('medicines', ()) if m['priority']] for r in records],
+            'flags': [r.get('flags', []) for r in records],
+            'error': [r.get('error') for r in records]
+        })
+        # Needs a parquet engine such as pyarrow
+        part_path = os.path.join(self.path, f"part-{chunk_index:06d}.parquet")
+        frame.to_parquet(part_path + '.tmp', index=False)
+        os.replace(part_path + '.tmp', part_path)
+        return 0
+
+    def close(self):
+        pass
+
+
+def _read_checkpoint(path, input_path):
+    if not os.path.exists(path):
+        return {'rows_done': 0, 'chunks_done': 0, 'output_bytes': 0}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {path} belongs to a different input file")
+    return checkpoint
+
+
+def _write_checkpoint(path, checkpoint):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(path + '.tmp', path)
+
+
+def score_file(input_path, output_path, text_column='symptoms', id_column=None, input_format=None,
+               output_format=None, chunk_size=1000, workers=None, artifact_path=None,
+               knowledge_base_path=None, resume=True, progress=sys.stderr):
+    """
+    Score every row of a symptoms file and write the results in input order
+
+    Args:
+        input_path (str): CSV or JSONL file with a free-text symptoms column
+        output_path (str): JSONL file, or directory of parquet part files
+        text_column (str): Column (CSV) or key (JSONL) holding the symptoms text
+        id_column (str): Optional column copied to the output to identify rows
+        input_format (str): 'csv' or 'jsonl', guessed from the file extension when omitted
+        output_format (str): 'jsonl' or 'parquet', guessed from output_path when omitted
+        chunk_size (int): Rows scored per task
+        workers (int): Worker processes, defaults to the CPU count
+        artifact_path (str): Optional prefitted model artifact for the workers
+        knowledge_base_path (str): Optional knowledge base file
+        resume (bool): Continue from the checkpoint of an earlier interrupted run
+        progress (file): Where progress lines go, None to stay quiet
+
+    Returns:
+        int: Total number of rows scored, including rows from earlier runs
+    """
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    output_format = output_format or ('jsonl' if output_path.lower().endswith('.jsonl') else 'parquet')
+    workers = workers or os.cpu_count() or 1
+
+    checkpoint_path = output_path.rstrip(os.sep) + '.checkpoint.json'
+    if resume:
+        checkpoint = _read_checkpoint(checkpoint_path, input_path)
+    else:
+        checkpoint = {'rows_done': 0, 'chunks_done': 0, 'output_bytes': 0}
+    checkpoint['input'] = os.path.abspath(input_path)
+
+    iter_chunks = iter_csv_chunks if input_format == 'csv' else iter_jsonl_chunks
+    chunks = iter_chunks(input_path, text_column, id_column, chunk_size, checkpoint['rows_done'])
+    writer_class = JsonlWriter if output_format == 'jsonl' else ParquetWriter
+    writer = writer_class(output_path, checkpoint['output_bytes'])
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    last_report = started
+    # Enough chunks in flight to keep every worker busy, and no more
+    max_in_flight = workers * 2
+    pending = deque()
+
+    def write_next():
+        nonlocal rows_this_run, last_report
+        first_row, ids, errors, future = pending.popleft()
+        records = []
+        for offset, (row_id, error, result) in enumerate(zip(ids, errors, future.result())):
+            record = {'row': first_row + offset}
+            if id_column:
+                record['id'] = row_id
+            if result is not None:
+                record.update(result)
+            if error is not None:
+                record['error'] = error
+            records.append(record)
+
+        checkpoint['output_bytes'] = writer.write(records, checkpoint['chunks_done'])
+        checkpoint['rows_done'] += len(records)
+        checkpoint['chunks_done'] += 1
+        _write_checkpoint(checkpoint_path, checkpoint)
+
+        rows_this_run += len(records)
+        now = time.perf_counter()
+        if progress is not None and now - last_report >= 5:
+            last_report = now
+            print(f"{checkpoint['rows_done']} rows scored, {rows_this_run / (now - started):.0f} rows/s",
+                  file=progress)
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(artifact_path, knowledge_base_path)) as executor:
+            next_row = checkpoint['rows_done']
+            for ids, texts, infos, errors in chunks:
+                pending.append((next_row, ids, errors, executor.submit(_score_chunk, texts, infos)))
+                next_row += len(texts)
+                # Futures complete out of order but are written strictly in submission order
+                if len(pending) >= max_in_flight:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        writer.close()
+
+    if progress is not None:
+        elapsed = time.perf_counter() - started
+        print(f"Done: {checkpoint['rows_done']} rows, {rows_this_run / elapsed if elapsed else 0:.0f} rows/s "
+              f"this run", file=progress)
+    return checkpoint['rows_done']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score CSV/JSONL symptom files in bulk")
+    parser.add_argument('input', help="CSV or JSONL file with a symptoms column")
+    parser.add_argument('output', help="Output JSONL file, or directory for parquet part files")
+    parser.add_argument('--text-column', default='symptoms')
+    parser.add_argument('--id-column', help="Column copied to the output to identify rows")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    parser.add_argument('--format', dest='output_format', choices=['jsonl', 'parquet'])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--model-artifact', default=os.environ.get('MEDICINE_MODEL_ARTIFACT'))
+    parser.add_argument('--knowledge-base', default=os.environ.get('MEDICINE_KNOWLEDGE_BASE'))
+    parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    score_file(
+        args.input, args.output,
+        text_column=args.text_column,
+        id_column=args.id_column,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        artifact_path=args.model_artifact,
+        knowledge_base_path=args.knowledge_base,
+        resume=not args.restart
+    )
+
+
+if __name__ == '__main__':
+    main()
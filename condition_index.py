@@ -0,0 +1,276 @@
+"""
+Condition retrieval indexes for MedicineRecommender.
+
+An index takes L2-normalised TF-IDF query vectors and returns the condition
+rows whose cosine similarity is above a threshold, best first.
+
+DenseIndex keeps the condition weights in a dense float32 term x condition
+array and scores a query by summing the rows of its few terms, with no
+sparse matrix machinery at all; it is the fastest choice while that array
+stays small. ExactIndex scores every condition with one sparse product.
+InvertedIndex only scores conditions that share a term with the query:
+postings lists give the candidates and MaxScore pruning skips terms that
+cannot lift a condition over the threshold on their own, so it stays exact
+while touching a fraction of a large catalogue. Its max_terms and
+max_postings knobs trade recall for latency further; benchmarks/recall.py
+measures that trade-off against ExactIndex, and benchmarks/parity.py checks
+DenseIndex scores against scikit-learn.
+
+Queries are L2-normalised TF-IDF vectors: one-row CSR matrices or
+text_processing.TermVector objects, which expose the same indices and data.
+
+Every index also offers explain(), which returns what each query term adds
+to the score of each returned condition. The contributions of a row sum to
+its score; only the query's terms and the top_k rows are touched, so the
+extra cost is bounded by their product.
+"""
+import numpy as np
+
+# 'auto' uses the dense index while vocabulary size x conditions stays within this
+# many float32 cells (32 MB)
+AUTO_DENSE_MAX_CELLS = 1 << 23
+
+# Otherwise catalogues larger than this use the inverted index
+AUTO_INVERTED_MIN_CONDITIONS = 1000
+
+
+def top_rows(scores, threshold, top_k, rows=None):
+    """
+    Select the best scoring rows above a threshold
+
+    Args:
+        scores (np.ndarray): Similarity scores
+        threshold (float): Scores must be strictly greater than this
+        top_k (int): Maximum number of rows to return
+        rows (np.ndarray): Row ids of the scores, defaults to their positions
+
+    Returns:
+        tuple: (row ids, scores) sorted by score descending, ties by row id
+    """
+    candidates = np.flatnonzero(scores > threshold)
+
+    # Only partially sort when there are more matches than we return
+    if len(candidates) > top_k:
+        candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+
+    row_ids = candidates if rows is None else rows[candidates]
+    order = np.lexsort((row_ids, -scores[candidates]))
+    return row_ids[order], scores[candidates][order]
+
+
+def top_rows_many(scores, threshold, top_k):
+    """
+    top_rows() for every row of a dense score matrix with a few whole-array calls,
+    which NumPy runs without holding the GIL
+
+    Returns:
+        list: (row ids, scores) per score row, like top_rows()
+    """
+    n_queries, n_rows = scores.shape
+    k = min(top_k, n_rows)
+    if k == 0:
+        return [(np.empty(0, dtype=np.intp), scores[i, :0]) for i in range(n_queries)]
+    if k < n_rows:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_rows), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    rows = np.take_along_axis(candidates, order, axis=1)
+    ranked = np.take_along_axis(candidate_scores, order, axis=1)
+
+    # Rows are sorted best first, so the matches of each query are a prefix
+    counts = (ranked > threshold).sum(axis=1).tolist()
+    return [(rows[i, :count], ranked[i, :count]) for i, count in enumerate(counts)]
+
+
+def _row_contributions(condition_matrix, query_vector, rows):
+    """
+    Returns:
+        np.ndarray: query term weight x condition term weight, one row per condition in rows
+    """
+    query_vector = query_vector.tocsr()
+    weights = condition_matrix[rows][:, query_vector.indices].toarray()
+    return weights * query_vector.data
+
+
+class ExactIndex:
+    """
+    Brute force: every condition is scored with one sparse mat-vec
+    """
+    def __init__(self, condition_matrix):
+        self.condition_matrix = condition_matrix.tocsr()
+
+    def search(self, query_vector, threshold, top_k):
+        scores = (self.condition_matrix @ query_vector.tocsr().T).toarray().ravel()
+        return top_rows(scores, threshold, top_k)
+
+    def explain(self, query_vector, threshold, top_k):
+        """
+        Search, also returning every query term's contribution to the returned rows
+
+        Returns:
+            tuple: (row ids, scores, contributions with one row per returned row and
+                one column per query term, in the order of query_vector.indices)
+        """
+        rows, scores = self.search(query_vector, threshold, top_k)
+        return rows, scores, _row_contributions(self.condition_matrix, query_vector, rows)
+
+    def search_many(self, query_vectors, threshold, top_k):
+        """
+        Search a batch of queries with a single sparse matrix product
+
+        Returns:
+            list: (row ids, scores) per query
+        """
+        scores = (query_vectors @ self.condition_matrix.T).tocsr()
+        results = []
+        for i in range(scores.shape[0]):
+            # Only conditions sharing a term with the query have a stored score
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            results.append(top_rows(scores.data[start:end], threshold, top_k, scores.indices[start:end]))
+        return results
+
+
+class DenseIndex:
+    """
+    Dense float32 weights: a query is scored by summing the weight rows of its terms
+    """
+    def __init__(self, condition_matrix):
+        # Row t holds term t's weight in every condition, so a query only reads its own rows
+        self._term_weights = np.ascontiguousarray(condition_matrix.T.toarray(), dtype=np.float32)
+
+    def scores(self, query_vector):
+        """
+        Returns:
+            np.ndarray: Cosine similarity of the query with every condition
+        """
+        return query_vector.data.astype(np.float32) @ self._term_weights[query_vector.indices]
+
+    def search(self, query_vector, threshold, top_k):
+        return top_rows(self.scores(query_vector), threshold, top_k)
+
+    def explain(self, query_vector, threshold, top_k):
+        """
+        Search, also returning every query term's contribution to the returned rows
+
+        Returns:
+            tuple: See ExactIndex.explain()
+        """
+        # The weight rows gathered for the score also give the per-term contributions
+        term_weights = self._term_weights[query_vector.indices]
+        query_weights = query_vector.data.astype(np.float32)
+        rows, scores = top_rows(query_weights @ term_weights, threshold, top_k)
+        return rows, scores, (term_weights[:, rows] * query_weights[:, None]).T
+
+    def search_many(self, query_vectors, threshold, top_k):
+        scores = query_vectors.tocsr().astype(np.float32) @ self._term_weights
+        return top_rows_many(scores, threshold, top_k)
+
+
+class InvertedIndex:
+    """
+    Term-at-a-time candidate generation over postings lists with MaxScore pruning
+    """
+    def __init__(self, condition_matrix, max_terms=None, max_postings=None):
+        """
+        Args:
+            condition_matrix (scipy.sparse matrix): L2-normalised condition vectors, one row per condition
+            max_terms (int): Approximate mode, only the query terms with the highest
+                score bound generate candidates
+            max_postings (int): Approximate mode, only the highest weighted conditions of
+                each term's postings generate candidates
+        """
+        self.condition_matrix = condition_matrix.tocsr()
+        self.max_terms = max_terms
+        self.max_postings = max_postings
+
+        # Postings lists ordered by weight, so truncating one keeps its strongest conditions
+        csc = condition_matrix.tocsc()
+        csc.sort_indices()
+        self._postings_ptr = csc.indptr
+        self._postings = csc.indices.copy()
+        self._term_max = np.zeros(csc.shape[1])
+        for term in range(csc.shape[1]):
+            start, end = csc.indptr[term], csc.indptr[term + 1]
+            if start == end:
+                continue
+            weights = csc.data[start:end]
+            order = np.argsort(-weights, kind='stable')
+            self._postings[start:end] = csc.indices[start:end][order]
+            self._term_max[term] = weights[order[0]]
+
+    def _candidates(self, terms, weights, threshold):
+        # Upper bound of what each query term can add to any condition's score
+        bounds = weights * self._term_max[terms]
+        order = np.argsort(bounds)
+
+        # Terms whose bounds together cannot exceed the threshold never create a match
+        # on their own, so only the remaining (essential) terms need their postings read
+        n_non_essential = np.searchsorted(np.cumsum(bounds[order]), threshold, side='right')
+        essential = terms[order[n_non_essential:]]
+        if self.max_terms is not None:
+            essential = essential[-self.max_terms:]
+
+        postings = []
+        for term in essential:
+            start, end = self._postings_ptr[term], self._postings_ptr[term + 1]
+            if self.max_postings is not None:
+                end = min(end, start + self.max_postings)
+            postings.append(self._postings[start:end])
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    def search(self, query_vector, threshold, top_k):
+        query_vector = query_vector.tocsr()
+        candidates = self._candidates(query_vector.indices, query_vector.data, threshold)
+        if len(candidates) == 0:
+            return candidates, np.empty(0)
+
+        # Candidates get their exact score from all query terms
+        scores = (self.condition_matrix[candidates] @ query_vector.T).toarray().ravel()
+        return top_rows(scores, threshold, top_k, candidates)
+
+    def explain(self, query_vector, threshold, top_k):
+        """
+        Search, also returning every query term's contribution to the returned rows
+
+        Returns:
+            tuple: See ExactIndex.explain()
+        """
+        rows, scores = self.search(query_vector, threshold, top_k)
+        return rows, scores, _row_contributions(self.condition_matrix, query_vector, rows)
+
+    def search_many(self, query_vectors, threshold, top_k):
+        query_vectors = query_vectors.tocsr()
+        return [self.search(query_vectors[i], threshold, top_k) for i in range(query_vectors.shape[0])]
+
+
+def build_index(condition_matrix, kind='auto', **options):
+    """
+    Build a condition index
+
+    Args:
+        condition_matrix (scipy.sparse matrix): L2-normalised condition vectors
+        kind (str): 'dense', 'exact', 'inverted' or 'auto' (picked from the catalogue size)
+        **options: Extra options for InvertedIndex, e.g. max_terms
+
+    Returns:
+        DenseIndex, ExactIndex or InvertedIndex
+    """
+    if kind == 'auto':
+        n_conditions, vocabulary_size = condition_matrix.shape
+        if n_conditions * vocabulary_size <= AUTO_DENSE_MAX_CELLS:
+            kind = 'dense'
+        elif n_conditions > AUTO_INVERTED_MIN_CONDITIONS:
+            kind = 'inverted'
+        else:
+            kind = 'exact'
+    if kind == 'dense':
+        return DenseIndex(condition_matrix)
+    if kind == 'exact':
+        return ExactIndex(condition_matrix)
+    if kind == 'inverted':
+        return InvertedIndex(condition_matrix, **options)
+    raise ValueError(f"Unknown condition index: {kind}")
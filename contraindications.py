@@ -0,0 +1,248 @@
+"""
+Contraindication and interaction filtering for recommended medicines.
+
+Each catalogue medicine is mapped to its active ingredients by matching its
+name against an ingredient index. The rules are then compiled into two
+boolean matrices:
+
+    medicine x patient condition       True when the condition rules the medicine out
+    medicine x current ingredient      True when the medicine must not be combined with it
+
+A request's pre-existing conditions and its free-text current medications
+select columns of those matrices, so filtering the candidate medicines is a
+single vectorised mask regardless of how many rules or medications there are.
+
+Rules name either an ingredient or a drug class, which stands for every
+ingredient of that class. They cover the catalogue's over-the-counter
+medicines and the prescription drugs they most commonly interact with; they
+are a safety net, not a substitute for a pharmacist.
+"""
+import numpy as np
+
+from text_processing import tokenize
+
+# Active ingredients: (drug classes, other names that refer to them such as brands)
+INGREDIENTS = {
+    'paracetamol': (('analgesic',), ('acetaminophen', 'tylenol', 'panadol')),
+    'ibuprofen': (('nsaid',), ('advil', 'motrin', 'nurofen')),
+    'naproxen': (('nsaid',), ('aleve',)),
+    'diclofenac': (('nsaid',), ('voltaren',)),
+    'aspirin': (('salicylate', 'antiplatelet'), ('acetylsalicylic acid',)),
+    'pseudoephedrine': (('decongestant',), ('sudafed',)),
+    'phenylephrine': (('decongestant',), ()),
+    'cetirizine': (('antihistamine',), ('zyrtec',)),
+    'loratadine': (('antihistamine',), ('claritin',)),
+    'dextromethorphan': (('antitussive', 'serotonergic'), ()),
+    'omeprazole': (('proton pump inhibitor',), ('prilosec',)),
+    'calcium carbonate': (('antacid',), ('tums',)),
+    'simethicone': (('antiflatulent',), ()),
+    'hydrocortisone': (('corticosteroid',), ()),
+    # Prescription drugs that patients commonly list as current medications
+    'warfarin': (('anticoagulant',), ('coumadin',)),
+    'apixaban': (('anticoagulant',), ('eliquis',)),
+    'rivaroxaban': (('anticoagulant',), ('xarelto',)),
+    'clopidogrel': (('antiplatelet',), ('plavix',)),
+    'sertraline': (('ssri', 'serotonergic'), ('zoloft',)),
+    'fluoxetine': (('ssri', 'serotonergic'), ('prozac',)),
+    'citalopram': (('ssri', 'serotonergic'), ('celexa',)),
+    'escitalopram': (('ssri', 'serotonergic'), ('lexapro',)),
+    'phenelzine': (('maoi', 'serotonergic'), ('nardil',)),
+    'selegiline': (('maoi',), ()),
+    'lisinopril': (('ace inhibitor',), ()),
+    'ramipril': (('ace inhibitor',), ()),
+    'losartan': (('angiotensin receptor blocker',), ()),
+    'lithium': (('lithium',), ()),
+    'methotrexate': (('methotrexate',), ()),
+    'levothyroxine': (('thyroid hormone',), ('synthroid',)),
+    'prednisone': (('corticosteroid',), ()),
+}
+
+# Pre-existing patient conditions and the ingredients or classes they rule out
+CONDITION_CONTRAINDICATIONS = {
+    'allergies': ('aspirin',),
+    'asthma': ('aspirin',),
+    'high blood pressure': ('decongestant',),
+    'heart disease': ('decongestant', 'nsaid'),
+    'kidney disease': ('nsaid', 'salicylate'),
+    'stomach ulcer': ('nsaid', 'salicylate'),
+}
+
+# Ingredients or classes that must not be taken together; taking the same ingredient
+# twice is always ruled out on top of these
+INTERACTIONS = (
+    ('anticoagulant', 'nsaid'),
+    ('anticoagulant', 'salicylate'),
+    ('antiplatelet', 'nsaid'),
+    ('ssri', 'nsaid'),
+    ('ssri', 'salicylate'),
+    ('serotonergic', 'serotonergic'),
+    ('maoi', 'decongestant'),
+    ('ace inhibitor', 'nsaid'),
+    ('angiotensin receptor blocker', 'nsaid'),
+    ('lithium', 'nsaid'),
+    ('methotrexate', 'nsaid'),
+    ('methotrexate', 'salicylate'),
+    ('corticosteroid', 'nsaid'),
+    ('thyroid hormone', 'antacid'),
+)
+
+# Ingredients prioritised for severe symptoms
+SEVERE_SYMPTOM_INGREDIENTS = ('ibuprofen',)
+
+# Severity (1-10) above which SEVERE_SYMPTOM_INGREDIENTS are prioritised
+SEVERE_SYMPTOM_THRESHOLD = 7
+
+# Symptom durations, as offered by app.py, that should be checked by a doctor
+LONG_DURATIONS = frozenset({'more than a week'})
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_additional_info(additional_info):
+    """
+    Check that the answers refine() reads have the types app.py sends
+
+    Args:
+        additional_info (dict): duration, severity, conditions and medications answers
+
+    Raises:
+        ValueError: Naming the first field with a wrong type
+    """
+    if not isinstance(additional_info, dict):
+        raise ValueError("'additional_info' must be an object")
+    severity = additional_info.get('severity')
+    if severity is not None and not _is_number(severity):
+        raise ValueError("'severity' must be a number")
+    conditions = additional_info.get('conditions')
+    if conditions is not None and not (isinstance(conditions, list) and all(isinstance(c, str) for c in conditions)):
+        raise ValueError("'conditions' must be a list of strings")
+    for field in ('duration', 'medications'):
+        if additional_info.get(field) is not None and not isinstance(additional_info[field], str):
+            raise ValueError(f"'{field}' must be a string")
+
+
+class ContraindicationEngine:
+    """
+    Filters candidate medicines with precomputed contraindication matrices
+    """
+    def __init__(self, medicines, ingredients=INGREDIENTS, condition_contraindications=CONDITION_CONTRAINDICATIONS,
+                 interactions=INTERACTIONS):
+        """
+        Args:
+            medicines (tuple): Catalogue of Medicine objects, indexed by id, None for removed ones
+            ingredients (dict): Ingredient to (classes, other names), see INGREDIENTS
+            condition_contraindications (dict): Patient condition to ruled out ingredients or classes
+            interactions (tuple): Pairs of ingredients or classes that must not be combined
+        """
+        self.ingredients = list(ingredients)
+        ingredient_ids = {name: i for i, name in enumerate(self.ingredients)}
+
+        # Every name or synonym, as a tuple of words, maps to an ingredient id
+        self._names = {}
+        for name, (_, synonyms) in ingredients.items():
+            for alias in (name,) + tuple(synonyms):
+                self._names[tokenize(alias).words] = ingredient_ids[name]
+        self._max_name_words = max((len(words) for words in self._names), default=0)
+
+        # A rule term is either an ingredient or a class standing for all its ingredients
+        members = {}
+        for name, (classes, _) in ingredients.items():
+            members.setdefault(name, set()).add(ingredient_ids[name])
+            for drug_class in classes:
+                members.setdefault(drug_class, set()).add(ingredient_ids[name])
+
+        def resolve(term):
+            return sorted(members.get(term, ()))
+
+        # Medicine x ingredient: which active ingredients each catalogue medicine contains
+        n_ingredients = len(self.ingredients)
+        contains = np.zeros((len(medicines), n_ingredients), dtype=bool)
+        for medicine in medicines:
+            # Removed medicines leave None at their id
+            if medicine is not None:
+                contains[medicine.id, self.parse_ingredients(medicine.name)] = True
+
+        # Ingredient x ingredient: pairs that interact, including an ingredient with itself
+        interacts = np.eye(n_ingredients, dtype=bool)
+        for first, second in interactions:
+            for a in resolve(first):
+                interacts[a, resolve(second)] = True
+                interacts[resolve(second), a] = True
+
+        # Medicine x current ingredient: whether the medicine clashes with something already taken
+        self.interaction_matrix = (contains.astype(np.int32) @ interacts.astype(np.int32)) > 0
+
+        # Medicine x patient condition: whether the condition rules the medicine out
+        self.patient_conditions = {name.casefold(): i for i, name in enumerate(condition_contraindications)}
+        ruled_out = np.zeros((n_ingredients, len(self.patient_conditions)), dtype=bool)
+        for name, terms in condition_contraindications.items():
+            for term in terms:
+                ruled_out[resolve(term), self.patient_conditions[name.casefold()]] = True
+        self.patient_condition_matrix = (contains.astype(np.int32) @ ruled_out.astype(np.int32)) > 0
+
+        self.severe_priority = contains[:, [ingredient_ids[n] for n in SEVERE_SYMPTOM_INGREDIENTS
+                                            if n in ingredient_ids]].any(axis=1)
+
+    def parse_ingredients(self, text):
+        """
+        Find the known ingredients mentioned in free text, e.g. a current medications answer
+
+        Returns:
+            list: Ingredient ids, in the order they are first mentioned
+        """
+        words = tokenize(text).words
+        found = []
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + self._max_name_words, len(words)) + 1):
+                ingredient = self._names.get(words[start:end])
+                if ingredient is not None and ingredient not in found:
+                    found.append(ingredient)
+        return found
+
+    def refine(self, medicine_ids, additional_info):
+        """
+        Drop contraindicated medicines and work out priorities and flags
+
+        Args:
+            medicine_ids (list): Candidate medicine ids, in display order
+            additional_info (dict): duration, severity, conditions and medications answers
+
+        Returns:
+            tuple: (medicine ids to recommend, frozenset of ids to prioritise, frozenset of flags)
+        """
+        flags = set()
+        duration = additional_info.get('duration')
+        if isinstance(duration, str) and duration.casefold() in LONG_DURATIONS:
+            flags.add('long_duration')
+
+        if not medicine_ids:
+            return medicine_ids, frozenset(), frozenset(flags)
+
+        ids = np.asarray(medicine_ids, dtype=np.intp)
+        blocked = np.zeros(len(ids), dtype=bool)
+
+        condition_columns = [
+            self.patient_conditions[name.casefold()]
+            for name in additional_info.get('conditions') or ()
+            if isinstance(name, str) and name.casefold() in self.patient_conditions
+        ]
+        if condition_columns:
+            blocked |= self.patient_condition_matrix[np.ix_(ids, condition_columns)].any(axis=1)
+
+        medications = additional_info.get('medications')
+        ingredient_columns = self.parse_ingredients(medications) if isinstance(medications, str) else []
+        if ingredient_columns:
+            blocked |= self.interaction_matrix[np.ix_(ids, ingredient_columns)].any(axis=1)
+
+        if blocked.any():
+            flags.add('contraindications_removed')
+            ids = ids[~blocked]
+
+        priority_ids = frozenset()
+        severity = additional_info.get('severity')
+        if _is_number(severity) and severity > SEVERE_SYMPTOM_THRESHOLD:
+            priority_ids = frozenset(ids[self.severe_priority[ids]].tolist())
+
+        return ids.tolist(), priority_ids, frozenset(flags)
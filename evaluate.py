@@ -0,0 +1,298 @@
+"""
+Replay a labelled symptom corpus and sweep the matching cut-offs.
+
+Every text is run through the recommender's own front-end and critical
+keyword check once, and the similarity of every remaining text to every
+condition is computed once as a matrix. Precision, recall and hit rate are
+then evaluated for a whole grid of similarity thresholds, top_k values and
+medicine thresholds with array operations on the ranked scores, instead of
+replaying the corpus per setting:
+
+    python evaluate.py corpus.jsonl
+    python evaluate.py corpus.jsonl --thresholds 0.05 0.1 0.2 --top-k 1 3 5 --output sweep.json
+    python evaluate.py --synthetic 2000 --conditions 1000 --typo-rate 0.1
+
+Corpus lines are JSON objects:
+
+    {"symptoms": "...", "conditions": ["Headache", 4], "is_critical": false}
+
+where conditions are the expected condition names or ids. Critical detection
+does not depend on the cut-offs, so its miss and false alarm rates are
+reported once. Each grid row also carries the mean search latency of the
+condition index at that setting, measured on a sample of the corpus, next to
+the per-stage replay latencies, so operating points can be picked for both
+accuracy and speed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from model import load_recommender
+
+DEFAULT_THRESHOLDS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5)
+DEFAULT_TOP_K = (1, 2, 3, 5)
+DEFAULT_MEDICINE_THRESHOLDS = (0.1, 0.2, 0.3)
+
+# Similarity rows are computed in chunks of at most this many scores
+SCORE_CHUNK_CELLS = 1 << 22
+
+
+def load_corpus(path):
+    """
+    Read a labelled corpus from a JSONL file
+
+    Returns:
+        list: Dicts with 'symptoms', 'conditions' and 'is_critical'
+    """
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not isinstance(item, dict) or not isinstance(item.get('symptoms'), str):
+                raise ValueError(f"{path}:{line_number}: each line needs a 'symptoms' string")
+            corpus.append({
+                'symptoms': item['symptoms'],
+                'conditions': list(item.get('conditions') or ()),
+                'is_critical': bool(item.get('is_critical', False))
+            })
+    return corpus
+
+
+def _resolve_labels(corpus, symptom_db):
+    """
+    Returns:
+        list: Set of expected condition ids per corpus item
+    """
+    ids = {c['id'] for c in symptom_db}
+    names = {c['condition'].casefold(): c['id'] for c in symptom_db}
+    labels = []
+    for item in corpus:
+        expected = set()
+        for condition in item['conditions']:
+            if isinstance(condition, str) and condition.casefold() in names:
+                expected.add(names[condition.casefold()])
+            elif isinstance(condition, int) and condition in ids:
+                expected.add(condition)
+            else:
+                raise ValueError(f"Unknown condition in corpus: {condition!r}")
+        labels.append(expected)
+    return labels
+
+
+def _ranked_scores(query_vectors, condition_matrix, max_k):
+    """
+    Score every query against every condition and keep the best max_k of each
+
+    Returns:
+        tuple: (rows, scores) arrays of shape (queries, max_k), best first and ties by row
+            like condition_index.top_rows(); missing entries have row -1 and score -inf
+    """
+    n_queries, n_conditions = query_vectors.shape[0], condition_matrix.shape[0]
+    k = min(max_k, n_conditions)
+    rows = np.full((n_queries, max_k), -1, dtype=np.int64)
+    scores = np.full((n_queries, max_k), -np.inf)
+    condition_matrix_t = condition_matrix.T.tocsc()
+    chunk = max(1, SCORE_CHUNK_CELLS // max(n_conditions, 1))
+    for start in range(0, n_queries, chunk):
+        block = (query_vectors[start:start + chunk] @ condition_matrix_t).toarray()
+        if k < n_conditions:
+            best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            best = np.broadcast_to(np.arange(n_conditions), (block.shape[0], n_conditions))
+        best_scores = np.take_along_axis(block, best, axis=1)
+        order = np.lexsort((best, -best_scores), axis=1)
+        rows[start:start + chunk, :k] = np.take_along_axis(best, order, axis=1)
+        scores[start:start + chunk, :k] = np.take_along_axis(best_scores, order, axis=1)
+    return rows, scores
+
+
+def sweep(rows, scores, relevant, n_relevant, thresholds, top_ks):
+    """
+    Evaluate every (threshold, top_k) pair at once from the ranked scores
+
+    Args:
+        rows (np.ndarray): Ranked condition rows per query, see _ranked_scores()
+        scores (np.ndarray): Their similarity scores
+        relevant (np.ndarray): Whether each ranked row is an expected condition
+        n_relevant (int): Number of expected conditions over all queries
+        thresholds (list): Similarity thresholds, a row matches when its score is strictly above
+        top_ks (list): Maximum numbers of matched conditions per query
+
+    Returns:
+        dict: (threshold, top_k) to precision, recall, hit rate and no-match rate
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    # above[t, q, r]: rank r of query q matches at threshold t; cumulative sums over the
+    # rank axis give the counts for every top_k at once
+    above = scores[None, :, :] > thresholds[:, None, None]
+    matched = np.cumsum(above, axis=2)
+    correct = np.cumsum(above & relevant[None, :, :], axis=2)
+
+    n_queries = rows.shape[0]
+    results = {}
+    for t, threshold in enumerate(thresholds.tolist()):
+        for top_k in top_ks:
+            column = min(top_k, rows.shape[1]) - 1
+            n_matched = int(matched[t, :, column].sum())
+            n_correct = int(correct[t, :, column].sum())
+            results[(threshold, top_k)] = {
+                'precision': n_correct / n_matched if n_matched else 1.0,
+                'recall': n_correct / n_relevant if n_relevant else 1.0,
+                'hit_rate': float((correct[t, :, column] > 0).mean()) if n_queries else 1.0,
+                'no_match_rate': float((matched[t, :, column] == 0).mean()) if n_queries else 0.0
+            }
+    return results
+
+
+def _search_latency(index, query_vectors, threshold, top_k):
+    start = time.perf_counter()
+    for i in range(query_vectors.shape[0]):
+        index.search(query_vectors[i], threshold, top_k)
+    return (time.perf_counter() - start) / max(query_vectors.shape[0], 1)
+
+
+def evaluate(recommender, corpus, thresholds=DEFAULT_THRESHOLDS, top_ks=DEFAULT_TOP_K,
+             medicine_thresholds=DEFAULT_MEDICINE_THRESHOLDS, latency_sample=200):
+    """
+    Replay a labelled corpus once and evaluate a grid of cut-offs
+
+    Args:
+        recommender (MedicineRecommender): Recommender to evaluate, its own cut-offs are ignored
+        corpus (list): Items from load_corpus()
+        thresholds (list): Similarity thresholds to sweep
+        top_ks (list): top_k values to sweep
+        medicine_thresholds (list): Medicine thresholds to sweep; a matched condition's
+            medicines are recommended when its score is also above this
+        latency_sample (int): Number of corpus texts used to time the index at each setting
+
+    Returns:
+        dict: 'summary' with critical detection and replay latencies, and 'grid' with
+            one row per (threshold, top_k, medicine_threshold)
+    """
+    state = recommender._state
+    labels = _resolve_labels(corpus, state.symptom_db)
+    critical_ids = {c['id'] for c in state.symptom_db if c['is_critical']}
+
+    # Front-end and critical check, per text exactly as recommend() runs them
+    start = time.perf_counter()
+    tokenized_texts = [recommender._tokenize(item['symptoms'], state) for item in corpus]
+    tokenize_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    flagged = [recommender._check_critical_match(tokenized, state) is not None for tokenized in tokenized_texts]
+    critical_seconds = time.perf_counter() - start
+
+    expected_critical = [item['is_critical'] or bool(expected & critical_ids) for item, expected in zip(corpus, labels)]
+    n_critical = sum(expected_critical)
+    missed = sum(expected and not hit for expected, hit in zip(expected_critical, flagged))
+    false_alarms = sum(hit and not expected for expected, hit in zip(expected_critical, flagged))
+
+    # Texts the critical path answers never reach similarity matching
+    pending = [i for i, hit in enumerate(flagged) if not hit]
+    start = time.perf_counter()
+    query_vectors = state.query_vectorizer.transform([tokenized_texts[i] for i in pending])
+    transform_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    max_k = max(top_ks)
+    rows, scores = _ranked_scores(query_vectors, state.condition_matrix, max_k)
+    score_seconds = time.perf_counter() - start
+
+    row_ids = np.array([c['id'] for c in state.condition_rows] + [-1])
+    ranked_ids = row_ids[rows]
+    relevant = np.array([
+        [condition_id in labels[i] for condition_id in ranked_ids[q]]
+        for q, i in enumerate(pending)
+    ], dtype=bool).reshape(rows.shape)
+    n_relevant = sum(len(labels[i] - critical_ids) for i in pending)
+
+    # Medicines need both cut-offs, so their metrics are the matching metrics at the higher one
+    all_thresholds = sorted(set(thresholds) | set(medicine_thresholds))
+    results = sweep(rows, scores, relevant, n_relevant, all_thresholds, top_ks)
+
+    sample = query_vectors[:latency_sample]
+    grid = []
+    for threshold in thresholds:
+        for top_k in top_ks:
+            latency = _search_latency(state.index, sample, threshold, top_k)
+            for medicine_threshold in medicine_thresholds:
+                match = results[(threshold, top_k)]
+                medicine = results[(max(threshold, medicine_threshold), top_k)]
+                grid.append({
+                    'similarity_threshold': threshold,
+                    'top_k': top_k,
+                    'medicine_threshold': medicine_threshold,
+                    'precision': match['precision'],
+                    'recall': match['recall'],
+                    'hit_rate': match['hit_rate'],
+                    'no_match_rate': match['no_match_rate'],
+                    'medicine_precision': medicine['precision'],
+                    'medicine_recall': medicine['recall'],
+                    'search_latency_us': latency * 1e6
+                })
+
+    n_items = max(len(corpus), 1)
+    return {
+        'summary': {
+            'items': len(corpus),
+            'critical_items': n_critical,
+            'critical_miss_rate': missed / n_critical if n_critical else 0.0,
+            'critical_false_alarm_rate': false_alarms / max(len(corpus) - n_critical, 1),
+            'index': type(state.index).__name__,
+            'latency_us': {
+                'tokenize': tokenize_seconds / n_items * 1e6,
+                'critical': critical_seconds / n_items * 1e6,
+                'transform': transform_seconds / max(len(pending), 1) * 1e6,
+                'score_all_conditions': score_seconds / max(len(pending), 1) * 1e6
+            }
+        },
+        'grid': grid
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a labelled corpus and sweep the matching cut-offs")
+    parser.add_argument('corpus', nargs='?', help="Labelled JSONL corpus")
+    parser.add_argument('--synthetic', type=int, metavar='ITEMS',
+                        help="Evaluate a generated corpus of this size on a synthetic catalogue instead")
+    parser.add_argument('--conditions', type=int, default=1000, help="Synthetic catalogue size")
+    parser.add_argument('--typo-rate', type=float, default=0.0, help="Synthetic corpus misspelling rate")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=list(DEFAULT_THRESHOLDS))
+    parser.add_argument('--top-k', type=int, nargs='+', default=list(DEFAULT_TOP_K))
+    parser.add_argument('--medicine-thresholds', type=float, nargs='+', default=list(DEFAULT_MEDICINE_THRESHOLDS))
+    parser.add_argument('--latency-sample', type=int, default=200)
+    parser.add_argument('--index', default='auto', help="Condition index to time, see condition_index.py")
+    parser.add_argument('--model-artifact', default=os.environ.get('MEDICINE_MODEL_ARTIFACT'))
+    parser.add_argument('--knowledge-base', default=os.environ.get('MEDICINE_KNOWLEDGE_BASE'))
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        from benchmarks.synthetic import make_labelled_corpus, make_symptom_db
+        from model import MedicineRecommender
+        recommender = MedicineRecommender(symptom_db=make_symptom_db(args.conditions), index=args.index)
+        corpus = make_labelled_corpus(recommender.symptom_db, args.synthetic, typo_rate=args.typo_rate, seed=1)
+    elif args.corpus:
+        recommender = load_recommender(artifact_path=args.model_artifact, knowledge_base_path=args.knowledge_base,
+                                       index=args.index)
+        corpus = load_corpus(args.corpus)
+    else:
+        parser.error("Give a corpus file or --synthetic")
+
+    report = evaluate(recommender, corpus, args.thresholds, args.top_k, args.medicine_thresholds,
+                      args.latency_sample)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Optional per-stage timing and counters for MedicineRecommender.
+
+Attach an Instrumentation to a recommender to time every stage of
+recommend() and recommend_many() into in-process histograms and count
+critical hits, no-match results and per-condition matches:
+
+    instrumentation = Instrumentation()
+    recommender = MedicineRecommender(instrumentation=instrumentation)
+    ...
+    print(instrumentation.to_prometheus())
+
+Results served from the result cache count as requests with the outcome
+they were computed with, and as cache hits, so match rates do not depend on
+the cache. A batch is timed per stage once and its time spread evenly over
+its requests.
+
+recommend() and recommend_many() share one pipeline whatever is attached;
+without an instrumentation its stage timer does nothing.
+"""
+import bisect
+import threading
+import time
+from collections import Counter
+
+# Stages of recommend(), in pipeline order
+STAGES = ('normalise', 'critical', 'transform', 'similarity', 'refine')
+
+# Histogram upper bounds in seconds, 1us to 10s in 1-2.5-5 steps
+DEFAULT_BUCKETS = tuple(
+    base * scale
+    for scale in (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+    for base in (1.0, 2.5, 5.0)
+) + (10.0,)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; observing a value is one bisect and two additions
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value, count=1):
+        self.counts[bisect.bisect_left(self.buckets, value)] += count
+        self.sum += value * count
+        self.count += count
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket containing it
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class StageTimer:
+    """
+    Times consecutive pipeline stages, each from the end of the one before
+    """
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+        self.clock = instrumentation.clock
+        self.last = self.clock()
+
+    def lap(self, stage, count=1):
+        """
+        Record the time since the previous lap as stage, spread over the count requests
+        that went through it together
+        """
+        now = self.clock()
+        self.instrumentation.observe(stage, (now - self.last) / count, count)
+        self.last = now
+
+
+class Instrumentation:
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        """
+        Args:
+            buckets (tuple): Histogram bucket upper bounds in seconds
+            clock (callable): Timer returning seconds, e.g. to plug in a different time source
+        """
+        self.clock = clock
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.stage_seconds = {stage: Histogram(buckets) for stage in STAGES}
+        self.requests = 0
+        self.cache_hits = 0
+        self.no_match = 0
+        self.critical_hits = Counter()
+        self.condition_matches = Counter()
+
+    def add_callback(self, callback):
+        """
+        Call callback(stage, seconds) after every timed stage, e.g. to forward to a tracer
+        """
+        self._callbacks.append(callback)
+
+    def observe(self, stage, seconds, count=1):
+        """
+        Record the time a stage took, per request when count requests went through it together
+        """
+        with self._lock:
+            histogram = self.stage_seconds.get(stage)
+            if histogram is None:
+                histogram = self.stage_seconds[stage] = Histogram(self._buckets)
+            histogram.observe(seconds, count)
+        for callback in self._callbacks:
+            callback(stage, seconds)
+
+    def stage_timer(self):
+        """
+        Returns:
+            StageTimer: Timer for the consecutive stages of one pass through the pipeline
+        """
+        return StageTimer(self)
+
+    def record_request(self, critical_condition=None, matched_conditions=(), cached=False):
+        """
+        Count the outcome of one request
+
+        Args:
+            critical_condition (dict): Critical condition that fired, if any
+            matched_conditions (list): (condition, score) tuples of a non-critical result
+            cached (bool): The result came from the result cache
+        """
+        with self._lock:
+            self.requests += 1
+            if cached:
+                self.cache_hits += 1
+            if critical_condition is not None:
+                self.critical_hits[critical_condition['condition']] += 1
+            elif not matched_conditions:
+                self.no_match += 1
+            for condition, _ in matched_conditions:
+                self.condition_matches[condition['condition']] += 1
+
+    def condition_match_rates(self):
+        """
+        Returns:
+            dict: Fraction of requests that matched each condition
+        """
+        with self._lock:
+            if not self.requests:
+                return {}
+            return {name: count / self.requests for name, count in self.condition_matches.items()}
+
+    def to_prometheus(self, prefix='medicine_recommender'):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text, ready to serve from a /metrics endpoint
+        """
+        lines = []
+        with self._lock:
+            name = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {name} Time spent in each recommend() stage")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in self.stage_seconds.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {prefix}_requests_total Requests scored by the recommender")
+            lines.append(f"# TYPE {prefix}_requests_total counter")
+            lines.append(f"{prefix}_requests_total {self.requests}")
+
+            lines.append(f"# HELP {prefix}_cache_hits_total Requests answered from the result cache")
+            lines.append(f"# TYPE {prefix}_cache_hits_total counter")
+            lines.append(f"{prefix}_cache_hits_total {self.cache_hits}")
+
+            lines.append(f"# HELP {prefix}_no_match_total Requests that matched no condition")
+            lines.append(f"# TYPE {prefix}_no_match_total counter")
+            lines.append(f"{prefix}_no_match_total {self.no_match}")
+
+            lines.append(f"# HELP {prefix}_critical_hits_total Requests that tripped a critical condition")
+            lines.append(f"# TYPE {prefix}_critical_hits_total counter")
+            for condition, count in sorted(self.critical_hits.items()):
+                lines.append(f'{prefix}_critical_hits_total{{condition="{_escape_label(condition)}"}} {count}')
+
+            lines.append(f"# HELP {prefix}_condition_matches_total Requests that matched each condition")
+            lines.append(f"# TYPE {prefix}_condition_matches_total counter")
+            for condition, count in sorted(self.condition_matches.items()):
+                lines.append(f'{prefix}_condition_matches_total{{condition="{_escape_label(condition)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
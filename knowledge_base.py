@@ -0,0 +1,229 @@
+"""
+On-disk knowledge base for the medicine recommender.
+
+The symptom/medicine catalogue is stored in a read-only SQLite file. Medicine
+records are interned (each distinct record is stored once) and every condition
+keeps a compact array of medicine ids. The file is opened immutable with
+memory-mapped I/O, so loading it reads straight from the page cache without
+locking or copying the file into SQLite's own buffers.
+
+Only the file pages are shared between processes. load_knowledge_base() builds
+the catalogue as Python objects and the model interns it again, so every
+process that loads the file holds its own copy in memory. To share the loaded
+model as well, load it once and fork the workers afterwards, as service.py does.
+
+Build a knowledge base from the built-in catalogue, and a fitted model
+artifact for it, with:
+
+    python knowledge_base.py build knowledge_base.sqlite
+    python knowledge_base.py fit model.pkl --knowledge-base knowledge_base.sqlite
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Medicine ids are stored as little-endian uint32 arrays
+MEDICINE_ID_DTYPE = np.dtype('<u4')
+
+# Large enough to map any realistic formulary in one go
+DEFAULT_MMAP_SIZE = 1 << 30
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE medicines (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    dosage TEXT NOT NULL,
+    description TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE conditions (
+    position INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL,
+    condition TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    medicine_ids BLOB NOT NULL,
+    recommendation TEXT NOT NULL,
+    is_critical INTEGER NOT NULL
+);
+"""
+
+MEDICINE_FIELDS = ('name', 'dosage', 'description', 'url')
+
+
+def compute_content_hash(symptom_db):
+    """
+    Hash the catalogue content, used to tie fitted model artifacts to a knowledge base
+
+    Returns:
+        str: Hex sha256 digest of the canonical JSON encoding of the symptom database
+    """
+    canonical = json.dumps(symptom_db, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def build_knowledge_base(symptom_db, path):
+    """
+    Write a symptom database to a knowledge base file
+
+    Args:
+        symptom_db (list): Conditions in the same format as MedicineRecommender.symptom_db
+        path (str): Output file, replaced if it already exists
+    """
+    # Intern medicine records so identical entries are stored once
+    medicine_ids = {}
+    conditions = []
+    for condition in symptom_db:
+        ids = []
+        for medicine in condition['medicines']:
+            record = tuple(medicine[field] for field in MEDICINE_FIELDS)
+            ids.append(medicine_ids.setdefault(record, len(medicine_ids)))
+        conditions.append((condition, np.asarray(ids, dtype=MEDICINE_ID_DTYPE)))
+
+    # Build next to the target and rename, so readers never see a half-written file
+    tmp_path = str(path) + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.execute("INSERT INTO meta VALUES ('content_hash', ?)", (compute_content_hash(symptom_db),))
+        conn.executemany(
+            "INSERT INTO medicines VALUES (?, ?, ?, ?, ?)",
+            ((medicine_id,) + record for record, medicine_id in medicine_ids.items())
+        )
+        conn.executemany(
+            "INSERT INTO conditions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    position,
+                    condition['id'],
+                    condition['condition'],
+                    json.dumps(condition['keywords']),
+                    ids.tobytes(),
+                    condition['recommendation'],
+                    int(condition['is_critical'])
+                )
+                for position, (condition, ids) in enumerate(conditions)
+            )
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+
+
+def _connect_read_only(path, mmap_size=DEFAULT_MMAP_SIZE):
+    """
+    Open a knowledge base file read-only with memory-mapped I/O and check its schema
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Knowledge base not found: {path}")
+
+    # immutable=1 skips locking and change detection, the file is never written in place
+    uri = Path(path).resolve().as_uri() + '?mode=ro&immutable=1'
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if version is None or int(version[0]) != SCHEMA_VERSION:
+        conn.close()
+        raise ValueError(f"Unsupported knowledge base schema in {path}")
+    return conn
+
+
+def load_knowledge_base(path, mmap_size=DEFAULT_MMAP_SIZE):
+    """
+    Load a knowledge base file into the symptom database format
+
+    Args:
+        path (str): Knowledge base file written by build_knowledge_base
+        mmap_size (int): Maximum number of bytes SQLite may memory-map
+
+    Returns:
+        list: Conditions in the same format as MedicineRecommender.symptom_db. Medicine
+            dicts are shared between conditions that reference the same record.
+    """
+    conn = _connect_read_only(path, mmap_size)
+    try:
+        medicines = {}
+        for row in conn.execute("SELECT id, name, dosage, description, url FROM medicines"):
+            medicines[row[0]] = dict(zip(MEDICINE_FIELDS, row[1:]))
+
+        symptom_db = []
+        rows = conn.execute(
+            "SELECT id, condition, keywords, medicine_ids, recommendation, is_critical "
+            "FROM conditions ORDER BY position"
+        )
+        for condition_id, name, keywords, ids, recommendation, is_critical in rows:
+            symptom_db.append({
+                'id': condition_id,
+                'condition': name,
+                'keywords': json.loads(keywords),
+                'medicines': [medicines[i] for i in np.frombuffer(ids, dtype=MEDICINE_ID_DTYPE).tolist()],
+                'recommendation': recommendation,
+                'is_critical': bool(is_critical)
+            })
+        return symptom_db
+    finally:
+        conn.close()
+
+
+def read_content_hash(path):
+    """
+    Read the content hash recorded when a knowledge base file was built,
+    without loading the catalogue itself
+    """
+    conn = _connect_read_only(path)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'content_hash'").fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise ValueError(f"Knowledge base {path} has no content hash, rebuild it")
+    return row[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the medicine recommender knowledge base")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Convert the built-in catalogue into a knowledge base file")
+    build_parser.add_argument('output', help="Path of the knowledge base file to write")
+
+    fit_parser = subparsers.add_parser('fit', help="Fit the recommender and save it as a model artifact")
+    fit_parser.add_argument('output', help="Path of the model artifact to write")
+    fit_parser.add_argument('--knowledge-base', help="Knowledge base file to fit on, defaults to the built-in catalogue")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        # Imported here so loading a knowledge base never needs the model module
+        from model import MedicineRecommender
+
+        symptom_db = MedicineRecommender._create_symptom_database()
+        build_knowledge_base(symptom_db, args.output)
+        print(f"Wrote {len(symptom_db)} conditions to {args.output}")
+    elif args.command == 'fit':
+        from model import MedicineRecommender
+
+        recommender = MedicineRecommender(knowledge_base_path=args.knowledge_base)
+        recommender.save(args.output)
+        print(f"Wrote model artifact for knowledge base {recommender.knowledge_base_hash[:12]} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Incremental as-you-type matching on top of MedicineRecommender.
+
+A LiveSession follows one text box. Every time the text changes it finds
+the words that changed, and only updates what those words touch:
+
+    n-gram counts       the n-grams of the changed words and of the few words
+                        around them that share an n-gram with them
+    similarity          one raw score per condition, adjusted by the
+                        postings of the n-grams whose count changed, plus the
+                        running squared norm of the query vector
+    critical keywords   the best keyword hit of each word position, only
+                        recomputed for positions whose keywords can reach
+                        the changed words
+
+so a keystroke costs about the same whether the text is five words long or
+five hundred. Tokenizing resumes from the last checkpoint before the edit,
+a word boundary between two letters that normalisation can never merge
+across, so typing at the end only rescans the last word or two.
+
+    session = LiveSession(recommender)
+    for text in ("head", "headache", "headache and fev", "headache and fever"):
+        suggestions = session.set_text(text)
+
+Suggestions carry the top conditions or the critical condition that fired,
+matching what recommend() would match for the same text up to rounding,
+in the session's locale when it has one (see locales.py). A session belongs to one user and is not thread-safe; sessions on the same
+recommender share everything else, and a knowledge base update makes the
+session start again from the new snapshot on its next edit.
+"""
+import bisect
+import math
+import re
+import threading
+import weakref
+
+import numpy as np
+
+from condition_index import top_rows
+from results import ConditionMatch, Suggestions
+from text_processing import TokenizedText, tokenize
+
+# Where tokenizing can restart: a letter that starts a word after whitespace following a
+# letter. Temperature normalisation only spans such a boundary in "degrees C", so no
+# checkpoint goes before a unit
+_CHECKPOINT = re.compile(r'(?<=[^\W\d_])\s+(?=[^\W\d_])(?!(?:c|f|celsius|fahrenheit)\b)', re.IGNORECASE)
+
+# Condition matrix of each model snapshot by term, shared by every session on it
+_postings = weakref.WeakKeyDictionary()
+_postings_lock = threading.Lock()
+
+
+def _term_postings(state):
+    """
+    Returns:
+        scipy.sparse.csc_matrix: The snapshot's condition matrix, column t holding term t's conditions
+    """
+    with _postings_lock:
+        postings = _postings.get(state)
+        if postings is None:
+            postings = _postings[state] = state.condition_matrix.tocsc()
+        return postings
+
+
+def _common_prefix(a, b):
+    """
+    Returns:
+        int: Length of the longest common prefix, found by bisecting on slice comparisons
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class LiveSession:
+    """
+    Keeps the matching state of one text box up to date one edit at a time
+    """
+    def __init__(self, recommender, locale=None):
+        """
+        Args:
+            recommender (MedicineRecommender): Shared recommender whose snapshot and options are used
+            locale (str): Language of the text, whose locale snapshot is used, see locales.py
+        """
+        self.recommender = recommender
+        self.locale = locale
+        self._reset(recommender._locale_state(locale))
+
+    def _reset(self, state):
+        self._state = state
+        self._postings = _term_postings(state)
+        self.text = ''
+
+        # Tokenizing can restart at these character offsets, which start these word indexes
+        self._checkpoint_offsets = [0]
+        self._checkpoint_words = [0]
+
+        # (word, separator, is a temperature reading) triples as tokenized, and the words
+        # after spelling correction
+        self._pairs = []
+        self._words = []
+        self._separators = []
+        self._readings = []
+
+        # Feature id to its count in the text, raw scores before L2 normalisation and
+        # the squared norm of the query vector
+        self._counts = {}
+        self._scores = np.zeros(state.condition_matrix.shape[0])
+        self._norm2 = 0.0
+
+        # Best critical hit starting at each word, and how many words have each condition as best
+        self._critical = []
+        self._critical_counts = {}
+
+    def set_text(self, text):
+        """
+        Replace the session text, updating only what the changed words touch
+
+        Returns:
+            Suggestions: Live matches for the new text
+        """
+        state = self.recommender._locale_state(self.locale)
+        if state is not self._state:
+            # The knowledge base changed, so every accumulator is rebuilt from the new snapshot
+            self._reset(state)
+
+        # Retokenize from the last checkpoint that the edit leaves in place
+        checkpoint = max(bisect.bisect_left(self._checkpoint_offsets, _common_prefix(self.text, text)) - 1, 0)
+        del self._checkpoint_offsets[checkpoint + 1:]
+        del self._checkpoint_words[checkpoint + 1:]
+        offset, word_index = self._checkpoint_offsets[checkpoint], self._checkpoint_words[checkpoint]
+        tail = text[offset:]
+        tokenized = tokenize(tail)
+        tail_pairs = [
+            (word, separator, i in tokenized.readings)
+            for i, (word, separator) in enumerate(zip(tokenized.words, tokenized.separators))
+        ]
+        if tail_pairs and word_index:
+            # Only whitespace separates a checkpoint from the word before it
+            tail_pairs[0] = (tail_pairs[0][0], ' ', tail_pairs[0][2])
+        self._add_checkpoint(tail, offset, word_index)
+
+        old = self._pairs
+        pairs = old[:word_index] + tail_pairs
+
+        # Only the words between the unchanged prefix and suffix need work
+        limit = min(len(old), len(pairs))
+        prefix = word_index
+        while prefix < limit and old[prefix] == pairs[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == pairs[-1 - suffix]:
+            suffix += 1
+
+        self._apply(prefix, len(old) - suffix, pairs[prefix:len(pairs) - suffix])
+        self._pairs = pairs
+        self.text = text
+        return self.suggestions()
+
+    def _add_checkpoint(self, tail, offset, word_index):
+        """
+        Remember the last word boundary of a freshly tokenized tail, so the next edit
+        after it only has to rescan from there
+        """
+        last = None
+        for last in _CHECKPOINT.finditer(tail):
+            pass
+        if last is not None:
+            self._checkpoint_offsets.append(offset + last.end())
+            self._checkpoint_words.append(word_index + len(tokenize(tail[:last.start()]).words))
+
+    def edit(self, start, end, replacement=''):
+        """
+        Apply a text delta: replace characters start to end with replacement
+
+        Returns:
+            Suggestions: Live matches for the edited text
+        """
+        return self.set_text(self.text[:start] + replacement + self.text[end:])
+
+    def _apply(self, start, old_end, new_pairs):
+        """
+        Replace words start to old_end with new_pairs and update every accumulator
+        """
+        state = self._state
+        new_words = [word for word, _, _ in new_pairs]
+        new_readings = [reading for _, _, reading in new_pairs]
+        if self.recommender.spelling_correction:
+            new_words = [state.spelling.correct_word(word) for word in new_words]
+
+        # N-grams around the change share the same context words before and after it, so
+        # counting the old and new windows and subtracting leaves exactly what changed
+        vectorizer = state.query_vectorizer
+        context = vectorizer.ngram_range[1] - 1
+        before = self._kept_words(range(start - 1, -1, -1), context)[::-1]
+        after = self._kept_words(range(old_end, len(self._words)), context)
+        delta = {}
+        old_middle = zip(self._words[start:old_end], self._readings[start:old_end])
+        for sign, middle in ((-1, old_middle), (1, zip(new_words, new_readings))):
+            # Temperature readings are left out of the query, as in QueryVectorizer
+            middle = [word for word, reading in middle if not reading]
+            for feature in vectorizer.features(before + middle + after):
+                index = vectorizer.vocabulary.get(feature)
+                if index is not None:
+                    delta[index] = delta.get(index, 0) + sign
+
+        self._words[start:old_end] = new_words
+        self._separators[start:old_end] = [separator for _, separator, _ in new_pairs]
+        self._readings[start:old_end] = new_readings
+        self._update_scores(delta)
+        self._update_critical(start, old_end, start + len(new_words))
+
+    def _kept_words(self, positions, limit):
+        """
+        Returns:
+            list: Up to limit words at the given positions that the vectorizer counts
+        """
+        stop_words = self._state.query_vectorizer.stop_words
+        kept = []
+        for position in positions:
+            if len(kept) == limit:
+                break
+            word = self._words[position]
+            if len(word) > 1 and word not in stop_words and not self._readings[position]:
+                kept.append(word)
+        return kept
+
+    def _update_scores(self, delta):
+        idf = self._state.query_vectorizer.idf
+        postings = self._postings
+        for index, change in delta.items():
+            if change == 0:
+                continue
+            old_count = self._counts.get(index, 0)
+            new_count = old_count + change
+            if new_count:
+                self._counts[index] = new_count
+            else:
+                del self._counts[index]
+            self._norm2 += (new_count * new_count - old_count * old_count) * idf[index] * idf[index]
+
+            # Only the conditions that use the term move
+            start, end = postings.indptr[index], postings.indptr[index + 1]
+            self._scores[postings.indices[start:end]] += change * idf[index] * postings.data[start:end]
+
+        if not self._counts:
+            # Nothing left to match, so rounding errors of past edits are dropped as well
+            self._scores[:] = 0.0
+            self._norm2 = 0.0
+
+    def _update_critical(self, start, old_end, new_end):
+        """
+        Recompute the critical hits of every word whose keywords can reach the changed words
+        """
+        matcher = self._state.critical_matcher
+        first = max(0, start - max(matcher.max_words, 1) + 1)
+        tokenized = TokenizedText(tuple(self._words), tuple(self._separators))
+
+        for hit in self._critical[first:old_end]:
+            if hit is not None:
+                self._critical_counts[hit[0]] -= 1
+                if not self._critical_counts[hit[0]]:
+                    del self._critical_counts[hit[0]]
+
+        fresh = [matcher.best_at(tokenized, position) for position in range(first, new_end)]
+        self._critical[first:old_end] = fresh
+        for hit in fresh:
+            if hit is not None:
+                self._critical_counts[hit[0]] = self._critical_counts.get(hit[0], 0) + 1
+
+    def suggestions(self):
+        """
+        Returns:
+            Suggestions: The critical condition that fired, else the best matching conditions
+        """
+        state = self._state
+        if self._critical_counts:
+            # Like recommend(), the highest precedence condition wins and reports its first keyword
+            position = min(self._critical_counts)
+            keyword = next(hit[1] for hit in self._critical if hit is not None and hit[0] == position)
+            return Suggestions(
+                critical_condition=state.critical_matcher.conditions[position]['condition'],
+                critical_keyword=keyword
+            )
+
+        if self._norm2 <= 0.0:
+            return Suggestions()
+        recommender = self.recommender
+        rows, scores = top_rows(self._scores / math.sqrt(self._norm2), recommender.similarity_threshold,
+                                recommender.top_k)
+        return Suggestions(tuple(
+            ConditionMatch(condition['id'], condition['condition'], score)
+            for condition, score in recommender._matched_conditions(rows, scores, state)
+        ))
+
+    def recommend(self, additional_info=None):
+        """
+        Full recommendation for the current text, e.g. once the user submits it
+
+        Returns:
+            Recommendation: Same as MedicineRecommender.recommend()
+        """
+        return self.recommender.recommend(self.text, additional_info, locale=self.locale)
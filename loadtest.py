@@ -0,0 +1,108 @@
+"""
+Local load-test harness for the HTTP service in service.py.
+
+Start the service, then run for example:
+
+    python loadtest.py --url http://127.0.0.1:8000 --requests 20000 --concurrency 64
+    python loadtest.py --url http://127.0.0.1:8000 --batch-size 100
+"""
+import argparse
+import http.client
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+SAMPLE_SYMPTOMS = [
+    "I have a headache and fever",
+    "runny nose and sneezing since yesterday",
+    "stomach ache and bloating after meals",
+    "knee pain and stiffness in the morning",
+    "itchy eyes and a rash",
+    "sore throat and cough",
+    "chest pain and shortness of breath",
+    "feeling hot with chills",
+    "back pain after lifting boxes",
+    "tired and not sure what is wrong"
+]
+
+
+def _payload(batch_size, rng):
+    if batch_size:
+        items = [{'symptoms': rng.choice(SAMPLE_SYMPTOMS)} for _ in range(batch_size)]
+        return '/recommend/batch', json.dumps({'items': items})
+    return '/recommend', json.dumps({'symptoms': rng.choice(SAMPLE_SYMPTOMS)})
+
+
+def run_load_test(url, requests=10000, concurrency=32, batch_size=0, seed=0):
+    """
+    Send requests from a pool of threads and measure latency and throughput
+
+    Args:
+        url (str): Base URL of the service
+        requests (int): Total number of HTTP requests to send
+        concurrency (int): Number of concurrent client threads
+        batch_size (int): Items per request against /recommend/batch, 0 uses /recommend
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and error count
+    """
+    parts = urlsplit(url)
+    latencies = []
+    errors = []
+
+    def send(i):
+        rng = random.Random(seed + i)
+        path, body = _payload(batch_size, rng)
+        start = time.perf_counter()
+        try:
+            # wsgiref speaks HTTP/1.0, so use a fresh connection per request
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            conn.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                errors.append(response.status)
+                return
+        except OSError as e:
+            errors.append(str(e))
+            return
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0.0, 0.0, 0.0)
+    return {
+        'requests': requests,
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed,
+        'items_per_second': requests * max(batch_size, 1) / elapsed,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the medicine recommendation service")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help="Items per request against /recommend/batch, 0 uses /recommend")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run_load_test(args.url, args.requests, args.concurrency, args.batch_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
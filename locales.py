@@ -0,0 +1,140 @@
+"""
+Locale packs: condition keywords and stop words in other languages.
+
+The built-in catalogue and knowledge base files are English. A locale pack
+maps the same condition ids onto keywords, and optionally names and
+recommendations, in another language. Medicines are not part of a pack, so
+every locale recommends from the one shared medicine catalogue. Packs are
+JSON files named after their locale, e.g. locales/es.json:
+
+    {
+        "locale": "es",
+        "stop_words": ["de", "la", ...],
+        "no_match": "No he podido identificar sus síntomas...",
+        "conditions": {
+            "1": {"keywords": ["dolor de cabeza", ...], "condition": "...", "recommendation": "..."},
+            ...
+        }
+    }
+
+Conditions a pack leaves out keep their English keywords. Critical
+conditions always keep them next to the localised ones, so "heart attack"
+is an emergency in every locale. MedicineRecommender loads a
+pack and fits its model snapshot on the first request for that locale.
+
+A locale may also have a word list, e.g. locales/en.words, of correctly
+spelt words that spelling correction must not turn into keyword words.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+
+# Requests without a locale, or with this one, use the knowledge base as it is
+DEFAULT_LOCALE = 'en'
+
+# Where packs are looked up unless the recommender is given another directory
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+
+# Locale names double as file names, so anything but a plain tag is refused
+_LOCALE_NAME = re.compile(r'^[A-Za-z]{2,3}(?:[-_][A-Za-z0-9]{2,8})*$')
+
+# Fields a pack may override per condition
+_LOCALISED_FIELDS = ('condition', 'keywords', 'recommendation')
+
+
+class UnknownLocaleError(ValueError):
+    pass
+
+
+def available_locales(directory=LOCALE_DIR):
+    """
+    Returns:
+        list: Locales with a pack in the directory, plus the default locale
+    """
+    locales = {DEFAULT_LOCALE}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            stem, extension = os.path.splitext(name)
+            if extension == '.json' and _LOCALE_NAME.match(stem):
+                locales.add(stem)
+    return sorted(locales)
+
+
+def load_locale_pack(locale, directory=LOCALE_DIR):
+    """
+    Read and check a locale pack
+
+    Args:
+        locale (str): Locale name, e.g. 'es' or 'pt-BR'
+        directory (str): Directory holding the <locale>.json packs
+
+    Returns:
+        dict: 'locale', 'stop_words' (list, or None for no stop words), 'no_match' (reply
+            when nothing matches, or None for the English one) and 'conditions' (condition id
+            to its localised fields)
+    """
+    if not isinstance(locale, str) or not _LOCALE_NAME.match(locale):
+        raise UnknownLocaleError(f"Invalid locale: {locale!r}")
+    path = os.path.join(directory, f"{locale}.json")
+    if not os.path.isfile(path):
+        raise UnknownLocaleError(f"No locale pack for {locale!r}")
+    with open(path, encoding='utf-8') as f:
+        pack = json.load(f)
+
+    conditions = {}
+    for cond_id, fields in (pack.get('conditions') or {}).items():
+        unknown = set(fields) - set(_LOCALISED_FIELDS)
+        if unknown:
+            raise ValueError(f"Locale pack {path}: unsupported fields {sorted(unknown)} for condition {cond_id}")
+        if 'keywords' in fields and not all(isinstance(k, str) and k.strip() for k in fields['keywords']):
+            raise ValueError(f"Locale pack {path}: condition {cond_id} has empty keywords")
+        conditions[int(cond_id)] = fields
+    return {
+        'locale': locale,
+        'stop_words': pack.get('stop_words'),
+        'no_match': pack.get('no_match'),
+        'conditions': conditions
+    }
+
+
+@lru_cache(maxsize=None)
+def load_lexicon(locale=DEFAULT_LOCALE, directory=LOCALE_DIR):
+    """
+    Read a locale's word list, one word per line with # comments
+
+    Returns:
+        frozenset: The words, empty when the locale has no list
+    """
+    if not _LOCALE_NAME.match(locale):
+        raise UnknownLocaleError(f"Invalid locale: {locale!r}")
+    path = os.path.join(directory, f"{locale}.words")
+    if not os.path.isfile(path):
+        return frozenset()
+    with open(path, encoding='utf-8') as f:
+        return frozenset(
+            line.strip().casefold() for line in f if line.strip() and not line.lstrip().startswith('#')
+        )
+
+
+def localise_symptom_db(symptom_db, pack):
+    """
+    Apply a locale pack to a catalogue
+
+    Returns:
+        list: Copies of the conditions with the pack's fields, in the same order and with
+            the same ids and medicines; critical conditions keep their original keywords too
+    """
+    localised = []
+    for condition in symptom_db:
+        fields = pack['conditions'].get(condition['id'])
+        if fields:
+            original_keywords = condition['keywords']
+            condition = dict(condition)
+            condition.update({field: fields[field] for field in _LOCALISED_FIELDS if field in fields})
+            if condition['is_critical']:
+                # Emergency keywords are often written in English whatever the locale
+                keywords = list(condition['keywords'])
+                condition['keywords'] = keywords + [k for k in original_keywords if k not in keywords]
+        localised.append(condition)
+    return localised
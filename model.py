@@ -1,33 +1,798 @@
-import numpy as np
-import pandas as pd
-import re
+import os
 import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from functools import cached_property
+from scipy import sparse
+from result_cache import RecommendationCache, make_cache_key
+from results import ConditionMatch, Explanation, Medicine, Recommendation
+from condition_index import build_index
+from contraindications import ContraindicationEngine
+from knowledge_base import compute_content_hash, load_knowledge_base, read_content_hash
+from locales import DEFAULT_LOCALE, LOCALE_DIR, load_lexicon, load_locale_pack, localise_symptom_db
+from spelling import SpellingCorrector, keyword_words
+from text_processing import QueryVectorizer, normalise_text, tokenize
 
-class MedicineRecommender:
-    def __init__(self):
-        # Initialize the symptom database
-        self.symptom_db = self._create_symptom_database()
+
+class CriticalMatcher:
+    """
+    Finds critical keywords in tokenized symptom text with one walk over its
+    words instead of one re.search per keyword
+    """
+    def __init__(self, conditions):
+        """
+        Args:
+            conditions (list): Critical conditions, in the order they should take precedence
+        """
+        self.conditions = conditions
         
-        # Initialize the TF-IDF vectorizer for text analysis
-        self.vectorizer = TfidfVectorizer(
-            lowercase=True,
-            stop_words='english',
-            ngram_range=(1, 2),
-            max_features=5000
+        # Keywords live in a word trie: the root is keyed by a keyword's first word,
+        # deeper levels by (separator, word), and None holds the hits of keywords ending there
+        self._trie = {}
+        for position, condition in enumerate(conditions):
+            for keyword in condition['keywords']:
+                tokenized = tokenize(keyword)
+                if not tokenized.words:
+                    continue
+                node = self._trie.setdefault(tokenized.words[0], {})
+                for separator, word in zip(tokenized.separators[1:], tokenized.words[1:]):
+                    node = node.setdefault((separator, word), {})
+                
+                # Conditions are visited in precedence order, so every hit list stays sorted
+                hits = node.setdefault(None, [])
+                hit = (position, keyword.lower())
+                if hit not in hits:
+                    hits.append(hit)
+    
+    def _hits_at(self, tokenized, start):
+        """
+        Yield the hit lists of every keyword that starts at word index start
+        """
+        words, separators = tokenized.words, tokenized.separators
+        node = self._trie.get(words[start])
+        index = start + 1
+        while node is not None:
+            hits = node.get(None)
+            if hits:
+                yield hits
+            if index == len(words):
+                break
+            node = node.get((separators[index], words[index]))
+            index += 1
+    
+    @cached_property
+    def max_words(self):
+        """
+        Returns:
+            int: Number of words in the longest keyword, i.e. how far a match can reach
+        """
+        depth = 0
+        level = list(self._trie.values())
+        while level:
+            depth += 1
+            level = [child for node in level for key, child in node.items() if key is not None]
+        return depth
+    
+    def best_at(self, tokenized, start):
+        """
+        Returns:
+            tuple: Highest precedence (position, keyword) hit of the keywords starting at word
+                index start, or None
+        """
+        best = None
+        for hit_list in self._hits_at(tokenized, start):
+            if best is None or hit_list[0][0] < best[0]:
+                best = hit_list[0]
+        return best
+    
+    def find_all(self, tokenized):
+        """
+        Find every critical keyword hit in one pass over the words
+        
+        Args:
+            tokenized (TokenizedText): Symptom description from text_processing.tokenize()
+            
+        Returns:
+            list: (condition, keyword) tuples in the order they appear in the text
+        """
+        hits = []
+        for start in range(len(tokenized.words)):
+            # Keywords starting at the same word are reported in precedence order
+            hits_here = sorted(hit for hit_list in self._hits_at(tokenized, start) for hit in hit_list)
+            hits.extend((self.conditions[position], keyword) for position, keyword in hits_here)
+        return hits
+    
+    def first_match(self, tokenized):
+        """
+        Find the highest precedence critical condition mentioned in the text
+        
+        Returns:
+            tuple: (condition, keyword) for the condition that fired, or None
+        """
+        best = None
+        for start in range(len(tokenized.words)):
+            for hit_list in self._hits_at(tokenized, start):
+                # Hit lists are sorted by precedence, so the first hit is the best of its keyword
+                hit = hit_list[0]
+                if best is None or hit[0] < best[0]:
+                    best = hit
+                    if best[0] == 0:
+                        return self.conditions[0], best[1]
+        if best is None:
+            return None
+        return self.conditions[best[0]], best[1]
+
+
+class ModelState:
+    """
+    Snapshot of the fitted model that requests read from
+    
+    A published snapshot is never modified. Knowledge base updates build a new
+    snapshot that shares every unchanged part with the current one and swap it
+    in with a single assignment, so in-flight requests keep a consistent view
+    and readers never take a lock.
+    """
+    def __init__(self, symptom_db, query_vectorizer, knowledge_base_hash=None):
+        """
+        Args:
+            symptom_db (list): Conditions in the symptom_db format
+            query_vectorizer (QueryVectorizer): TF-IDF statistics fitted on the keywords
+            knowledge_base_hash (str): Content hash of symptom_db, computed on first use when omitted
+        """
+        self.symptom_db = symptom_db
+        self._knowledge_base_hash = knowledge_base_hash
+        
+        # Vectorises requests and conditions from their tokenized text, see text_processing.py
+        self.query_vectorizer = query_vectorizer
+        
+        # Condition index over condition_matrix, built by the recommender from its runtime options
+        self.index = None
+        
+        # Drift since the vectorizer was fitted, see drift()
+        self.fitted_conditions = len(symptom_db)
+        self.changed_conditions = 0
+        self.unknown_terms = frozenset()
+        
+        # Critical and no-match responses are the same for every request
+        self.no_match_result = Recommendation(
+            "I couldn't identify your symptoms clearly. Please provide more details or consult a healthcare professional for proper diagnosis.",
+            False
         )
+    
+    @classmethod
+    def fit(cls, symptom_db, knowledge_base_hash=None, stop_words='english', catalogue=None, lexicon=None,
+            previous=None):
+        """
+        Fit the vectorizer on every keyword and precompute everything requests need
+        
+        Args:
+            symptom_db (list): Conditions in the symptom_db format
+            knowledge_base_hash (str): Content hash of symptom_db, computed on first use when omitted
+            stop_words (str or list): Stop words of the keyword language, 'english' or a list of words
+            catalogue (ModelState): Snapshot whose medicine catalogue is shared instead of
+                interning a new one, e.g. the English snapshot for a locale, see locales.py
+            lexicon (frozenset): Correctly spelt words spelling correction leaves alone, the
+                English word list when omitted
+            previous (ModelState): Snapshot being refitted, whose medicines keep their ids
+            
+        Returns:
+            ModelState: New snapshot without a condition index
+        """
+        vectorizer = cls.new_vectorizer(stop_words)
         
         # Fit the vectorizer on our symptom keywords
         all_keywords = []
-        for condition in self.symptom_db:
+        for condition in symptom_db:
             all_keywords.extend(condition['keywords'])
-        self.vectorizer.fit_transform(all_keywords)
+        vectorizer.fit_transform(all_keywords)
+        
+        # Only the fitted statistics are kept, not the scikit-learn object
+        state = cls(symptom_db, QueryVectorizer(vectorizer), knowledge_base_hash)
+        
+        # Freeze the medicine catalogue that results refer to by id
+        if catalogue is None:
+            state._build_catalogue(previous)
+        else:
+            state._share_catalogue(catalogue)
+        
+        # Precompute the condition matrix once; only knowledge base updates change it
+        state._build_condition_matrix()
+        
+        # Compile every critical keyword into one matcher
+        state.critical_matcher = CriticalMatcher([c for c in symptom_db if c['is_critical']])
+        
+        # Misspelt words are corrected to keyword words before either matching stage
+        if lexicon is None:
+            lexicon = load_lexicon(DEFAULT_LOCALE)
+        state.spelling = SpellingCorrector.from_conditions(
+            symptom_db, state.query_vectorizer.stop_words, lexicon=lexicon
+        )
+        return state
+    
+    @staticmethod
+    def new_vectorizer(stop_words='english'):
+        """
+        Args:
+            stop_words (str or list): Stop words of the keyword language, 'english' or a list of words
+            
+        Returns:
+            TfidfVectorizer: Unfitted vectorizer with the settings the model is fitted with
+        """
+        # scikit-learn is only needed to fit, so loading an artifact never imports it
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
+        # Keywords are normalised the same way as request text so both produce the same terms
+        return TfidfVectorizer(
+            preprocessor=normalise_text,
+            stop_words=stop_words,
+            ngram_range=(1, 2),
+            max_features=5000
+        )
+    
+    @property
+    def knowledge_base_hash(self):
+        # Hashing the whole catalogue is only needed to save or check artifacts, so
+        # updated snapshots compute it on first use instead of on every update
+        if self._knowledge_base_hash is None:
+            self._knowledge_base_hash = compute_content_hash(self.symptom_db)
+        return self._knowledge_base_hash
+    
+    def __getstate__(self):
+        # The index depends on runtime options and is rebuilt after loading
+        state = self.__dict__.copy()
+        state['index'] = None
+        return state
+    
+    def _build_catalogue(self, previous=None):
+        """
+        Intern every medicine into a frozen catalogue and prebuild the results that
+        never vary, so answering a request allocates almost nothing
+        
+        Args:
+            previous (ModelState): Snapshot whose medicine ids are kept, see _freeze_catalogue()
+        """
+        self._medicine_ids = dict(previous._medicine_ids) if previous is not None else {}
+        medicines = list(previous.medicines) if previous is not None else []
+        self.condition_medicine_ids = {}
+        self.critical_results = {}
+        for condition in self.symptom_db:
+            self._add_to_catalogue(condition, medicines)
+        self._freeze_catalogue(medicines)
+        self.contraindications = ContraindicationEngine(self.medicines)
     
-    def _create_symptom_database(self):
+    def _share_catalogue(self, catalogue):
         """
-        Create a database of symptoms, conditions, and recommended medicines.
-        In a production environment, this would be loaded from a proper database.
+        Use another snapshot's medicines for the same condition ids, only the critical
+        responses follow this snapshot's wording
+        """
+        self._medicine_ids = catalogue._medicine_ids
+        self.medicines = catalogue.medicines
+        self.condition_medicine_ids = catalogue.condition_medicine_ids
+        self.contraindications = catalogue.contraindications
+        self.critical_results = {
+            c['id']: Recommendation(c['recommendation'], True) for c in self.symptom_db if c['is_critical']
+        }
+    
+    def _add_to_catalogue(self, condition, medicines):
+        """
+        Intern one condition's medicines, appending new ones to the medicines list
+        """
+        ids = []
+        for medicine in condition['medicines']:
+            record = (medicine['name'], medicine['dosage'], medicine['description'], medicine['url'])
+            if record not in self._medicine_ids:
+                self._medicine_ids[record] = len(medicines)
+                medicines.append(Medicine(len(medicines), *record))
+            ids.append(self._medicine_ids[record])
+        self.condition_medicine_ids[condition['id']] = tuple(ids)
+        if condition['is_critical']:
+            self.critical_results[condition['id']] = Recommendation(condition['recommendation'], True)
+    
+    def _freeze_catalogue(self, medicines):
+        """
+        Freeze the medicines list, tombstoning medicines no condition recommends any more
+        
+        A medicine keeps its id for as long as it is recommended, through updates and
+        refits alike, so ids held by clients or cached results never point at another
+        medicine. Removed medicines leave None at their id, which is never reused.
+        """
+        recommended = set()
+        for ids in self.condition_medicine_ids.values():
+            recommended.update(ids)
+        for record, medicine_id in list(self._medicine_ids.items()):
+            if medicine_id not in recommended:
+                del self._medicine_ids[record]
+                medicines[medicine_id] = None
+        self.medicines = tuple(medicines)
+    
+    def _build_condition_matrix(self):
+        """
+        Build a single L2-normalised sparse matrix with one row per non-critical
+        condition, so a query can be scored with one sparse mat-vec
+        """
+        # Row i of the matrix corresponds to self.condition_rows[i]
+        self.condition_rows = [c for c in self.symptom_db if not c['is_critical']]
+        self.condition_matrix = self._vectorize_conditions(self.condition_rows)
+    
+    def _vectorize_conditions(self, conditions):
+        condition_texts = [tokenize(' '.join(c['keywords'])) for c in conditions]
+        
+        # Rows are L2-normalised so a dot product with a normalised query is the cosine similarity
+        return self.query_vectorizer.transform(condition_texts)
+    
+    def with_conditions(self, changes):
+        """
+        Build the snapshot that results from adding, replacing or removing conditions
+        
+        Only the matrix rows of conditions whose keywords changed are vectorised again,
+        and the critical matcher is only recompiled when a critical condition changed.
+        
+        Args:
+            changes (dict): Condition id to the new condition, or to None to remove it
+            
+        Returns:
+            ModelState: New snapshot, this one is left untouched
+        """
+        state = ModelState.__new__(ModelState)
+        state.__dict__.update(self.__dict__)
+        state._knowledge_base_hash = None
+        
+        previous = {c['id']: c for c in self.symptom_db if c['id'] in changes}
+        symptom_db = [changes.get(c['id'], c) for c in self.symptom_db]
+        symptom_db.extend(c for cond_id, c in changes.items() if cond_id not in previous)
+        state.symptom_db = [c for c in symptom_db if c is not None]
+        
+        # Re-intern the changed conditions; ids of medicines still recommended stay valid
+        state._medicine_ids = dict(self._medicine_ids)
+        state.condition_medicine_ids = dict(self.condition_medicine_ids)
+        state.critical_results = dict(self.critical_results)
+        medicines = list(self.medicines)
+        for cond_id, condition in changes.items():
+            state.condition_medicine_ids.pop(cond_id, None)
+            state.critical_results.pop(cond_id, None)
+            if condition is not None:
+                state._add_to_catalogue(condition, medicines)
+        state._freeze_catalogue(medicines)
+        if len(state.medicines) != len(self.medicines):
+            state.contraindications = ContraindicationEngine(state.medicines)
+        
+        touched = [c for c in list(previous.values()) + list(changes.values()) if c is not None]
+        if any(c['is_critical'] for c in touched):
+            state.critical_matcher = CriticalMatcher([c for c in state.symptom_db if c['is_critical']])
+        
+        # Keyword edits count towards drift, medicine or wording edits do not
+        revectorised = [
+            c for cond_id, c in changes.items()
+            if c is None or previous.get(cond_id) is None or _vector_fields(c) != _vector_fields(previous[cond_id])
+        ]
+        state.changed_conditions = self.changed_conditions + len(revectorised)
+        
+        # Terms the vectorizer was not fitted on join its vocabulary, so a new condition
+        # matches on them right away instead of after the next refit
+        vocabulary = self.query_vectorizer.vocabulary
+        new_terms = {}
+        for condition in revectorised:
+            for keyword in condition['keywords'] if condition is not None else ():
+                for term in set(self.query_vectorizer.features(tokenize(keyword).words)):
+                    if term not in vocabulary:
+                        new_terms[term] = new_terms.get(term, 0) + 1
+        if new_terms:
+            state.query_vectorizer = self.query_vectorizer.with_terms(new_terms)
+            matrix = self.condition_matrix
+            state.condition_matrix = sparse.csr_matrix(
+                (matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], state.query_vectorizer.n_features)
+            )
+            state.index = None
+        state.unknown_terms = self.unknown_terms | new_terms.keys()
+        
+        if any(not c['is_critical'] for c in touched):
+            state._update_condition_matrix(self, changes, previous)
+        
+        # Words of removed keywords stay correction targets until the next refit
+        new_words = keyword_words(c for c in revectorised if c is not None)
+        critical_words = keyword_words(c for c in revectorised if c is not None and c['is_critical'])
+        if (any(word not in self.spelling.words for word in new_words)
+                or not self.spelling.critical_words.issuperset(critical_words)):
+            state.spelling = self.spelling.with_words(new_words, critical_words)
+        return state
+    
+    def _update_condition_matrix(self, previous_state, changes, previous):
+        """
+        Rebuild the condition rows, vectorising only conditions whose keywords changed
+        """
+        old_rows = {c['id']: row for row, c in enumerate(previous_state.condition_rows)}
+        self.condition_rows = [c for c in self.symptom_db if not c['is_critical']]
+        
+        # New rows are stacked under the old matrix and one row selection puts every
+        # condition in its place, so unchanged rows are copied rather than recomputed
+        fresh = []
+        order = []
+        for condition in self.condition_rows:
+            cond_id = condition['id']
+            old = previous.get(cond_id)
+            if cond_id not in changes or (
+                    old is not None and cond_id in old_rows and _vector_fields(old) == _vector_fields(condition)):
+                order.append(old_rows[cond_id])
+            else:
+                order.append(len(old_rows) + len(fresh))
+                fresh.append(condition)
+        
+        # Edits that leave every row in place keep the matrix and its index
+        if not fresh and order == list(range(len(old_rows))):
+            return
+        
+        matrix = self.condition_matrix
+        if fresh:
+            matrix = sparse.vstack([matrix, self._vectorize_conditions(fresh)], format='csr')
+        self.condition_matrix = matrix[order]
+        self.index = None
+    
+    def drift(self):
+        """
+        How far the knowledge base moved away from what the vectorizer was fitted on
+        
+        Returns:
+            dict: 'changed_conditions', the share of conditions added, removed or given new
+                keywords, and 'unknown_terms', new keyword terms relative to the vocabulary size
+        """
+        return {
+            'changed_conditions': self.changed_conditions / max(self.fitted_conditions, 1),
+            'unknown_terms': len(self.unknown_terms) / max(len(self.query_vectorizer.vocabulary), 1)
+        }
+
+
+def _vector_fields(condition):
+    """
+    The parts of a condition that its matrix row depends on
+    """
+    return condition['is_critical'], tuple(condition['keywords'])
+
+
+class _NoStageTimer:
+    """
+    Stage timer used when no instrumentation is attached, see instrumentation.StageTimer
+    """
+    def lap(self, stage, count=1):
+        pass
+
+
+_NO_STAGE_TIMER = _NoStageTimer()
+
+
+class MedicineRecommender:
+    # Bump whenever the fitted state saved by save() changes shape
+    ARTIFACT_VERSION = 9
+    
+    def __init__(self, knowledge_base_path=None, cache_size=0, cache_ttl=None, symptom_db=None,
+                 **options):
+        """
+        Args:
+            knowledge_base_path (str): Optional knowledge base file built with knowledge_base.py,
+                the built-in catalogue is used when omitted
+            cache_size (int): Number of recommend() results to keep in an LRU cache, 0 disables it
+            cache_ttl (float): Optional lifetime of cached results in seconds
+            symptom_db (list): Optional in-memory catalogue in the symptom_db format, e.g.
+                a synthetic one for benchmarks
+            **options: Further runtime options, see _configure_runtime()
+        """
+        # Initialize the symptom database
+        if symptom_db is not None:
+            knowledge_base_hash = compute_content_hash(symptom_db)
+        elif knowledge_base_path:
+            symptom_db = load_knowledge_base(knowledge_base_path)
+            knowledge_base_hash = read_content_hash(knowledge_base_path)
+        else:
+            symptom_db = self._create_symptom_database()
+            knowledge_base_hash = compute_content_hash(symptom_db)
+        
+        self._state = ModelState.fit(symptom_db, knowledge_base_hash)
+        self._configure_runtime(cache_size=cache_size, cache_ttl=cache_ttl, **options)
+    
+    def _configure_runtime(self, cache_size=0, cache_ttl=None, instrumentation=None, similarity_threshold=0.1,
+                           top_k=3, medicine_threshold=0.2, index='auto', index_options=None,
+                           refit_threshold=0.2, explain_terms=5, spelling_correction=True, locale_dir=None,
+                           max_locales=4):
+        """
+        Set up the options that are not part of the fitted model
+        
+        Args:
+            cache_size (int): Number of recommend() results to keep in an LRU cache, 0 disables it
+            cache_ttl (float): Optional lifetime of cached results in seconds
+            instrumentation (Instrumentation): Optional per-stage timing and counters
+            similarity_threshold (float): Minimum similarity for a condition to match
+            top_k (int): Maximum number of matched conditions per request
+            medicine_threshold (float): Minimum similarity for a condition's medicines to be recommended
+            index (str): Condition index, 'dense', 'exact', 'inverted' or 'auto', see condition_index.py
+            index_options (dict): Extra options for the condition index, e.g. max_terms
+            refit_threshold (float): Knowledge base updates refit the vectorizer from scratch
+                once either drift() measure exceeds this
+            explain_terms (int): Number of top contributing n-grams reported per condition
+                by recommend(..., explain=True)
+            spelling_correction (bool): Correct misspelt symptom words to keyword words before
+                matching, see spelling.py
+            locale_dir (str): Directory of the locale packs, see locales.py
+            max_locales (int): Number of locale snapshots kept in memory besides the default one;
+                the least recently used is dropped and refitted when asked for again
+        """
+        if max_locales < 1:
+            raise ValueError("max_locales must be a positive integer")
+        self.cache = RecommendationCache(cache_size, cache_ttl) if cache_size else None
+        self.instrumentation = instrumentation
+        self.similarity_threshold = similarity_threshold
+        self.top_k = top_k
+        self.medicine_threshold = medicine_threshold
+        self.refit_threshold = refit_threshold
+        self.explain_terms = explain_terms
+        self.spelling_correction = spelling_correction
+        self._index_kind = index
+        self._index_options = index_options or {}
+        self._update_lock = threading.Lock()
+        self._state.index = self._build_index(self._state)
+        
+        # Locale to (snapshot it was fitted from, pack, locale snapshot), least recently used first
+        self.locale_dir = locale_dir or LOCALE_DIR
+        self.max_locales = max_locales
+        self._locale_states = OrderedDict()
+        self._locale_lock = threading.Lock()
+        self._locale_fit_lock = threading.Lock()
+    
+    def _build_index(self, state):
+        return build_index(state.condition_matrix, self._index_kind, **self._index_options)
+    
+    def _locale_state(self, locale=None):
+        """
+        Snapshot that answers requests in a locale, fitted from its pack on first use
+        
+        Args:
+            locale (str): Locale name, None for the default locale
+            
+        Returns:
+            ModelState: The current snapshot for the default locale, else one sharing its
+                medicine catalogue
+        """
+        state = self._state
+        if locale is None or locale == DEFAULT_LOCALE:
+            return state
+        entry = self._cached_locale(locale, state)
+        if entry is not None:
+            return entry[2]
+        
+        # One fit at a time, so requests racing for a cold locale do not all fit it
+        with self._locale_fit_lock:
+            entry = self._cached_locale(locale, state)
+            if entry is not None:
+                return entry[2]
+            with self._locale_lock:
+                stale = self._locale_states.get(locale)
+            
+            # A knowledge base update only refits the locale, its pack is read once
+            pack = stale[1] if stale is not None else load_locale_pack(locale, self.locale_dir)
+            locale_state = ModelState.fit(
+                localise_symptom_db(state.symptom_db, pack),
+                stop_words=pack['stop_words'],
+                catalogue=state,
+                # Untranslated conditions keep English keywords, so English words are guarded too
+                lexicon=load_lexicon(locale, self.locale_dir) | state.spelling.lexicon
+            )
+            if pack['no_match']:
+                locale_state.no_match_result = Recommendation(pack['no_match'], False)
+            locale_state.index = self._build_index(locale_state)
+            
+            with self._locale_lock:
+                self._locale_states[locale] = (state, pack, locale_state)
+                self._locale_states.move_to_end(locale)
+                while len(self._locale_states) > self.max_locales:
+                    self._locale_states.popitem(last=False)
+            return locale_state
+    
+    def _cached_locale(self, locale, state):
+        """
+        Returns:
+            tuple: The cached entry of the locale if it was fitted from state, else None
+        """
+        with self._locale_lock:
+            entry = self._locale_states.get(locale)
+            if entry is None or entry[0] is not state:
+                return None
+            self._locale_states.move_to_end(locale)
+            return entry
+    
+    def loaded_locales(self):
+        """
+        Returns:
+            list: Locales with a snapshot in memory, least recently used first
+        """
+        with self._locale_lock:
+            return [locale for locale, entry in self._locale_states.items() if entry[2] is not None]
+    
+    @property
+    def symptom_db(self):
+        return self._state.symptom_db
+    
+    @property
+    def knowledge_base_hash(self):
+        return self._state.knowledge_base_hash
+    
+    @property
+    def medicines(self):
+        return self._state.medicines
+    
+    def save(self, path):
+        """
+        Persist the fitted model so workers can start without refitting
+        
+        Args:
+            path (str): Artifact file to write, replaced atomically if it exists
+        """
+        artifact = {'artifact_version': self.ARTIFACT_VERSION, 'state': self._state}
+        tmp_path = str(path) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path, knowledge_base_path=None, **options):
+        """
+        Load a model saved with save(), rejecting artifacts fitted on a different knowledge base
+        
+        Args:
+            path (str): Artifact file written by save()
+            knowledge_base_path (str): Knowledge base the artifact must match, the built-in
+                catalogue when omitted
+            **options: Runtime options such as cache_size, see _configure_runtime()
+            
+        Returns:
+            MedicineRecommender: Ready to use recommender, no refit needed
+        """
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+        
+        if not isinstance(artifact, dict) or artifact.get('artifact_version') != cls.ARTIFACT_VERSION:
+            raise ValueError(f"Model artifact {path} was written by an incompatible version")
+        
+        if knowledge_base_path:
+            expected_hash = read_content_hash(knowledge_base_path)
+        else:
+            expected_hash = compute_content_hash(cls._create_symptom_database())
+        if artifact['state'].knowledge_base_hash != expected_hash:
+            raise ValueError(f"Model artifact {path} is stale, it was fitted on a different knowledge base")
+        
+        recommender = cls.__new__(cls)
+        recommender._state = artifact['state']
+        recommender._configure_runtime(**options)
+        return recommender
+    
+    def add_condition(self, condition):
+        """
+        Add a condition at runtime without refitting or blocking in-flight requests
+        
+        Args:
+            condition (dict): New condition in the symptom_db format, with an unused id
+        """
+        with self._update_lock:
+            if condition['id'] in self._state.condition_medicine_ids:
+                raise ValueError(f"Condition {condition['id']} already exists")
+            self._publish(self._state.with_conditions({condition['id']: condition}))
+    
+    def update_condition(self, condition):
+        """
+        Replace the condition with the same id, e.g. to change its keywords or medicines
+        """
+        with self._update_lock:
+            self._condition(condition['id'])
+            self._publish(self._state.with_conditions({condition['id']: condition}))
+    
+    def remove_condition(self, condition_id):
+        """
+        Remove a condition and stop recommending its medicines
+        """
+        with self._update_lock:
+            self._condition(condition_id)
+            self._publish(self._state.with_conditions({condition_id: None}))
+    
+    def add_medicine(self, condition_id, medicine):
+        """
+        Add a medicine to a condition
+        
+        Args:
+            condition_id (int): Condition that should recommend the medicine
+            medicine (dict): Medicine with name, dosage, description and url
+        """
+        with self._update_lock:
+            condition = self._condition(condition_id)
+            updated = dict(condition, medicines=condition['medicines'] + [medicine])
+            self._publish(self._state.with_conditions({condition_id: updated}))
+    
+    def update_medicine(self, medicine_id, **fields):
+        """
+        Change fields of a medicine in every condition that recommends it
+        
+        Args:
+            medicine_id (int): Catalogue id, as in Medicine.id
+            **fields: New values for name, dosage, description or url
+            
+        Returns:
+            Medicine: The updated medicine, under its new catalogue id
+        """
+        with self._update_lock:
+            medicine = dict(self._medicine(medicine_id).to_dict(), **fields)
+            self._publish(self._state.with_conditions(self._replace_medicine(medicine_id, [medicine])))
+            record = (medicine['name'], medicine['dosage'], medicine['description'], medicine['url'])
+            return self._state.medicines[self._state._medicine_ids[record]]
+    
+    def remove_medicine(self, medicine_id):
+        """
+        Stop recommending a medicine under any condition
+        """
+        with self._update_lock:
+            self._publish(self._state.with_conditions(self._replace_medicine(medicine_id, [])))
+    
+    def _condition(self, condition_id):
+        for condition in self._state.symptom_db:
+            if condition['id'] == condition_id:
+                return condition
+        raise KeyError(f"Unknown condition {condition_id}")
+    
+    def _medicine(self, medicine_id):
+        medicines = self._state.medicines
+        if not 0 <= medicine_id < len(medicines) or medicines[medicine_id] is None:
+            raise KeyError(f"Unknown medicine {medicine_id}")
+        return medicines[medicine_id]
+    
+    def _replace_medicine(self, medicine_id, replacement):
+        """
+        Returns:
+            dict: Condition changes that swap a medicine for the replacement list wherever it appears
+        """
+        old = self._medicine(medicine_id).to_dict()
+        changes = {}
+        for condition in self._state.symptom_db:
+            if medicine_id in self._state.condition_medicine_ids[condition['id']]:
+                medicines = []
+                for medicine in condition['medicines']:
+                    medicines.extend(replacement if medicine == old else [medicine])
+                changes[condition['id']] = dict(condition, medicines=medicines)
+        if not changes:
+            raise KeyError(f"Medicine {medicine_id} is not recommended by any condition")
+        return changes
+    
+    def _publish(self, state):
+        """
+        Atomically swap in a new snapshot, refitting first if it drifted too far
+        """
+        if max(state.drift().values()) > self.refit_threshold:
+            state = ModelState.fit(state.symptom_db, lexicon=state.spelling.lexicon, previous=state)
+        if state.index is None:
+            state.index = self._build_index(state)
+        
+        # A single reference assignment; requests already running keep their snapshot
+        self._state = state
+        
+        # Locale snapshots are refitted from the new one when next asked for
+        with self._locale_lock:
+            self._locale_states = OrderedDict(
+                (locale, (None, pack, None)) for locale, (_, pack, _) in self._locale_states.items()
+            )
+        
+        # Cached results may come from conditions that just changed. Clearing after the swap
+        # also turns away results that requests still compute from the old snapshot
+        if self.cache is not None:
+            self.cache.clear()
+    
+    def drift(self):
+        """
+        Returns:
+            dict: Drift of the knowledge base since the last fit, see ModelState.drift()
+        """
+        return self._state.drift()
+    
+    @staticmethod
+    def _create_symptom_database():
+        """
+        Create the built-in database of symptoms, conditions, and recommended medicines.
+        Production deployments load a knowledge base file instead; this catalogue is the
+        source for `python knowledge_base.py build`.
         """
         return [
             {
@@ -231,121 +996,304 @@ class MedicineRecommender:
             }
         ]
     
-    def recommend(self, symptoms_text, additional_info=None):
+    
+    def recommend(self, symptoms_text, additional_info=None, explain=False, locale=None):
         """
         Analyze symptoms and provide medicine recommendations
         
         Args:
             symptoms_text (str): User's description of symptoms
             additional_info (dict): Additional information like duration, severity, etc.
+            explain (bool): Attach an Explanation of the matched conditions and the critical
+                keyword that fired; skips the result cache
+            locale (str): Language of the symptom text, matched with that locale's keyword
+                pack, see locales.py; the default locale when omitted
+                
+        Returns:
+            Recommendation: Immutable result including medicines and advice
+        """
+        if locale == DEFAULT_LOCALE:
+            locale = None
+        if explain or self.cache is None:
+            return self._recommend_uncached(symptoms_text, additional_info, locale, explain)[0]
+        
+        # Serve repeated queries from the cache; results are immutable so they can be shared
+        key = make_cache_key(symptoms_text, additional_info)
+        if locale is not None:
+            key += (locale,)
+        # Read before the snapshot, so a result of a snapshot replaced meanwhile is not stored
+        generation = self.cache.generation
+        entry = self.cache.get(key)
+        if entry is not None:
+            if self.instrumentation is not None:
+                # Cached answers count like scored ones, so match rates do not depend on the cache
+                self.instrumentation.record_request(*entry[1], cached=True)
+            return entry[0]
+        
+        # The outcome is kept next to the result so cache hits can be counted by condition
+        entry = self._recommend_uncached(symptoms_text, additional_info, locale)
+        self.cache.put(key, entry, generation)
+        return entry[0]
+    
+    def cache_stats(self):
+        """
+        Returns:
+            dict: Result cache size and hit/miss/eviction counters, or None when caching is off
+        """
+        return self.cache.stats() if self.cache is not None else None
+    
+    def _recommend_uncached(self, symptoms_text, additional_info, locale=None, explain=False):
+        """
+        Run the full recommendation pipeline for one request
+        
+        Returns:
+            tuple: (Recommendation, (critical condition or None, matched conditions))
+        """
+        # Read the snapshot once so a concurrent knowledge base update cannot mix states
+        state = self._locale_state(locale)
+        return self._run_pipeline([symptoms_text], [additional_info], state, explain)[0]
+    
+    def recommend_many(self, symptoms_texts, additional_infos=None, chunk_size=1024, locale=None):
+        """
+        Analyze a batch of symptom descriptions in one pass
+        
+        Args:
+            symptoms_texts (iterable): Users' descriptions of symptoms
+            additional_infos (list): Optional additional information per text, in the same order
+            chunk_size (int): Number of texts vectorised and scored together, bounds memory use
+            locale (str): Language of every text in the batch, see recommend()
             
         Returns:
-            dict: Recommendation results including medicines and advice
+            list: Recommendation results in input order, same type as recommend()
         """
-        # Convert to lowercase for processing
-        symptoms_text = symptoms_text.lower()
+        symptoms_texts = list(symptoms_texts)
+        if additional_infos is None:
+            additional_infos = [None] * len(symptoms_texts)
+        else:
+            additional_infos = list(additional_infos)
+            if len(additional_infos) != len(symptoms_texts):
+                raise ValueError("additional_infos must have one entry per symptoms text")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        
+        results = []
+        for start in range(0, len(symptoms_texts), chunk_size):
+            end = start + chunk_size
+            results.extend(self._recommend_chunk(symptoms_texts[start:end], additional_infos[start:end], locale))
+        return results
+    
+    def _recommend_chunk(self, symptoms_texts, additional_infos, locale=None):
+        """
+        Score one chunk of texts with a single transform and sparse matrix product
+        """
+        state = self._locale_state(locale)
+        return [result for result, _ in self._run_pipeline(symptoms_texts, additional_infos, state)]
+    
+    def _run_pipeline(self, symptoms_texts, additional_infos, state, explain=False):
+        """
+        The recommendation pipeline behind recommend() and recommend_many(): normalise and
+        correct, check critical conditions, vectorise, score and build the results. With an
+        instrumentation every stage is timed, its time spread evenly over the texts that went
+        through it, and every outcome is counted
+        
+        Args:
+            symptoms_texts (list): Users' descriptions of symptoms
+            additional_infos (list): Additional information per text, in the same order
+            state (ModelState): Snapshot to score with
+            explain (bool): Attach an Explanation to every result
+            
+        Returns:
+            list: (Recommendation, (critical condition or None, matched conditions)) per text
+        """
+        if not symptoms_texts:
+            return []
+        instrumentation = self.instrumentation
+        timer = _NO_STAGE_TIMER if instrumentation is None else instrumentation.stage_timer()
+        
+        # Normalise, tokenize and correct once, every stage below works on the words
+        tokenized_texts = [self._tokenize(text, state) for text in symptoms_texts]
+        timer.lap('normalise', len(symptoms_texts))
         
         # Check for critical conditions first (safety first approach)
-        for condition in self.symptom_db:
-            if condition['is_critical']:
-                # Use more sophisticated matching for critical conditions
-                if self._check_critical_match(symptoms_text, condition['keywords']):
-                    return {
-                        'recommendation': condition['recommendation'],
-                        'is_critical': True,
-                        'medicines': []
-                    }
+        outputs = [None] * len(symptoms_texts)
+        for i, tokenized in enumerate(tokenized_texts):
+            critical_match = self._check_critical_match(tokenized, state)
+            if critical_match is not None:
+                condition, keyword = critical_match
+                result = state.critical_results[condition['id']]
+                if explain:
+                    explanation = Explanation(critical_condition=condition['condition'], critical_keyword=keyword)
+                    result = replace(result, explanation=explanation)
+                outputs[i] = (result, (condition, ()))
+        timer.lap('critical', len(symptoms_texts))
         
         # For non-critical conditions, use ML-based similarity matching
-        matched_conditions = self._find_matching_conditions(symptoms_text)
+        pending = [i for i, output in enumerate(outputs) if output is None]
+        if pending:
+            if explain or len(pending) == 1:
+                # A single query is vectorised without building a sparse matrix
+                symptoms_vectors = [self._vectorize(tokenized_texts[i], state) for i in pending]
+            else:
+                symptoms_vectors = state.query_vectorizer.transform([tokenized_texts[i] for i in pending])
+            timer.lap('transform', len(pending))
+            
+            if explain:
+                # The index hands back the contributions it scored with, so nothing is scored twice
+                matches = [state.index.explain(vector, self.similarity_threshold, self.top_k)
+                           for vector in symptoms_vectors]
+            elif len(pending) == 1:
+                matches = [state.index.search(symptoms_vectors[0], self.similarity_threshold, self.top_k)]
+            else:
+                matches = state.index.search_many(symptoms_vectors, self.similarity_threshold, self.top_k)
+            matched = [self._matched_conditions(match[0], match[1], state) for match in matches]
+            timer.lap('similarity', len(pending))
+            
+            for i, matched_conditions in zip(pending, matched):
+                result = self._build_result(matched_conditions, additional_infos[i], state)
+                outputs[i] = (result, (None, matched_conditions))
+            timer.lap('refine', len(pending))
+            
+            if explain:
+                for i, vector, matched_conditions, match in zip(pending, symptoms_vectors, matched, matches):
+                    explanation = self._explanation(vector, matched_conditions, match[2], state)
+                    outputs[i] = (replace(outputs[i][0], explanation=explanation), outputs[i][1])
         
+        if instrumentation is not None:
+            for _, outcome in outputs:
+                instrumentation.record_request(*outcome)
+        return outputs
+    
+    def _explanation(self, symptoms_vector, matched_conditions, contributions, state):
+        """
+        Returns:
+            Explanation: The matched conditions with the terms that contributed most to each score
+        """
+        feature_names = state.query_vectorizer.feature_names
+        terms = symptoms_vector.indices.tolist()
+        matches = []
+        for (condition, score), row_contributions in zip(matched_conditions, contributions):
+            # Only the few best terms are kept, so a long query does not bloat the audit log
+            best = sorted(
+                ((feature_names[terms[i]], float(weight)) for i, weight in enumerate(row_contributions) if weight > 0),
+                key=lambda term: -term[1]
+            )[:self.explain_terms]
+            matches.append(ConditionMatch(condition['id'], condition['condition'], score, tuple(best)))
+        return Explanation(tuple(matches))
+    
+    def _tokenize(self, symptoms_text, state):
+        """
+        Normalise and tokenize the text once, correcting misspelt words when enabled
+        """
+        tokenized = tokenize(symptoms_text)
+        if self.spelling_correction:
+            tokenized = state.spelling.correct(tokenized)
+        return tokenized
+    
+    def _build_result(self, matched_conditions, additional_info, state):
+        """
+        Combine matched conditions into the recommendation returned to the user
+        """
         if not matched_conditions:
-            return {
-                'recommendation': "I couldn't identify your symptoms clearly. Please provide more details or consult a healthcare professional for proper diagnosis.",
-                'is_critical': False,
-                'medicines': []
-            }
+            return state.no_match_result
         
         # Combine recommendations and medicines from matched conditions
-        all_medicines = []
+        medicine_ids = []
+        seen_names = set()
         recommendations = []
         
         for condition, score in matched_conditions:
             recommendations.append(condition['recommendation'])
             
             # Only include medicines from conditions with good match scores
-            if score > 0.2:  # Threshold for including medicines
-                for medicine in condition['medicines']:
-                    # Check if medicine is already in the list to avoid duplicates
-                    if not any(m['name'] == medicine['name'] for m in all_medicines):
-                        all_medicines.append(medicine)
+            if score > self.medicine_threshold:
+                for medicine_id in state.condition_medicine_ids[condition['id']]:
+                    # Skip medicines already recommended under another condition
+                    name = state.medicines[medicine_id].name
+                    if name not in seen_names:
+                        seen_names.add(name)
+                        medicine_ids.append(medicine_id)
         
         # Use additional info to refine recommendations if available
+        priority_ids = frozenset()
+        flags = frozenset()
         if additional_info:
-            all_medicines = self._refine_with_additional_info(all_medicines, additional_info)
+            medicine_ids, priority_ids, flags = self._refine_with_additional_info(medicine_ids, additional_info, state)
         
-        return {
-            'recommendation': ' '.join(recommendations),
-            'is_critical': False,
-            'medicines': all_medicines
-        }
+        return Recommendation(
+            ' '.join(recommendations),
+            False,
+            tuple(medicine_ids),
+            priority_ids,
+            flags,
+            catalogue=state.medicines
+        )
     
-    def _check_critical_match(self, symptoms_text, keywords):
+    def _check_critical_match(self, tokenized, state=None):
         """
         More careful matching for critical conditions to avoid false negatives
+        
+        Returns:
+            tuple: (condition, keyword) for the critical condition that fired, or None
         """
-        # For critical conditions, we want to be more sensitive
-        for keyword in keywords:
-            # Check for exact matches or phrases
-            if re.search(r'\b' + re.escape(keyword) + r'\b', symptoms_text):
-                return True
-        return False
+        # For critical conditions, we want to be more sensitive: any exact keyword
+        # or phrase match counts, and all keywords are checked in a single scan
+        return (state or self._state).critical_matcher.first_match(tokenized)
     
-    def _find_matching_conditions(self, symptoms_text):
+    def _find_matching_conditions(self, tokenized, state=None):
         """
         Use TF-IDF and cosine similarity to find matching conditions
         """
-        # Transform the input text
-        symptoms_vector = self.vectorizer.transform([symptoms_text])
-        
-        matched_conditions = []
-        
-        for condition in self.symptom_db:
-            if not condition['is_critical']:  # Skip critical conditions as they're handled separately
-                # Combine keywords for better matching
-                condition_text = ' '.join(condition['keywords'])
-                condition_vector = self.vectorizer.transform([condition_text])
-                
-                # Calculate similarity
-                similarity = cosine_similarity(symptoms_vector, condition_vector)[0][0]
-                
-                # If similarity is above threshold, consider it a match
-                if similarity > 0.1:  # Low threshold to catch more potential matches
-                    matched_conditions.append((condition, similarity))
-        
-        # Sort by similarity score
-        matched_conditions.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return top matches
-        return matched_conditions[:3]
+        state = state or self._state
+        return self._score_vector(self._vectorize(tokenized, state), state)
     
-    def _refine_with_additional_info(self, medicines, additional_info):
+    def _vectorize(self, tokenized, state):
         """
-        Refine medicine recommendations based on additional information
+        Transform the tokenized text into its L2-normalised TF-IDF vector
         """
-        refined_medicines = medicines.copy()
-        
-        # Example: If user has allergies, avoid certain medications
-        if additional_info.get('conditions') and 'Allergies' in additional_info['conditions']:
-            # Filter out medicines that might cause allergic reactions
-            refined_medicines = [m for m in refined_medicines if 'aspirin' not in m['name'].lower()]
+        return state.query_vectorizer.vectorize(tokenized)
+    
+    def _score_vector(self, symptoms_vector, state):
+        """
+        Score a query vector against the conditions and keep the best matches
+        """
+        rows, scores = state.index.search(symptoms_vector, self.similarity_threshold, self.top_k)
+        return self._matched_conditions(rows, scores, state)
+    
+    def _matched_conditions(self, rows, scores, state):
+        """
+        Returns:
+            list: (condition, similarity) tuples for index results, best first
+        """
+        return [(state.condition_rows[row], score) for row, score in zip(rows.tolist(), scores.tolist())]
+    
+    def _refine_with_additional_info(self, medicine_ids, additional_info, state=None):
+        """
+        Refine medicine recommendations based on additional information: contraindicated
+        medicines are dropped and stronger ones are prioritised for severe symptoms,
+        see contraindications.py
         
-        # Example: If symptoms are severe, prioritize stronger medications
-        if additional_info.get('severity', 0) > 7:
-            # Sort medicines to prioritize stronger ones
-            # This is simplified - in a real system, you'd have potency data
-            for medicine in refined_medicines:
-                if 'ibuprofen' in medicine['name'].lower():
-                    medicine['description'] = "PRIORITY: " + medicine['description']
+        Returns:
+            tuple: (medicine ids to recommend, frozenset of ids to prioritise, frozenset of flags)
+        """
+        return (state or self._state).contraindications.refine(medicine_ids, additional_info)
+
+
+def load_recommender(artifact_path=None, knowledge_base_path=None, **options):
+    """
+    Load a prefitted model artifact when one is available, else fit a new recommender
+    
+    Args:
+        artifact_path (str): Optional artifact written by MedicineRecommender.save()
+        knowledge_base_path (str): Optional knowledge base file, the built-in catalogue when omitted
+        **options: Extra MedicineRecommender options such as cache_size
         
-        return refined_medicines
\ No newline at end of file
+    Returns:
+        MedicineRecommender: Ready to use recommender
+    """
+    # Prefer a prefitted artifact, falling back to fitting when it is missing or stale
+    if artifact_path and os.path.exists(artifact_path):
+        try:
+            return MedicineRecommender.load(artifact_path, knowledge_base_path=knowledge_base_path, **options)
+        except ValueError:
+            pass
+    return MedicineRecommender(knowledge_base_path=knowledge_base_path, **options)
@@ -0,0 +1,119 @@
+"""
+Size-bounded LRU cache for recommendation results.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(symptoms_text, additional_info=None):
+    """
+    Build the cache key for a request
+
+    Symptom text is compared case- and whitespace-insensitively, and additional
+    info by a canonical hash so dict ordering does not matter.
+
+    Returns:
+        tuple: (normalised symptom text, additional info digest)
+    """
+    normalised_text = ' '.join(symptoms_text.lower().split())
+
+    # recommend() ignores empty additional info, so it shares the key of no info
+    if not additional_info:
+        return normalised_text, None
+    canonical = json.dumps(additional_info, sort_keys=True, default=str, separators=(',', ':'))
+    return normalised_text, hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class RecommendationCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+    Values are shared between callers, so only immutable results
+    (see results.Recommendation) may be cached.
+    """
+    def __init__(self, max_size=1024, ttl=None, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Maximum number of cached results
+            ttl (float): Seconds a result stays valid, or None to keep it until evicted
+            clock (callable): Returns the current time in seconds, for tests to replace
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be a positive integer")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Bumped by clear(), so results computed before a clear are not stored after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Look up a cached result
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                # Expired entries count as a miss and make room straight away
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation=None):
+        """
+        Store a result, evicting the least recently used entry when full
+
+        Args:
+            generation (int): The cache's generation read before the result was computed;
+                the result is dropped if the cache was cleared since
+        """
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached result, counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Current size and hit/miss/eviction counters
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __len__(self):
+        return len(self._entries)
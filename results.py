@@ -0,0 +1,129 @@
+"""
+Immutable result types returned by MedicineRecommender.
+
+Medicines live once in a frozen catalogue; a Recommendation only holds the
+ids of the medicines it recommends plus separate priority ids and flags, so
+results are cheap to build and safe to share between threads and caches.
+Explanations are only attached when recommend() is asked for one.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True, slots=True)
+class Medicine:
+    id: int
+    name: str
+    dosage: str
+    description: str
+    url: str
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'dosage': self.dosage,
+            'description': self.description,
+            'url': self.url
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ConditionMatch:
+    condition_id: int
+    condition: str
+    score: float
+    # (n-gram, contribution) pairs, largest first; all of a query's contributions sum to the score
+    terms: tuple = ()
+
+    def to_dict(self):
+        return {
+            'condition_id': self.condition_id,
+            'condition': self.condition,
+            'score': self.score,
+            'terms': [{'term': term, 'weight': weight} for term, weight in self.terms]
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Explanation:
+    # ConditionMatch per matched condition, best first
+    matches: tuple = ()
+    # Critical condition name and the keyword that triggered it, if any
+    critical_condition: str = None
+    critical_keyword: str = None
+
+    def to_dict(self):
+        return {
+            'matches': [match.to_dict() for match in self.matches],
+            'critical_condition': self.critical_condition,
+            'critical_keyword': self.critical_keyword
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Recommendation:
+    recommendation: str
+    is_critical: bool
+    # Ids into the catalogue, in the order they should be shown
+    medicine_ids: tuple = ()
+    # Ids of medicines to highlight, e.g. for severe symptoms
+    priority_ids: frozenset = frozenset()
+    # Extra machine-readable notes about the result
+    flags: frozenset = frozenset()
+    # Why the result was chosen, only set by recommend(..., explain=True)
+    explanation: Explanation = field(default=None, compare=False)
+    catalogue: tuple = field(default=(), repr=False, compare=False)
+
+    @property
+    def medicines(self):
+        """
+        Returns:
+            tuple: Recommended Medicine records, in display order
+        """
+        return tuple(self.catalogue[i] for i in self.medicine_ids)
+
+    def is_priority(self, medicine):
+        return medicine.id in self.priority_ids
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON-serialisable form of the recommendation
+        """
+        medicines = []
+        for medicine in self.medicines:
+            medicine_dict = medicine.to_dict()
+            medicine_dict['priority'] = medicine.id in self.priority_ids
+            medicines.append(medicine_dict)
+        result = {
+            'recommendation': self.recommendation,
+            'is_critical': self.is_critical,
+            'medicines': medicines,
+            'flags': sorted(self.flags)
+        }
+        if self.explanation is not None:
+            result['explanation'] = self.explanation.to_dict()
+        return result
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestions:
+    """
+    Live matches for text that is still being typed, see live.LiveSession
+    """
+    # ConditionMatch per matching condition, best first, without terms
+    matches: tuple = ()
+    # Critical condition name and the keyword that triggered it, if any
+    critical_condition: str = None
+    critical_keyword: str = None
+
+    @property
+    def is_critical(self):
+        return self.critical_condition is not None
+
+    def to_dict(self):
+        return {
+            'matches': [match.to_dict() for match in self.matches],
+            'is_critical': self.is_critical,
+            'critical_condition': self.critical_condition,
+            'critical_keyword': self.critical_keyword
+        }
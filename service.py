@@ -0,0 +1,285 @@
+"""
+Lightweight HTTP/JSON inference service for the medicine recommender.
+
+Endpoints:
+    GET  /health            liveness check
+    GET  /metrics           Prometheus metrics, when started with --metrics
+    POST /recommend         {"symptoms": "...", "additional_info": {...}, "explain": false, "locale": "es"}
+    POST /recommend/batch   {"items": [{"symptoms": "...", "additional_info": {...}}, ...], "locale": "es"}
+
+"locale" is optional and picks the keyword pack the symptoms are written in,
+see locales.py; each worker fits a locale on its first request for it.
+
+The model is loaded once in the parent process before workers are forked, so
+every worker shares the same physical pages copy-on-write. Run it with the
+built-in pre-fork server:
+
+    python service.py --port 8000 --workers 4
+
+or under any WSGI server that preloads the app, e.g.:
+
+    gunicorn --preload -w 4 'service:create_app()'
+
+The model artifact and knowledge base are taken from MEDICINE_MODEL_ARTIFACT
+and MEDICINE_KNOWLEDGE_BASE, as in the Streamlit app.
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from contraindications import validate_additional_info
+from instrumentation import Instrumentation
+from locales import UnknownLocaleError
+from model import load_recommender
+
+# Reject request bodies above this size before reading them
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """
+    A client error that is reported back as a JSON error response
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class RecommendationService:
+    """
+    WSGI application serving recommendations from one shared recommender
+    """
+    def __init__(self, recommender, max_batch_size=10000):
+        """
+        Args:
+            recommender (MedicineRecommender): Preloaded recommender shared by all requests
+            max_batch_size (int): Maximum number of items accepted by /recommend/batch
+        """
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self._routes = {
+            '/health': ('GET', self._health),
+            '/recommend': ('POST', self._recommend),
+            '/recommend/batch': ('POST', self._recommend_batch)
+        }
+        if recommender.instrumentation is not None:
+            self._routes['/metrics'] = ('GET', self._metrics)
+
+    def __call__(self, environ, start_response):
+        try:
+            route = self._routes.get(environ.get('PATH_INFO', ''))
+            if route is None:
+                raise RequestError('404 Not Found', "Unknown endpoint")
+            method, handler = route
+            if environ['REQUEST_METHOD'] != method:
+                raise RequestError('405 Method Not Allowed', f"Use {method} for this endpoint")
+            status, payload = '200 OK', handler(environ)
+        except RequestError as e:
+            status, payload = e.status, {'error': e.message}
+
+        if isinstance(payload, str):
+            content_type, body = 'text/plain; version=0.0.4', payload.encode('utf-8')
+        else:
+            content_type, body = 'application/json', json.dumps(payload).encode('utf-8')
+        start_response(status, [
+            ('Content-Type', content_type),
+            ('Content-Length', str(len(body)))
+        ])
+        return [body]
+
+    def _health(self, environ):
+        return {'status': 'ok'}
+
+    def _metrics(self, environ):
+        return self.recommender.instrumentation.to_prometheus()
+
+    def _recommend(self, environ):
+        request = self._read_json(environ)
+        symptoms_text, additional_info = self._parse_item(request)
+        # Explanations cost a little extra, so callers such as audit logging opt in per request
+        explain = request.get('explain', False)
+        if not isinstance(explain, bool):
+            raise RequestError('400 Bad Request', "'explain' must be a boolean")
+        locale = self._parse_locale(request)
+        try:
+            return self.recommender.recommend(symptoms_text, additional_info, explain=explain, locale=locale).to_dict()
+        except UnknownLocaleError as e:
+            raise RequestError('400 Bad Request', str(e))
+
+    def _recommend_batch(self, environ):
+        request = self._read_json(environ)
+        items = request.get('items') if isinstance(request, dict) else None
+        if not isinstance(items, list):
+            raise RequestError('400 Bad Request', "Expected an 'items' list")
+        if len(items) > self.max_batch_size:
+            raise RequestError('413 Payload Too Large', f"At most {self.max_batch_size} items per batch")
+
+        parsed = [self._parse_item(item) for item in items]
+        locale = self._parse_locale(request)
+        try:
+            results = self.recommender.recommend_many(
+                [symptoms_text for symptoms_text, _ in parsed],
+                [additional_info for _, additional_info in parsed],
+                locale=locale
+            )
+        except UnknownLocaleError as e:
+            raise RequestError('400 Bad Request', str(e))
+        return {'results': [result.to_dict() for result in results]}
+
+    def _read_json(self, environ):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise RequestError('400 Bad Request', "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise RequestError('413 Payload Too Large', "Request body too large")
+        try:
+            return json.loads(environ['wsgi.input'].read(length) or b'null')
+        except ValueError:
+            raise RequestError('400 Bad Request', "Request body must be JSON")
+
+    @staticmethod
+    def _parse_item(item):
+        """
+        Validate one request item
+
+        Returns:
+            tuple: (symptoms text, additional info dict or None)
+        """
+        if not isinstance(item, dict) or not isinstance(item.get('symptoms'), str):
+            raise RequestError('400 Bad Request', "Each request needs a 'symptoms' string")
+        additional_info = item.get('additional_info')
+        if additional_info is not None:
+            try:
+                validate_additional_info(additional_info)
+            except ValueError as e:
+                raise RequestError('400 Bad Request', str(e))
+        return item['symptoms'], additional_info
+
+    @staticmethod
+    def _parse_locale(request):
+        locale = request.get('locale')
+        if locale is not None and not isinstance(locale, str):
+            raise RequestError('400 Bad Request', "'locale' must be a string")
+        return locale
+
+
+def create_app(**options):
+    """
+    Build the WSGI application with the recommender configured from the environment
+
+    Args:
+        **options: Extra MedicineRecommender options such as cache_size
+    """
+    recommender = load_recommender(
+        artifact_path=os.environ.get('MEDICINE_MODEL_ARTIFACT'),
+        knowledge_base_path=os.environ.get('MEDICINE_KNOWLEDGE_BASE'),
+        **options
+    )
+    return RecommendationService(recommender)
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        # Per-request access logs cost more than the inference itself
+        pass
+
+
+def _make_server(sock, app):
+    """
+    Create a WSGI server that accepts connections on an already bound socket
+    """
+    server = _ThreadingWSGIServer(sock.getsockname()[:2], _QuietRequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()[:2]
+    server.server_name = socket.getfqdn(server.server_address[0])
+    server.server_port = server.server_address[1]
+    server.setup_environ()
+    server.set_app(app)
+    return server
+
+
+def serve(app, host='127.0.0.1', port=8000, workers=1):
+    """
+    Serve the app, pre-forking worker processes that share the listening socket
+
+    The app (and its model) must be fully loaded before calling this, so the
+    forked workers share its memory copy-on-write.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+
+    if workers <= 1 or not hasattr(os, 'fork'):
+        _make_server(sock, app).serve_forever()
+        return
+
+    # Move everything allocated so far out of the garbage collector's reach, so
+    # collections in the workers do not touch (and copy) the shared model pages
+    gc.collect()
+    gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _make_server(sock, app).serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop_children(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop_children)
+    signal.signal(signal.SIGTERM, stop_children)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve medicine recommendations over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of pre-forked worker processes")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="Per-worker recommend() result cache size, 0 disables it")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Time every stage and expose per-worker metrics on /metrics")
+    parser.add_argument('--max-locales', type=int, default=4,
+                        help="Per-worker number of locale models kept in memory")
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        cache_size=args.cache_size,
+        instrumentation=Instrumentation() if args.metrics else None,
+        max_locales=args.max_locales
+    )
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    serve(app, args.host, args.port, args.workers)
+
+
+if __name__ == '__main__':
+    main()
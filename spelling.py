@@ -0,0 +1,251 @@
+"""
+Typo-tolerant matching of symptom words against the keyword vocabulary.
+
+SpellingCorrector maps words that no keyword uses, such as "hedache" or
+"diarrea", to the closest keyword word within a small edit distance. It is
+a SymSpell-style deletion index: every keyword word is stored under each
+string that remains after deleting up to max_distance of its characters,
+and a misspelt word finds its candidates by looking up its own deletions.
+A lookup is a few dozen dictionary probes plus an exact distance check on
+the handful of candidates, instead of a Levenshtein scan over every keyword.
+Misspellings repeat, so corrections of unknown words are also memoised.
+The memo is the only thing a lookup writes to, and a single dict store or
+clear is atomic, so one corrector is safely shared by every request thread.
+
+Corrections are applied to the tokenized text before critical keyword
+detection and similarity scoring, so both paths see the corrected words.
+Words that are already known, stop words, words containing digits and
+correctly spelt words from the locale's lexicon ("painted", "chess") are
+never changed, and stop words are never a correction either. Regular
+inflections of lexicon words ("hears", "lifted") count as correctly spelt
+too, so the lexicon does not have to list every inflected form. A corrected
+word alone can fire an emergency response, so words of critical keywords
+are only reached by a single edit of a word of CRITICAL_MIN_LENGTH letters
+or more: "siezure" still reads as "seizure", "vagina" never as "angina",
+"hears" never as "heart".
+"""
+from text_processing import TokenizedText, tokenize
+
+# Words shorter than this are too ambiguous to correct
+MIN_WORD_LENGTH = 3
+
+# Words at least this long may be corrected by two edits, shorter ones by one
+TWO_EDIT_MIN_LENGTH = 6
+
+# Words shorter than this are never corrected to a word of a critical keyword
+CRITICAL_MIN_LENGTH = 4
+
+# Unknown words whose correction is remembered, the memo is cleared when it fills up
+MEMO_SIZE = 10000
+
+# Regular English inflection suffixes, longest first
+INFLECTION_SUFFIXES = ('ing', 'ies', 'ied', 'est', 'es', 'ed', 'er', 'ly', 's', 'd')
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance: insertions, deletions, substitutions and
+    transpositions of adjacent characters all cost one
+
+    Returns:
+        int: The distance, or max_distance + 1 once it is known to exceed max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletions(word, max_distance):
+    """
+    Returns:
+        set: Every string left after deleting up to max_distance characters, the word included
+    """
+    deletions = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        # Each round deletes one more character from the strings of the previous round
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        deletions |= frontier
+    return deletions
+
+
+def inflection_stems(word):
+    """
+    Returns:
+        set: Words that the word could be a regular inflection of, e.g. "hear" for
+            "hears" and "ache" for "aching"
+    """
+    stems = set()
+    for suffix in INFLECTION_SUFFIXES:
+        if len(word) - len(suffix) < MIN_WORD_LENGTH or not word.endswith(suffix):
+            continue
+        stem = word[:-len(suffix)]
+        stems.add(stem)
+        stems.add(stem + 'e')
+        if stem[-1] == stem[-2]:
+            # "stopped" from "stop"
+            stems.add(stem[:-1])
+        if suffix in ('ies', 'ied'):
+            stems.add(stem + 'y')
+    return stems
+
+
+def keyword_words(conditions):
+    """
+    Returns:
+        dict: Every word of the conditions' keywords to how many keywords use it
+    """
+    words = {}
+    for condition in conditions:
+        for keyword in condition['keywords']:
+            for word in tokenize(keyword).words:
+                words[word] = words.get(word, 0) + 1
+    return words
+
+
+def _deletion_index(words, max_distance, ignore=frozenset()):
+    """
+    Returns:
+        dict: Deletion string to the list of words that produce it
+    """
+    index = {}
+    for word in words:
+        if len(word) < MIN_WORD_LENGTH or not word.isalpha() or word in ignore:
+            continue
+        for deletion in _deletions(word, max_distance):
+            index.setdefault(deletion, []).append(word)
+    return index
+
+
+class SpellingCorrector:
+    """
+    Corrects misspelt words to keyword words through a precomputed deletion index
+    """
+    def __init__(self, words, ignore=(), max_distance=2, lexicon=frozenset(), critical_words=()):
+        """
+        Args:
+            words (dict): Keyword word to how many keywords use it, used to break ties
+            ignore (iterable): Words that are left alone and never a correction, e.g. stop words
+            max_distance (int): Largest edit distance that is corrected
+            lexicon (frozenset): Correctly spelt words that are left alone although no keyword uses them
+            critical_words (iterable): Words of critical keywords, only reached by a single edit
+        """
+        self.words = dict(words)
+        self.ignore = frozenset(ignore)
+        self.max_distance = max_distance
+        self.lexicon = lexicon
+        self.critical_words = frozenset(critical_words)
+
+        # Deletion string to the keyword words that produce it. Words added at runtime go
+        # into a second, small index so the large one is shared instead of rebuilt
+        self._deletions = _deletion_index(self.words, max_distance, self.ignore)
+        self._added = {}
+        self._added_deletions = {}
+        self._memo = {}
+
+    def __getstate__(self):
+        # Memoised corrections are rebuilt on demand rather than saved with artifacts
+        state = self.__dict__.copy()
+        state['_memo'] = {}
+        return state
+
+    @classmethod
+    def from_conditions(cls, symptom_db, ignore=(), max_distance=2, lexicon=frozenset()):
+        """
+        Build the corrector from every keyword of every condition, critical ones included
+
+        Returns:
+            SpellingCorrector: Index over the keyword words
+        """
+        critical_words = keyword_words(c for c in symptom_db if c['is_critical'])
+        return cls(keyword_words(symptom_db), ignore, max_distance, lexicon, critical_words)
+
+    def with_words(self, words, critical_words=()):
+        """
+        Build a corrector that also knows the given words, e.g. the keywords of a
+        condition added at runtime; this one is left untouched
+
+        Args:
+            words (dict): Keyword word to how many new keywords use it
+            critical_words (iterable): Those of the words that critical keywords use
+
+        Returns:
+            SpellingCorrector: New corrector sharing this one's main index
+        """
+        corrector = SpellingCorrector.__new__(SpellingCorrector)
+        corrector.__dict__.update(self.__dict__)
+        corrector.words = dict(self.words)
+        corrector._added = dict(self._added)
+        corrector.critical_words = self.critical_words.union(critical_words)
+        for word, count in words.items():
+            if word not in self.words:
+                corrector._added[word] = 0
+            corrector.words[word] = corrector.words.get(word, 0) + count
+        if len(corrector._added) != len(self._added):
+            corrector._added_deletions = _deletion_index(corrector._added, self.max_distance, self.ignore)
+        corrector._memo = {}
+        return corrector
+
+    def correct_word(self, word):
+        """
+        Returns:
+            str: The closest keyword word, or the word itself when it is known or nothing is close
+        """
+        if (word in self.words or word in self.ignore or word in self.lexicon or len(word) < MIN_WORD_LENGTH
+                or not word.isalpha()):
+            return word
+        corrected = self._memo.get(word)
+        if corrected is None:
+            # An inflected lexicon word is spelt correctly: "hears" must not become "heart"
+            corrected = word if not self.lexicon.isdisjoint(inflection_stems(word)) else self._lookup(word)
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[word] = corrected
+        return corrected
+
+    def _lookup(self, word):
+        max_distance = min(self.max_distance, 2 if len(word) >= TWO_EDIT_MIN_LENGTH else 1)
+
+        candidates = set()
+        for deletion in _deletions(word, max_distance):
+            candidates.update(self._deletions.get(deletion, ()))
+            candidates.update(self._added_deletions.get(deletion, ()))
+
+        best = None
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            # A false correction to a critical word would raise a false emergency
+            if candidate in self.critical_words and (distance > 1 or len(word) < CRITICAL_MIN_LENGTH):
+                continue
+            # Closest first, then the word more keywords use, then alphabetical for stable output
+            key = (distance, -self.words[candidate], candidate)
+            if best is None or key < best:
+                best = key
+        return word if best is None else best[2]
+
+    def correct(self, tokenized):
+        """
+        Correct every word of a tokenized text
+
+        Returns:
+            TokenizedText: The same object when nothing changed, else a corrected copy
+        """
+        words = tokenized.words
+        corrected = tuple(self.correct_word(word) for word in words)
+        if corrected == words:
+            return tokenized
+        return TokenizedText(corrected, tokenized.separators, tokenized.readings)
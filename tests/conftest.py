@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import MedicineRecommender  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def recommender():
+    """
+    Recommender on the built-in catalogue; tests that update the knowledge base
+    build their own instead
+    """
+    return MedicineRecommender()
+
+
+@pytest.fixture(scope='session')
+def sample_queries():
+    """
+    Short texts covering ordinary, critical, unmatched and empty input
+    """
+    return [
+        'headache and fever', 'runny nose and sneezing', 'stomach ache after eating', 'sore back and knee pain',
+        'itchy rash', 'chest pain', 'I fainted this morning', 'nothing that matches at all', ''
+    ]
+
+
+@pytest.fixture(scope='session')
+def critical_keywords():
+    return [
+        (condition['condition'], keyword)
+        for condition in MedicineRecommender._create_symptom_database() if condition['is_critical']
+        for keyword in condition['keywords']
+    ]
+
+
+class BlockingRecommender:
+    """
+    Scores like the wrapped recommender once release is set, so tests can hold a batch in flight
+    """
+    def __init__(self, recommender):
+        self.recommender = recommender
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def recommend_many(self, symptoms_texts, additional_infos=None, chunk_size=1024):
+        self.started.set()
+        self.release.wait(10)
+        return self.recommender.recommend_many(symptoms_texts, additional_infos, chunk_size)
+
+
+@pytest.fixture
+def blocking(recommender):
+    blocking = BlockingRecommender(recommender)
+    yield blocking
+    blocking.release.set()
@@ -0,0 +1,63 @@
+import pickle
+
+import pytest
+
+from knowledge_base import build_knowledge_base
+from model import MedicineRecommender, load_recommender
+
+INFO = {'duration': 'More than a week', 'severity': 9, 'conditions': ['Asthma'], 'medications': 'warfarin'}
+
+
+@pytest.fixture(scope='module')
+def artifact(tmp_path_factory, recommender):
+    path = str(tmp_path_factory.mktemp('artifacts') / 'model.pkl')
+    recommender.save(path)
+    return path
+
+
+def test_loaded_model_recommends_like_the_fitted_one(recommender, artifact, sample_queries):
+    loaded = MedicineRecommender.load(artifact, cache_size=8)
+    assert loaded.knowledge_base_hash == recommender.knowledge_base_hash
+    for text in sample_queries:
+        assert loaded.recommend(text) == recommender.recommend(text), text
+        assert loaded.recommend(text, INFO) == recommender.recommend(text, INFO), text
+        assert loaded.recommend(text, explain=True) == recommender.recommend(text, explain=True), text
+    assert loaded.recommend_many(sample_queries) == recommender.recommend_many(sample_queries)
+    assert loaded.cache_stats() is not None
+
+
+def test_artifact_of_another_version_is_rejected(artifact, monkeypatch):
+    monkeypatch.setattr(MedicineRecommender, 'ARTIFACT_VERSION', MedicineRecommender.ARTIFACT_VERSION + 1)
+    with pytest.raises(ValueError, match='incompatible version'):
+        MedicineRecommender.load(artifact)
+
+
+def test_file_that_is_not_an_artifact_is_rejected(tmp_path):
+    path = tmp_path / 'other.pkl'
+    path.write_bytes(pickle.dumps(['not', 'an', 'artifact']))
+    with pytest.raises(ValueError, match='incompatible version'):
+        MedicineRecommender.load(str(path))
+
+
+def test_artifact_of_a_changed_knowledge_base_is_rejected(artifact, tmp_path):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    symptom_db[0]['keywords'] = symptom_db[0]['keywords'] + ['migraine']
+    knowledge_base = str(tmp_path / 'changed.sqlite')
+    build_knowledge_base(symptom_db, knowledge_base)
+
+    with pytest.raises(ValueError, match='stale'):
+        MedicineRecommender.load(artifact, knowledge_base_path=knowledge_base)
+
+    # load_recommender() refits on the changed knowledge base instead
+    recommender = load_recommender(artifact, knowledge_base_path=knowledge_base)
+    assert recommender.symptom_db[0]['keywords'][-1] == 'migraine'
+
+
+def test_artifact_fitted_on_a_knowledge_base_file(tmp_path, recommender):
+    knowledge_base = str(tmp_path / 'kb.sqlite')
+    build_knowledge_base(MedicineRecommender._create_symptom_database(), knowledge_base)
+    path = str(tmp_path / 'model.pkl')
+    MedicineRecommender(knowledge_base_path=knowledge_base).save(path)
+
+    loaded = MedicineRecommender.load(path, knowledge_base_path=knowledge_base)
+    assert loaded.recommend('headache and fever') == recommender.recommend('headache and fever')
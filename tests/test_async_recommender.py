@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from async_recommender import AsyncRecommender
+
+
+async def wait_for_thread_event(event):
+    while not event.is_set():
+        await asyncio.sleep(0.001)
+
+
+def test_batches_match_single_calls(recommender, sample_queries):
+    async def run():
+        async with AsyncRecommender(recommender, max_batch_size=4) as service:
+            return await asyncio.gather(*(service.recommend(text) for text in sample_queries * 2))
+
+    assert asyncio.run(run()) == [recommender.recommend(text) for text in sample_queries * 2]
+
+
+def test_close_fails_a_batch_waiting_for_a_scoring_slot(recommender, blocking):
+
+    async def run():
+        service = AsyncRecommender(blocking, max_batch_size=1, max_wait=0)
+        service.start()
+        scoring = asyncio.ensure_future(service.recommend('headache'))
+        await wait_for_thread_event(blocking.started)
+        # Dequeued by the batcher, which then waits for the only scoring slot
+        held = asyncio.ensure_future(service.recommend('runny nose'))
+        while service.stats()['queued'] or service.stats()['in_flight'] != 2:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+
+        closing = asyncio.ensure_future(service.close())
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(held, 1)
+        blocking.release.set()
+        await asyncio.wait_for(closing, 5)
+        assert (await scoring) == recommender.recommend('headache')
+        assert service.stats()['in_flight'] == 0
+
+        # The failed query is not coalesced onto its dead future after a restart
+        result = await asyncio.wait_for(service.recommend('runny nose'), 5)
+        await service.close()
+        return result
+
+    assert asyncio.run(run()) == recommender.recommend('runny nose')
+
+
+def test_close_fails_a_batch_that_is_still_being_collected(recommender):
+    async def run():
+        service = AsyncRecommender(recommender, max_batch_size=8, max_wait=10)
+        service.start()
+        held = asyncio.ensure_future(service.recommend('headache'))
+        while service.stats()['queued'] or not service.stats()['in_flight']:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(service.close(), 5)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(held, 1)
+
+    asyncio.run(run())
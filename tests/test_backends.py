@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.recall import measure_recall
+from benchmarks.synthetic import make_queries, make_symptom_db
+from condition_index import DenseIndex
+from model import MedicineRecommender
+
+# Lowest recall each approximate (max_terms, max_postings) setting may have on the
+# seeded corpus below; settings that are not listed must match brute force exactly
+RECALL_FLOORS = {(4, None): 0.95, (2, None): 0.85, (1, None): 0.6, (2, 20): 0.85}
+
+
+@pytest.fixture(scope='module')
+def synthetic_db():
+    return make_symptom_db(300, seed=1)
+
+
+@pytest.mark.parametrize('index', ['dense', 'inverted'])
+def test_indexes_agree_with_exact_scoring(sample_queries, index):
+    exact = MedicineRecommender(index='exact')
+    other = MedicineRecommender(index=index)
+    for text in sample_queries:
+        assert other.recommend(text) == exact.recommend(text), text
+
+
+@pytest.mark.parametrize('index', ['dense', 'inverted'])
+def test_indexes_agree_with_exact_scoring_on_a_large_catalogue(synthetic_db, index):
+    texts, infos = zip(*make_queries(synthetic_db, 200, seed=2))
+    exact = MedicineRecommender(symptom_db=synthetic_db, index='exact')
+    other = MedicineRecommender(symptom_db=synthetic_db, index=index)
+    assert other.recommend_many(texts, infos) == exact.recommend_many(texts, infos)
+
+
+def test_auto_picks_the_dense_index_for_small_catalogues():
+    assert isinstance(MedicineRecommender()._state.index, DenseIndex)
+
+
+def test_inverted_index_recall_against_brute_force():
+    for setting in measure_recall(1000, 300, seed=0)[1:]:
+        key = (setting['max_terms'], setting['max_postings'])
+        if key in RECALL_FLOORS:
+            assert setting['recall'] >= RECALL_FLOORS[key], setting
+        else:
+            assert setting['recall'] == 1.0 and setting['score_mismatches'] == 0, setting
+
+
+def test_approximate_index_still_detects_critical_conditions(synthetic_db):
+    exact = MedicineRecommender(symptom_db=synthetic_db, index='exact')
+    approximate = MedicineRecommender(symptom_db=synthetic_db, index='inverted',
+                                      index_options={'max_terms': 1, 'max_postings': 20})
+    critical = 0
+    for text, _ in make_queries(synthetic_db, 200, seed=3):
+        expected = exact.recommend(text)
+        if expected.is_critical:
+            critical += 1
+            assert approximate.recommend(text) == expected, text
+    assert critical
@@ -0,0 +1,39 @@
+import json
+
+from bulk_score import iter_jsonl_chunks, score_file
+
+ROWS = [
+    '{"id": 1, "symptoms": "headache", "additional_info": {"severity": 9}}',
+    '{"id": 2, "symptoms": "headache", "additional_info": "severe"}',
+    '["not", "an", "object"]',
+    '{broken json',
+    '{"id": 5, "symptoms": "chest pain"}',
+]
+
+
+def write_input(tmp_path):
+    path = tmp_path / 'intake.jsonl'
+    path.write_text('\n'.join(ROWS) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_bad_rows_are_reported_per_row(tmp_path):
+    (ids, texts, infos, errors), = iter_jsonl_chunks(write_input(tmp_path), 'symptoms', 'id')
+    assert ids == [1, 2, None, None, 5]
+    assert texts == ['headache', 'headache', None, None, 'chest pain']
+    assert infos == [{'severity': 9}, None, None, None, None]
+    assert errors[0] is None and errors[4] is None
+    assert errors[1].startswith('additional_info ignored')
+    assert errors[2] == 'Line 3 is not a JSON object'
+
+
+def test_bad_rows_do_not_stop_the_run(tmp_path):
+    output = tmp_path / 'scored.jsonl'
+    rows = score_file(write_input(tmp_path), str(output), id_column='id', chunk_size=2, workers=1, progress=None)
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert rows == len(ROWS) == len(records)
+    assert [record['row'] for record in records] == list(range(len(ROWS)))
+    assert 'error' not in records[0] and records[0]['medicines']
+    assert records[1]['error'].startswith('additional_info ignored') and records[1]['medicines']
+    assert set(records[3]) == {'row', 'id', 'error'}
+    assert records[4]['is_critical']
@@ -0,0 +1,80 @@
+import pytest
+
+from contraindications import ContraindicationEngine
+
+
+def names(recommender, result):
+    return [recommender.medicines[i].name for i in result.medicine_ids]
+
+
+def test_brand_names_resolve_to_ingredients(recommender):
+    engine = recommender._state.contraindications
+    found = engine.parse_ingredients('Coumadin 5mg, Advil and Tylenol')
+    assert [engine.ingredients[i] for i in found] == ['warfarin', 'ibuprofen', 'paracetamol']
+
+
+@pytest.mark.parametrize('medications', ['warfarin', 'Coumadin 5mg daily', 'eliquis', 'zoloft 50mg'])
+def test_nsaids_and_aspirin_are_removed_for_interacting_medications(recommender, medications):
+    result = recommender.recommend('headache', {'medications': medications})
+    assert names(recommender, result) == ['Paracetamol (Acetaminophen)']
+    assert 'contraindications_removed' in result.flags
+
+
+@pytest.mark.parametrize('condition, removed', [
+    ('Asthma', {'Aspirin'}),
+    ('Allergies', {'Aspirin'}),
+    ('heart disease', {'Ibuprofen'}),
+    ('Kidney Disease', {'Ibuprofen', 'Aspirin'}),
+])
+def test_patient_conditions_rule_out_medicines(recommender, condition, removed):
+    before = set(names(recommender, recommender.recommend('headache')))
+    result = recommender.recommend('headache', {'conditions': [condition]})
+    assert set(names(recommender, result)) == before - removed
+    assert 'contraindications_removed' in result.flags
+
+
+def test_decongestant_is_removed_for_high_blood_pressure(recommender):
+    assert 'Pseudoephedrine' in names(recommender, recommender.recommend('runny nose'))
+    result = recommender.recommend('runny nose', {'conditions': ['High Blood Pressure']})
+    assert 'Pseudoephedrine' not in names(recommender, result)
+
+
+def test_same_ingredient_is_not_recommended_twice(recommender):
+    result = recommender.recommend('headache', {'medications': 'I already took panadol'})
+    assert 'Paracetamol (Acetaminophen)' not in names(recommender, result)
+
+
+def test_unrelated_answers_remove_nothing(recommender):
+    result = recommender.recommend('headache', {'conditions': ['None', 'Diabetes'], 'medications': 'metformin'})
+    assert result == recommender.recommend('headache')
+    assert not result.flags
+
+
+@pytest.mark.parametrize('severity, prioritised', [(9, True), (8, True), (7, False), (3, False)])
+def test_severe_symptoms_prioritise_ibuprofen(recommender, severity, prioritised):
+    result = recommender.recommend('headache', {'severity': severity})
+    priority_names = {recommender.medicines[i].name for i in result.priority_ids}
+    assert priority_names == ({'Ibuprofen'} if prioritised else set())
+
+
+def test_removed_medicines_are_not_prioritised(recommender):
+    result = recommender.recommend('headache', {'severity': 9, 'medications': 'warfarin'})
+    assert not result.priority_ids
+
+
+def test_long_duration_is_flagged(recommender):
+    assert 'long_duration' in recommender.recommend('headache', {'duration': 'More than a week'}).flags
+    assert 'long_duration' not in recommender.recommend('headache', {'duration': '1-3 days'}).flags
+
+
+def test_critical_results_ignore_additional_info(recommender):
+    info = {'severity': 9, 'medications': 'warfarin', 'duration': 'More than a week'}
+    assert recommender.recommend('chest pain', info) == recommender.recommend('chest pain')
+
+
+def test_engine_refine_keeps_display_order(recommender):
+    engine = ContraindicationEngine(recommender.medicines)
+    ids, priority_ids, flags = engine.refine([2, 1, 0], {'conditions': ['asthma'], 'severity': 'high'})
+    assert ids == [1, 0]
+    assert priority_ids == frozenset()
+    assert flags == frozenset({'contraindications_removed'})
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from benchmarks.import_time import DEFAULT_BUDGETS_MS, check_artifact_load, check_module
+from model import MedicineRecommender
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module, budget_ms', sorted(DEFAULT_BUDGETS_MS.items()))
+def test_serving_modules_import_within_budget(module, budget_ms):
+    report = check_module(module, budget_ms, REPO_DIR)
+    assert report['forbidden_modules'] == []
+    assert report['import_ms'] <= budget_ms, report
+
+
+def test_loading_an_artifact_does_not_import_fit_dependencies(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    MedicineRecommender().save(path)
+    assert check_artifact_load(path, REPO_DIR)['forbidden_modules'] == []
@@ -0,0 +1,79 @@
+from instrumentation import STAGES, Instrumentation
+from model import MedicineRecommender
+
+TEXTS = ['headache and fever', 'runny nose', 'chest pain', 'nothing that matches at all']
+
+
+def counters(instrumentation):
+    return (
+        instrumentation.requests,
+        instrumentation.no_match,
+        dict(instrumentation.critical_hits),
+        dict(instrumentation.condition_matches)
+    )
+
+
+def test_cache_hits_are_counted_as_requests():
+    instrumentation = Instrumentation()
+    recommender = MedicineRecommender(cache_size=16, instrumentation=instrumentation)
+    for _ in range(3):
+        recommender.recommend('headache and fever')
+    recommender.recommend('chest pain')
+    recommender.recommend('chest pain')
+
+    assert instrumentation.requests == 5
+    assert instrumentation.cache_hits == 3
+    assert sum(instrumentation.critical_hits.values()) == 2
+    assert instrumentation.condition_match_rates() == {
+        name: count / 5 for name, count in instrumentation.condition_matches.items()
+    }
+    assert 'medicine_recommender_cache_hits_total 3' in instrumentation.to_prometheus()
+
+
+def test_match_counts_do_not_depend_on_the_cache():
+    uncached, cached = Instrumentation(), Instrumentation()
+    for instrumentation, cache_size in ((uncached, 0), (cached, 16)):
+        recommender = MedicineRecommender(cache_size=cache_size, instrumentation=instrumentation)
+        for text in TEXTS + TEXTS:
+            recommender.recommend(text)
+    assert counters(cached) == counters(uncached)
+    assert uncached.cache_hits == 0
+    assert cached.cache_hits == len(TEXTS)
+
+
+def test_batch_scoring_counts_like_single_calls():
+    single, batch = Instrumentation(), Instrumentation()
+    MedicineRecommender(instrumentation=batch).recommend_many(TEXTS, chunk_size=3)
+    recommender = MedicineRecommender(instrumentation=single)
+    for text in TEXTS:
+        recommender.recommend(text)
+    assert counters(batch) == counters(single)
+
+
+def test_batch_scoring_times_every_stage_per_request():
+    instrumentation = Instrumentation()
+    MedicineRecommender(instrumentation=instrumentation).recommend_many(TEXTS)
+    histograms = instrumentation.stage_seconds
+    assert histograms['normalise'].count == histograms['critical'].count == len(TEXTS)
+    # The critical text stops before the vectorizer
+    for stage in STAGES[2:]:
+        assert histograms[stage].count == len(TEXTS) - 1, stage
+
+
+def test_explained_results_are_counted():
+    instrumentation = Instrumentation()
+    recommender = MedicineRecommender(instrumentation=instrumentation)
+    recommender.recommend('chest pain', explain=True)
+    recommender.recommend('runny nose', explain=True)
+    assert instrumentation.requests == 2
+    assert sum(instrumentation.critical_hits.values()) == 1
+    assert instrumentation.condition_matches
+
+
+def test_instrumented_results_equal_plain_results(recommender):
+    instrumented = MedicineRecommender(instrumentation=Instrumentation())
+    info = {'severity': 9, 'medications': 'warfarin'}
+    for text in TEXTS:
+        assert instrumented.recommend(text, info) == recommender.recommend(text, info)
+        assert instrumented.recommend(text, explain=True) == recommender.recommend(text, explain=True)
+    assert instrumented.recommend_many(TEXTS) == recommender.recommend_many(TEXTS)
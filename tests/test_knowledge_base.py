@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from knowledge_base import (_connect_read_only, build_knowledge_base, compute_content_hash, load_knowledge_base,
+                            main, read_content_hash)
+from model import MedicineRecommender, load_recommender
+
+
+@pytest.fixture(scope='module')
+def knowledge_base(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('kb') / 'knowledge_base.sqlite')
+    main(['build', path])
+    return path
+
+
+def test_build_writes_the_built_in_catalogue(knowledge_base):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    assert load_knowledge_base(knowledge_base) == symptom_db
+    assert read_content_hash(knowledge_base) == compute_content_hash(symptom_db)
+
+
+def test_identical_medicine_records_are_stored_once(tmp_path):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    symptom_db[1]['medicines'] = symptom_db[1]['medicines'] + [dict(symptom_db[0]['medicines'][0])]
+    path = str(tmp_path / 'shared.sqlite')
+    build_knowledge_base(symptom_db, path)
+
+    loaded = load_knowledge_base(path)
+    assert loaded == symptom_db
+    assert loaded[1]['medicines'][-1] is loaded[0]['medicines'][0]
+    conn = _connect_read_only(path)
+    try:
+        stored = conn.execute("SELECT COUNT(*) FROM medicines").fetchone()[0]
+    finally:
+        conn.close()
+    assert stored == sum(len(condition['medicines']) for condition in symptom_db) - 1
+
+
+def test_load_recommender_uses_the_knowledge_base(knowledge_base, recommender, sample_queries):
+    loaded = load_recommender(knowledge_base_path=knowledge_base)
+    assert loaded.symptom_db == recommender.symptom_db
+    assert loaded.knowledge_base_hash == read_content_hash(knowledge_base)
+    for text in sample_queries:
+        assert loaded.recommend(text) == recommender.recommend(text), text
+
+
+def test_fitted_artifact_loads_against_its_knowledge_base(knowledge_base, tmp_path):
+    artifact = str(tmp_path / 'model.pkl')
+    main(['fit', artifact, '--knowledge-base', knowledge_base])
+    loaded = load_recommender(artifact, knowledge_base_path=knowledge_base)
+    assert loaded.knowledge_base_hash == read_content_hash(knowledge_base)
+
+
+def test_knowledge_base_is_opened_read_only(knowledge_base):
+    conn = _connect_read_only(knowledge_base)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM medicines")
+    finally:
+        conn.close()
+    assert read_content_hash(knowledge_base) == compute_content_hash(MedicineRecommender._create_symptom_database())
+
+
+def test_changed_catalogue_changes_the_hash(tmp_path):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    symptom_db[1]['recommendation'] = 'Rest.'
+    path = str(tmp_path / 'changed.sqlite')
+    build_knowledge_base(symptom_db, path)
+    assert load_knowledge_base(path) == symptom_db
+    assert read_content_hash(path) != compute_content_hash(MedicineRecommender._create_symptom_database())
+
+
+def test_missing_or_foreign_files_are_refused(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_knowledge_base(str(tmp_path / 'missing.sqlite'))
+
+    path = str(tmp_path / 'old.sqlite')
+    conn = sqlite3.connect(path)
+    conn.executescript("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+                       "INSERT INTO meta VALUES ('schema_version', '0');")
+    conn.close()
+    with pytest.raises(ValueError, match='schema'):
+        load_knowledge_base(path)
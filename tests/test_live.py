@@ -0,0 +1,45 @@
+from live import LiveSession
+from model import MedicineRecommender
+
+
+def test_live_session_matches_recommend_while_typing(recommender, sample_queries):
+    for text in sample_queries:
+        session = LiveSession(recommender)
+        for end in range(1, len(text) + 1):
+            suggestions = session.set_text(text[:end])
+            explanation = recommender.recommend(text[:end], explain=True).explanation
+            assert suggestions.critical_condition == explanation.critical_condition, text[:end]
+            if explanation.critical_condition is None:
+                assert [m.condition_id for m in suggestions.matches] == \
+                    [m.condition_id for m in explanation.matches], text[:end]
+        assert session.recommend() == recommender.recommend(text)
+
+
+def test_edits_in_the_middle_match_recommend(recommender):
+    session = LiveSession(recommender)
+    session.set_text('runny nose and a cough')
+    suggestions = session.edit(6, 10, 'chest pain')
+    assert session.text == 'runny chest pain and a cough'
+    assert suggestions.critical_condition == 'Chest Pain'
+    suggestions = session.edit(6, 16, 'nose')
+    assert suggestions.critical_condition is None
+    assert session.recommend() == recommender.recommend('runny nose and a cough')
+
+
+def test_live_session_follows_knowledge_base_updates():
+    recommender = MedicineRecommender()
+    session = LiveSession(recommender)
+    assert session.set_text('runny nose').matches
+    recommender.remove_condition(3)
+    assert session.set_text('runny nose').matches == recommender.recommend('runny nose', explain=True).explanation.matches
+
+
+def test_temperature_readings_are_left_out_while_typing(recommender):
+    session = LiveSession(recommender)
+    for text in ('103F headache', '103 headache', '103F headache'):
+        for end in range(1, len(text) + 1):
+            suggestions = session.set_text(text[:end])
+        expected = recommender.recommend(text, explain=True).explanation.matches
+        assert [(m.condition_id, round(m.score, 6)) for m in suggestions.matches] == \
+            [(m.condition_id, round(m.score, 6)) for m in expected], text
+    assert [m.condition_id for m in suggestions.matches] == [1]
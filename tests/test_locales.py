@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pytest
+
+from locales import UnknownLocaleError, load_locale_pack
+from model import MedicineRecommender
+
+
+def test_spanish_symptoms_match_spanish_keywords(recommender):
+    result = recommender.recommend('me duele la cabeza', locale='es')
+    assert result.recommendation.startswith('Para el dolor de cabeza')
+    assert result.medicine_ids == recommender.recommend('headache').medicine_ids
+
+
+def test_english_emergency_keywords_stay_critical_in_every_locale(recommender, critical_keywords):
+    missed = [keyword for _, keyword in critical_keywords if not recommender.recommend(keyword, locale='es').is_critical]
+    assert missed == []
+
+
+def test_localised_emergency_keywords_are_critical(recommender):
+    assert recommender.recommend('dolor en el pecho', locale='es').is_critical
+
+
+def test_no_match_reply_comes_from_the_pack(recommender):
+    pack = load_locale_pack('es')
+    assert recommender.recommend('xyz qwe', locale='es').recommendation == pack['no_match']
+    assert recommender.recommend('xyz qwe').recommendation.startswith("I couldn't identify")
+
+
+@pytest.mark.parametrize('locale', ['fr', '../es', 'es/../es', ''])
+def test_unknown_locales_are_refused(recommender, locale):
+    with pytest.raises(UnknownLocaleError):
+        recommender.recommend('headache', locale=locale)
+
+
+def test_least_recently_used_locale_is_dropped(tmp_path):
+    for locale in ('es', 'es-MX', 'pt'):
+        shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'locales', 'es.json'), tmp_path / f"{locale}.json")
+    recommender = MedicineRecommender(locale_dir=str(tmp_path), max_locales=2)
+    for locale in ('es', 'es-MX', 'pt'):
+        recommender.recommend('fiebre', locale=locale)
+    assert recommender.loaded_locales() == ['es-MX', 'pt']
+
+
+def test_knowledge_base_updates_refit_locales():
+    recommender = MedicineRecommender()
+    assert not recommender.recommend('me duele la cabeza', locale='es').is_critical
+    headache = dict(recommender._condition(1), is_critical=True)
+    recommender.update_condition(headache)
+    assert recommender.loaded_locales() == []
+    assert recommender.recommend('me duele la cabeza', locale='es').is_critical
@@ -0,0 +1,95 @@
+import pytest
+
+from model import MedicineRecommender
+from result_cache import RecommendationCache, make_cache_key
+
+MOTION_SICKNESS = {
+    'id': 12,
+    'condition': 'Motion Sickness',
+    'keywords': ['motion sickness', 'car sick', 'seasick'],
+    'medicines': [{
+        'name': 'Dimenhydrinate',
+        'dosage': '50mg every 4-6 hours as needed',
+        'description': 'Antiemetic for nausea and motion sickness',
+        'url': 'https://example.com/dimenhydrinate'
+    }],
+    'recommendation': 'For motion sickness, look at the horizon and take breaks from travel.',
+    'is_critical': False
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_ignore_case_whitespace_and_info_order():
+    assert make_cache_key('  Runny   NOSE ') == make_cache_key('runny nose', {})
+    assert make_cache_key('headache', {'severity': 9, 'duration': '1-3 days'}) == \
+        make_cache_key('headache', {'duration': '1-3 days', 'severity': 9})
+    assert make_cache_key('headache', {'severity': 9}) != make_cache_key('headache', {'severity': 3})
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = RecommendationCache(max_size=4, ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.stats() == {'size': 0, 'max_size': 4, 'hits': 1, 'misses': 1, 'evictions': 1}
+
+
+def test_entries_without_a_ttl_never_expire():
+    clock = FakeClock()
+    cache = RecommendationCache(max_size=4, clock=clock)
+    cache.put('a', 1)
+    clock.now = 1e9
+    assert cache.get('a') == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RecommendationCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+    assert len(cache) == 2
+
+
+def test_puts_from_before_a_clear_are_dropped():
+    cache = RecommendationCache(max_size=4)
+    generation = cache.generation
+    cache.clear()
+    assert cache.generation == generation + 1
+    cache.put('a', 1, generation)
+    assert cache.get('a') is None
+    cache.put('a', 1, cache.generation)
+    assert cache.get('a') == 1
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        RecommendationCache(max_size=0)
+
+
+def test_adding_a_condition_invalidates_cached_results():
+    recommender = MedicineRecommender(cache_size=16)
+    before = recommender.recommend('seasick and car sick')
+    assert recommender.recommend('seasick and car sick') is before
+    generation = recommender.cache.generation
+
+    recommender.add_condition(MOTION_SICKNESS)
+    after = recommender.recommend('seasick and car sick')
+    assert recommender.cache.generation == generation + 1
+    assert after != before
+    assert [medicine.name for medicine in after.medicines] == ['Dimenhydrinate']
+    assert recommender.cache.stats()['hits'] == 1
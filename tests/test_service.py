@@ -0,0 +1,58 @@
+import io
+import json
+
+import pytest
+
+from service import RecommendationService
+
+
+@pytest.fixture(scope='module')
+def service(recommender):
+    return RecommendationService(recommender)
+
+
+def post(service, path, body):
+    payload = json.dumps(body).encode('utf-8')
+    response = {}
+
+    def start_response(status, headers):
+        response['status'] = status
+
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': path,
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload)
+    }
+    content = b''.join(service(environ, start_response))
+    return response['status'], json.loads(content)
+
+
+def test_recommend(service):
+    status, body = post(service, '/recommend', {'symptoms': 'headache', 'additional_info': {'severity': 9}})
+    assert status == '200 OK'
+    assert body['medicines']
+
+
+@pytest.mark.parametrize('additional_info, field', [
+    ('severe', 'additional_info'),
+    ({'severity': '9'}, 'severity'),
+    ({'severity': True}, 'severity'),
+    ({'conditions': 'asthma'}, 'conditions'),
+    ({'conditions': ['asthma', 3]}, 'conditions'),
+    ({'medications': ['warfarin']}, 'medications'),
+    ({'duration': 7}, 'duration'),
+])
+def test_bad_additional_info_is_a_client_error(service, additional_info, field):
+    for path, body in (
+        ('/recommend', {'symptoms': 'headache', 'additional_info': additional_info}),
+        ('/recommend/batch', {'items': [{'symptoms': 'headache', 'additional_info': additional_info}]}),
+    ):
+        status, response = post(service, path, body)
+        assert status == '400 Bad Request'
+        assert f"'{field}'" in response['error']
+
+
+def test_unknown_locale_is_a_client_error(service):
+    status, _ = post(service, '/recommend', {'symptoms': 'headache', 'locale': 'xx'})
+    assert status == '400 Bad Request'
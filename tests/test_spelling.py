@@ -0,0 +1,106 @@
+import pytest
+
+from model import MedicineRecommender
+from spelling import SpellingCorrector, edit_distance, inflection_stems
+
+TYPOS = [
+    ('hedache', 'headache'),
+    ('headahce', 'headache'),
+    ('feaver', 'fever'),
+    ('siezure', 'seizure'),
+    ('unconcious', 'unconscious'),
+    ('fanted', 'fainted'),
+    ('pian', 'pain'),
+    ('cheast', 'chest'),
+    ('throot', 'throat'),
+    ('stomache', 'stomach'),
+    ('runy', 'runny'),
+    ('sneezng', 'sneezing'),
+]
+
+# Correctly spelt words that are close to keyword words, with the text they appeared in
+REAL_WORDS = [
+    ('vagina', 'my vagina is itchy'),
+    ('painted', 'i painted my room and have a headache'),
+    ('wife', 'my wife has a headache'),
+    ('lie', 'i lie down with a headache'),
+    ('live', 'i live with a headache'),
+    ('chess', 'chess pain from losing'),
+    ('cheat', 'cheat pain'),
+    ('deck', 'stiff deck'),
+    ('nick', 'stiff nick'),
+    ('pleasure', 'chest pleasure'),
+    ('forever', 'very high forever'),
+    ('fewer', 'very high fewer'),
+    ('worse', 'worse headache'),
+    ('hand', 'hand pain'),
+    ('hear', 'hear pain'),
+    ('hears', 'he hears ringing'),
+    ('hears', 'my son hears voices'),
+    ('responsible', 'not responsible'),
+    ('leisure', 'leisure time'),
+]
+
+
+@pytest.mark.parametrize('typo, expected', TYPOS)
+def test_typos_are_corrected(recommender, typo, expected):
+    assert recommender._state.spelling.correct_word(typo) == expected
+
+
+@pytest.mark.parametrize('word, text', REAL_WORDS)
+def test_real_words_are_not_corrected(recommender, word, text):
+    assert recommender._state.spelling.correct_word(word) == word
+    assert not recommender.recommend(text).is_critical
+
+
+@pytest.mark.parametrize('word, stem', [
+    ('hears', 'hear'), ('aching', 'ache'), ('stopped', 'stop'), ('worries', 'worry'), ('lifted', 'lift')
+])
+def test_inflection_stems(word, stem):
+    assert stem in inflection_stems(word)
+
+
+def test_inflected_lexicon_words_are_left_alone():
+    corrector = SpellingCorrector({'heart': 1}, lexicon=frozenset({'hear'}), critical_words={'heart'})
+    assert corrector.correct_word('hears') == 'hears'
+    assert corrector.correct_word('heard') == 'heard'
+    # Not an inflection of a lexicon word, so still a typo
+    assert corrector.correct_word('haert') == 'heart'
+
+
+def test_misspelt_emergencies_still_fire(recommender):
+    for text in ('chest pian', 'i fanted twice', 'had a siezure', 'worst hedache of my life'):
+        assert recommender.recommend(text).is_critical, text
+
+
+def test_stop_words_are_never_a_correction():
+    corrector = SpellingCorrector({'and': 5, 'hands': 1}, ignore={'and'})
+    assert corrector.correct_word('anf') == 'anf'
+    assert corrector.correct_word('hand') == 'hands'
+
+
+def test_critical_words_need_one_edit_of_a_long_enough_word():
+    # Without a lexicon only the critical rule keeps real words away from critical keywords
+    corrector = SpellingCorrector.from_conditions(MedicineRecommender._create_symptom_database())
+    assert corrector.correct_word('vagina') == 'vagina'
+    assert corrector.correct_word('pleasure') == 'pleasure'
+    assert corrector.correct_word('lie') == 'lie'
+    assert corrector.correct_word('siezure') == 'seizure'
+
+
+def test_runtime_critical_condition_guards_its_words():
+    recommender = MedicineRecommender()
+    recommender.add_condition({
+        'id': 100,
+        'condition': 'Anaphylaxis',
+        'keywords': ['anaphylaxis', 'throat closing'],
+        'medicines': [],
+        'recommendation': 'Call emergency services now.',
+        'is_critical': True
+    })
+    spelling = recommender._state.spelling
+    assert 'anaphylaxis' in spelling.critical_words
+    assert spelling.correct_word('anaphylaxsis') == 'anaphylaxis'
+    # Two edits away, so it is left alone rather than read as the critical word
+    assert edit_distance('anafylaxis', 'anaphylaxis', 2) == 2
+    assert spelling.correct_word('anafylaxis') == 'anafylaxis'
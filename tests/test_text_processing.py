@@ -0,0 +1,116 @@
+import re
+
+import pytest
+
+from model import MedicineRecommender
+from text_processing import normalise_text, tokenize
+
+TEMPERATURE_READINGS = [
+    '102 degrees', '103 degree', '101 deg', '39°', '39 °', '39° c', '39.5°C', '38,5 degrees celsius',
+    '103F', '103 f', '40 C', 'temp 39°', 'fever of 103 degrees'
+]
+
+
+def baseline_is_critical(text, keywords):
+    """
+    Critical detection as the original recommender did it, one regex per keyword on
+    the lower-cased text
+    """
+    text = text.lower()
+    return any(re.search(r'\b' + re.escape(keyword) + r'\b', text) for keyword in keywords)
+
+
+def baseline_critical_condition(text, symptom_db):
+    """
+    Returns:
+        str: Name of the first critical condition, in catalogue order, with a keyword in the text
+    """
+    for condition in symptom_db:
+        if condition['is_critical'] and baseline_is_critical(text, condition['keywords']):
+            return condition['condition']
+    return None
+
+
+SENTENCES = [
+    '{}', '{}!', 'I think I have {}', '{}, started an hour ago', 'My Mother Reports {}.',
+    'headache and {} since yesterday', '{} and a runny nose', 'no {} but a cough'
+]
+
+# Texts that share words with critical keywords without containing one
+BENIGN_TEXTS = [
+    'my chest feels fine but my back hurts', 'heartburn after dinner', 'mild headache',
+    'headache with fever', 'i feel faint when i stand up', 'breathing is fine, runny nose',
+    'fever of 38', 'high fever', 'a rash on my arm', 'stiff shoulder', 'my heartbeat is normal after a run'
+]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('39.5°C', '39.5'),
+    ('103 F', '103'),
+    ('38,5 degrees c', '38.5'),
+    ('fever 102 degrees fainted twice', 'fever 102 fainted twice'),
+    ('fever of 103 degrees confusion', 'fever of 103 confusion'),
+    ('temp 39° confusion', 'temp 39 confusion'),
+    ('39°confusion', '39 confusion'),
+    ('39.5 °C, then chills', '39.5, then chills'),
+])
+def test_temperature_units_are_stripped_without_joining_words(text, expected):
+    assert normalise_text(text) == expected
+
+
+def test_tokenize_keeps_word_after_bare_degrees():
+    assert tokenize('fever 102 degrees fainted').words == ('fever', '102', 'fainted')
+
+
+@pytest.mark.parametrize('text', ['103F headache', 'headache, 103 f', '39.5°C headache', 'headache 38,5 degrees'])
+def test_temperature_readings_do_not_dilute_the_query(recommender, text):
+    assert tokenize(text).readings
+    assert recommender.recommend(text) == recommender.recommend('headache')
+    assert recommender.recommend_many([text, 'runny nose'])[0] == recommender.recommend('headache')
+
+
+def test_critical_keywords_next_to_temperatures_match_like_baseline(recommender, critical_keywords):
+    keywords = [keyword for _, keyword in critical_keywords]
+    missed = []
+    for _, keyword in critical_keywords:
+        for reading in TEMPERATURE_READINGS:
+            for text in (f"{reading} {keyword}", f"{keyword} {reading}", f"{reading}, {keyword} twice"):
+                if baseline_is_critical(text, keywords) and not recommender.recommend(text).is_critical:
+                    missed.append(text)
+    assert missed == []
+
+
+def test_critical_keywords_in_sentences_match_like_baseline(recommender, critical_keywords):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    mismatches = []
+    for _, keyword in critical_keywords:
+        for sentence in SENTENCES:
+            text = sentence.format(keyword.upper() if sentence.istitle() else keyword)
+            explanation = recommender.recommend(text, explain=True).explanation
+            expected = baseline_critical_condition(text, symptom_db)
+            if explanation.critical_condition != expected:
+                mismatches.append((text, explanation.critical_condition, expected))
+    assert mismatches == []
+
+
+def test_first_critical_condition_in_catalogue_order_wins(recommender, critical_keywords):
+    symptom_db = MedicineRecommender._create_symptom_database()
+    for first_condition, first in critical_keywords:
+        for second_condition, second in critical_keywords:
+            if first_condition == second_condition:
+                continue
+            text = f"{first} and {second}"
+            explanation = recommender.recommend(text, explain=True).explanation
+            assert explanation.critical_condition == baseline_critical_condition(text, symptom_db), text
+
+
+@pytest.mark.parametrize('text', BENIGN_TEXTS)
+def test_text_without_critical_keywords_is_not_critical(recommender, critical_keywords, text):
+    assert not baseline_is_critical(text, [keyword for _, keyword in critical_keywords])
+    assert not recommender.recommend(text).is_critical
+
+
+def test_batch_and_single_critical_detection_agree(recommender, critical_keywords):
+    texts = [sentence.format(keyword) for _, keyword in critical_keywords for sentence in SENTENCES]
+    texts += BENIGN_TEXTS
+    assert recommender.recommend_many(texts, chunk_size=7) == [recommender.recommend(text) for text in texts]
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from threaded_recommender import ThreadedRecommender
+
+
+def test_threaded_recommender_matches_single_threaded(recommender, sample_queries):
+    expected = {text: recommender.recommend(text) for text in sample_queries}
+    errors = []
+    with ThreadedRecommender(recommender, workers=4, max_batch_size=8) as threaded:
+        def worker(offset):
+            try:
+                for i in range(len(sample_queries) * 5):
+                    text = sample_queries[(i + offset) % len(sample_queries)]
+                    if threaded.recommend(text, timeout=10) != expected[text]:
+                        errors.append(text)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert errors == []
+
+
+def test_submit_after_close_raises(recommender):
+    threaded = ThreadedRecommender(recommender)
+    threaded.recommend('headache', timeout=10)
+    threaded.close()
+    with pytest.raises(RuntimeError):
+        threaded.submit('headache')
+
+
+def test_close_resolves_every_caller(recommender, blocking):
+    threaded = ThreadedRecommender(blocking, workers=1, max_batch_size=1, max_wait=0, max_queue_size=2)
+    outcomes = {}
+
+    def caller(i):
+        try:
+            outcomes[i] = threaded.recommend(f"headache {i}", timeout=10)
+        except Exception as exc:
+            outcomes[i] = exc
+
+    # One batch scoring, one held for a worker, two queued and the rest waiting for room
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    assert blocking.started.wait(10)
+    time.sleep(0.05)
+
+    closing = threading.Thread(target=threaded.close)
+    closing.start()
+    time.sleep(0.05)
+    blocking.release.set()
+    closing.join(10)
+    for thread in threads:
+        thread.join(10)
+
+    assert not closing.is_alive()
+    assert sorted(outcomes) == list(range(6))
+    for i, outcome in outcomes.items():
+        if not isinstance(outcome, RuntimeError):
+            assert outcome == recommender.recommend(f"headache {i}")
+    assert threaded.stats()['in_flight'] == 0
+
+
+def test_queries_submitted_while_closing_never_hang(recommender):
+    threaded = ThreadedRecommender(recommender, workers=2, max_batch_size=4, max_queue_size=4)
+    futures = []
+    lock = threading.Lock()
+
+    def submitter(n):
+        i = 0
+        while True:
+            try:
+                future = threaded.submit(f"cough {n} {i}")
+            except RuntimeError:
+                return
+            with lock:
+                futures.append(future)
+            i += 1
+
+    threads = [threading.Thread(target=submitter, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    threaded.close()
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+    assert futures
+    for future in futures:
+        error = future.exception(timeout=10)
+        assert error is None or isinstance(error, RuntimeError)
@@ -0,0 +1,102 @@
+import pytest
+
+from model import MedicineRecommender
+
+NAUSEA = {
+    'id': 11,
+    'condition': 'Nausea',
+    'keywords': ['nausea', 'vomiting', 'feeling sick', 'stomach upset'],
+    'medicines': [{
+        'name': 'Dimenhydrinate',
+        'dosage': '50mg every 4-6 hours as needed',
+        'description': 'Antiemetic for nausea and motion sickness',
+        'url': 'https://example.com/dimenhydrinate'
+    }],
+    'recommendation': 'For nausea, sip clear fluids and eat small, bland meals.',
+    'is_critical': False
+}
+
+
+def test_added_condition_matches_on_terms_the_vectorizer_was_not_fitted_on():
+    for index in ('dense', 'exact', 'inverted'):
+        recommender = MedicineRecommender(index=index)
+        recommender.add_condition(NAUSEA)
+        result = recommender.recommend('nausea and vomiting')
+        assert result.recommendation == NAUSEA['recommendation'], index
+        assert [medicine.name for medicine in result.medicines] == ['Dimenhydrinate']
+        assert recommender.recommend_many(['nausea and vomiting'])[0] == result
+
+
+def test_added_terms_score_close_to_a_refit():
+    recommender = MedicineRecommender(index='exact')
+    recommender.add_condition(NAUSEA)
+    refitted = MedicineRecommender(symptom_db=recommender.symptom_db, index='exact')
+    updated = recommender.recommend('nausea and vomiting', explain=True).explanation.matches
+    expected = refitted.recommend('nausea and vomiting', explain=True).explanation.matches
+    assert [m.condition_id for m in updated] == [m.condition_id for m in expected]
+    assert abs(updated[0].score - expected[0].score) < 0.05
+
+
+def test_removed_condition_no_longer_matches():
+    recommender = MedicineRecommender()
+    assert recommender.recommend('runny nose').medicine_ids
+    recommender.remove_condition(3)
+    assert recommender.recommend('runny nose').medicine_ids == ()
+
+
+def test_cached_results_of_a_replaced_snapshot_are_not_kept():
+    recommender = MedicineRecommender(cache_size=16)
+    compute = recommender._recommend_uncached
+
+    def update_while_computing(*args):
+        # The knowledge base changes after the request read its snapshot
+        result = compute(*args)
+        recommender.remove_condition(3)
+        return result
+
+    recommender._recommend_uncached = update_while_computing
+    assert recommender.recommend('runny nose').medicine_ids
+    del recommender._recommend_uncached
+    assert recommender.recommend('runny nose').medicine_ids == ()
+
+
+def test_cache_is_cleared_by_updates():
+    recommender = MedicineRecommender(cache_size=16)
+    before = recommender.recommend('headache')
+    updated = dict(recommender._condition(1), recommendation='Rest and drink water.')
+    recommender.update_condition(updated)
+    assert recommender.recommend('headache').recommendation != before.recommendation
+
+
+def test_medicine_ids_survive_a_refit():
+    recommender = MedicineRecommender(refit_threshold=0)
+    before = recommender.recommend('runny nose')
+    fitted = recommender._state
+    recommender.remove_condition(1)
+    assert recommender._state.fitted_conditions == len(recommender.symptom_db)
+    after = recommender.recommend('runny nose')
+    assert recommender._state.query_vectorizer is not fitted.query_vectorizer
+    assert after.medicine_ids == before.medicine_ids
+    assert after.medicines == before.medicines
+
+
+def test_removed_medicines_are_tombstoned_and_their_ids_never_reused():
+    recommender = MedicineRecommender()
+    headache_ids = recommender._state.condition_medicine_ids[1]
+    recommender.remove_condition(1)
+    assert all(recommender.medicines[i] is None for i in headache_ids)
+    with pytest.raises(KeyError):
+        recommender.update_medicine(headache_ids[0], dosage='1 tablet')
+
+    recommender.add_condition(dict(NAUSEA, medicines=recommender._condition(2)['medicines'] + NAUSEA['medicines']))
+    added = recommender._state.condition_medicine_ids[NAUSEA['id']]
+    assert added[:-1] == recommender._state.condition_medicine_ids[2]
+    assert added[-1] == len(recommender.medicines) - 1 > max(headache_ids)
+
+
+def test_updated_medicine_gets_a_new_id_and_the_old_one_is_tombstoned():
+    recommender = MedicineRecommender()
+    old = recommender.recommend('runny nose').medicines[0]
+    medicine = recommender.update_medicine(old.id, dosage='1 tablet')
+    assert medicine.id != old.id and recommender.medicines[old.id] is None
+    assert recommender.recommend('runny nose').medicines[0] == medicine
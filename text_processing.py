@@ -0,0 +1,257 @@
+"""
+Text front-end shared by every matching stage of MedicineRecommender.
+
+A request's symptom text is normalised and split into words exactly once.
+Critical keyword detection walks those words and similarity scoring builds
+its TF-IDF vector from them with plain dictionary lookups against the fitted
+vocabulary, so neither stage rescans the raw text.
+
+Normalisation case folds Unicode text and strips temperature units, so
+"39.5°C", "39.5 C" and "103F" read as "39.5" and "103" like the High Fever
+keywords do. Those readings only serve critical keyword detection: they are
+left out of the TF-IDF query, where they would dilute the symptom words.
+"""
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+from scipy import sparse
+
+_WORD = re.compile(r'\w+')
+
+# A temperature reading followed by a degree sign and/or a unit, e.g. 39.5°C, 103 F, 38,5 degrees.
+# Whitespace after the degree sign is only consumed together with a unit, so the word
+# after a bare "103 degrees" stays a separate word
+_TEMPERATURE = re.compile(
+    r'\b(\d+(?:[.,]\d+)?)\s*'
+    r'(?:(?:°|\bdegrees?\b|\bdeg\b)(?:\s*(?:c|f|celsius|fahrenheit)\b)?|(?:c|f|celsius|fahrenheit)\b)'
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TokenizedText:
+    # Normalised words, every run of word characters
+    words: tuple
+    # What separates each word from the previous one: ' ' for any whitespace,
+    # else the punctuation itself. The first entry is always ''
+    separators: tuple
+    # Positions of the words that are part of a temperature reading
+    readings: frozenset = frozenset()
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class TermVector:
+    """
+    A single sparse TF-IDF vector; condition indexes read its indices and data
+    directly, like those of a one-row CSR matrix
+    """
+    indices: np.ndarray
+    data: np.ndarray
+    n_features: int
+
+    def tocsr(self):
+        return sparse.csr_matrix(
+            (self.data, self.indices, np.array([0, len(self.indices)], dtype=np.int32)),
+            shape=(1, self.n_features)
+        )
+
+
+def _strip_unit(match):
+    reading = match.group(1).replace(',', '.')
+    # A bare degree sign can run straight into the next word, as in "39°confusion"
+    following = match.string[match.end():match.end() + 1]
+    if following.isalnum() or following == '_':
+        return reading + ' '
+    return reading
+
+
+def _normalise(text):
+    """
+    Returns:
+        tuple: (normalised text, set of offsets in it covered by a temperature reading)
+    """
+    # Plain ASCII is already in normal form, which saves the Unicode pass for most requests
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text)
+    text = text.casefold()
+    pieces = []
+    readings = set()
+    end = length = 0
+    for match in _TEMPERATURE.finditer(text):
+        pieces.append(text[end:match.start()])
+        length += match.start() - end
+        reading = _strip_unit(match)
+        readings.update(range(length, length + len(match.group(1))))
+        pieces.append(reading)
+        length += len(reading)
+        end = match.end()
+    if not pieces:
+        return text, readings
+    pieces.append(text[end:])
+    return ''.join(pieces), readings
+
+
+def normalise_text(text):
+    """
+    Case fold symptom text and strip temperature units
+
+    Args:
+        text (str): Raw symptom text
+
+    Returns:
+        str: Normalised text
+    """
+    return _normalise(text)[0]
+
+
+def tokenize(text):
+    """
+    Normalise text and split it into words, in a single scan
+
+    Returns:
+        TokenizedText: Words and the separators between them
+    """
+    text, reading_offsets = _normalise(text)
+    words = []
+    separators = []
+    readings = []
+    end = None
+    for match in _WORD.finditer(text):
+        start = match.start()
+        if start in reading_offsets:
+            readings.append(len(words))
+        if end is None:
+            separators.append('')
+        else:
+            gap = text[end:start].strip()
+            separators.append(gap or ' ')
+        words.append(match.group())
+        end = match.end()
+    return TokenizedText(tuple(words), tuple(separators), frozenset(readings))
+
+
+class QueryVectorizer:
+    """
+    Builds TF-IDF vectors from tokenized text with the statistics of a fitted
+    TfidfVectorizer, producing the same vectors as its transform()
+    """
+    def __init__(self, vectorizer):
+        """
+        Args:
+            vectorizer (TfidfVectorizer): Fitted with normalise_text as its preprocessor
+        """
+        self.vocabulary = vectorizer.vocabulary_
+        self.stop_words = frozenset(vectorizer.get_stop_words() or ())
+        self.ngram_range = vectorizer.ngram_range
+        self.idf = vectorizer.idf_.tolist()
+        self.n_features = len(self.idf)
+
+    def with_terms(self, document_frequencies):
+        """
+        Build a vectorizer that also counts new terms, e.g. of keywords added at runtime;
+        the fitted terms keep their ids and IDF, and this one is left untouched
+
+        Args:
+            document_frequencies (dict): New term to the number of new keywords using it
+
+        Returns:
+            QueryVectorizer: Vectorizer with the new terms appended to the vocabulary
+        """
+        vectorizer = QueryVectorizer.__new__(QueryVectorizer)
+        vectorizer.__dict__.update(self.__dict__)
+        vectorizer.__dict__.pop('feature_names', None)
+        vectorizer.vocabulary = dict(self.vocabulary)
+        vectorizer.idf = list(self.idf)
+
+        # The smoothed IDF ln((1 + n) / (1 + df)) + 1 of a term in df of the n fitted keywords
+        # peaks at df = 1, so the new terms get about the IDF a refit would give them
+        peak = max(self.idf, default=1.0) + math.log(2)
+        for term, frequency in sorted(document_frequencies.items()):
+            vectorizer.vocabulary[term] = len(vectorizer.idf)
+            vectorizer.idf.append(peak - math.log(1 + frequency))
+        vectorizer.n_features = len(vectorizer.idf)
+        return vectorizer
+
+    @cached_property
+    def feature_names(self):
+        """
+        Returns:
+            list: N-gram of every feature id, built on first use for explanations
+        """
+        names = [None] * self.n_features
+        for feature, index in self.vocabulary.items():
+            names[index] = feature
+        return names
+
+    def features(self, words):
+        """
+        Turn words into the n-grams the vectorizer counts
+
+        Returns:
+            list: Unigrams and n-grams, stop words and single characters removed
+        """
+        # TfidfVectorizer's default token pattern only keeps words of two or more characters
+        tokens = [w for w in words if len(w) > 1 and w not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        features = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            features.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return features
+
+    def _weights(self, tokenized):
+        """
+        Returns:
+            tuple: (sorted feature ids, L2-normalised TF-IDF weights) as lists
+        """
+        words = tokenized.words
+        if tokenized.readings:
+            words = [word for i, word in enumerate(words) if i not in tokenized.readings]
+        vocabulary = self.vocabulary
+        counts = {}
+        for feature in self.features(words):
+            index = vocabulary.get(feature)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+
+        row = sorted(counts)
+        idf = self.idf
+        weights = [counts[index] * idf[index] for index in row]
+        norm = math.sqrt(sum(w * w for w in weights))
+        return row, [w / norm for w in weights]
+
+    def vectorize(self, tokenized):
+        """
+        Vectorise a single text without building a scipy matrix
+
+        Returns:
+            TermVector: L2-normalised TF-IDF weights of the text
+        """
+        row, weights = self._weights(tokenized)
+        return TermVector(np.array(row, dtype=np.int32), np.array(weights, dtype=np.float64), self.n_features)
+
+    def transform(self, tokenized_texts):
+        """
+        Vectorise tokenized texts
+
+        Args:
+            tokenized_texts (list): TokenizedText per row
+
+        Returns:
+            scipy.sparse.csr_matrix: L2-normalised TF-IDF rows
+        """
+        indptr = [0]
+        indices = []
+        data = []
+        for tokenized in tokenized_texts:
+            row, weights = self._weights(tokenized)
+            indices.extend(row)
+            data.extend(weights)
+            indptr.append(len(indices))
+
+        return sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(tokenized_texts), self.n_features)
+        )
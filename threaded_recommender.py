@@ -0,0 +1,200 @@
+"""
+Thread-pool front-end for one shared MedicineRecommender.
+
+MedicineRecommender is safe to share between threads: requests read one
+immutable ModelState snapshot, results are frozen, and knowledge base
+updates publish a new snapshot instead of editing the current one. So a
+single process can serve many threads from one copy of the model instead of
+one process per core.
+
+ThreadedRecommender gathers the recommend() calls that arrive from many
+threads within a few milliseconds into batches, and scores each batch with
+recommend_many() on a pool of worker threads. Batching amortises the sparse
+transform, the similarity product and the top-k selection over the batch.
+Tokenizing, spelling correction, critical matching and building the results
+are pure Python and hold the GIL, so workers mostly take turns rather than
+run in parallel; only the NumPy/SciPy calls can overlap. Identical in-flight
+queries are computed once, see batching.py. benchmarks/thread_stress.py
+reports the throughput of each serving mode next to plain recommend().
+
+    with ThreadedRecommender(recommender, workers=4) as pool:
+        result = pool.recommend("headache and fever")
+
+benchmarks/thread_stress.py hammers one instance from many threads and
+checks that every result is the same as a single-threaded run.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from batching import InFlightQueries
+
+
+class ThreadedRecommender:
+    def __init__(self, recommender, workers=4, max_batch_size=64, max_wait=0.002, max_queue_size=1024):
+        """
+        Args:
+            recommender (MedicineRecommender): Shared recommender doing the scoring
+            workers (int): Number of batches that may be scored at the same time
+            max_batch_size (int): Maximum number of queries scored together
+            max_wait (float): Seconds to wait for more queries after the first one of a batch arrives
+            max_queue_size (int): Maximum number of queued queries before callers are held back
+        """
+        if workers < 1 or max_batch_size < 1 or max_queue_size < 1:
+            raise ValueError("workers, max_batch_size and max_queue_size must be positive")
+        self.recommender = recommender
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        # The queue itself is unbounded so that items are only ever put while holding
+        # the lock; queue_slots bounds it, and is released as the batcher takes items
+        self._queue = queue.Queue()
+        self._queue_slots = threading.Semaphore(max_queue_size)
+        self._in_flight = InFlightQueries(recommender, max_batch_size, "ThreadedRecommender was closed")
+        self._lock = threading.Lock()
+        self._batch_slots = threading.BoundedSemaphore(workers)
+        self._executor = None
+        self._batcher = None
+        self._closed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """
+        Start the batching thread and the worker pool
+        """
+        with self._lock:
+            if self._batcher is not None or self._closed:
+                return
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='recommend-batch')
+            self._batcher = threading.Thread(target=self._batch_loop, name='recommend-batcher', daemon=True)
+            self._batcher.start()
+
+    def close(self):
+        """
+        Stop batching after the queued and running batches have finished
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            batcher = self._batcher
+            # Nothing is queued after this, so the sentinel goes behind every query and all
+            # of them are still scored
+            self._queue.put_nowait(None)
+        if batcher is not None:
+            batcher.join()
+            self._executor.shutdown(wait=True)
+
+        # Fail anything the batcher did not score, e.g. when it was never started or
+        # stopped early, rather than leaving callers waiting forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._queue_slots.release()
+                self._in_flight.fail([item])
+        self._in_flight.fail_all()
+
+    def submit(self, symptoms_text, additional_info=None):
+        """
+        Queue a query without waiting for it
+
+        Returns:
+            concurrent.futures.Future: Resolves to the Recommendation
+        """
+        self.start()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ThreadedRecommender was closed")
+            # Coalesce identical queries that are already queued or being scored
+            future, item = self._in_flight.add(symptoms_text, additional_info, Future)
+        if item is None:
+            return future
+
+        # Blocks while the queue is full, pushing back on callers
+        self._queue_slots.acquire()
+        with self._lock:
+            if not self._closed:
+                self._queue.put_nowait(item)
+                return future
+        # Closed while waiting for room, the query would never be scored
+        self._queue_slots.release()
+        self._in_flight.fail([item])
+        return future
+
+    def recommend(self, symptoms_text, additional_info=None, timeout=None):
+        """
+        Analyze symptoms, sharing the work with concurrent and identical requests
+
+        Returns:
+            Recommendation: Same result as MedicineRecommender.recommend()
+        """
+        return self.submit(symptoms_text, additional_info).result(timeout)
+
+    def _get(self, timeout=None):
+        item = self._queue.get(timeout=timeout) if timeout is None or timeout > 0 else self._queue.get_nowait()
+        if item is not None:
+            self._queue_slots.release()
+        return item
+
+    def _batch_loop(self):
+        while True:
+            item = self._get()
+            if item is None:
+                return
+            batch = [item]
+
+            try:
+                # Collect more queries until the batch is full or the wait budget is spent
+                deadline = time.monotonic() + self.max_wait
+                stop = False
+                while len(batch) < self.max_batch_size:
+                    try:
+                        item = self._get(deadline - time.monotonic())
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._batch_slots.acquire()
+                try:
+                    self._executor.submit(self._score_batch, batch)
+                except BaseException:
+                    self._batch_slots.release()
+                    raise
+            except BaseException:
+                # The batch is no longer queued, so close() would not find it
+                self._in_flight.fail(batch)
+                raise
+            if stop:
+                return
+
+    def _score_batch(self, batch):
+        try:
+            try:
+                results = self._in_flight.score(batch)
+            except Exception as e:
+                self._in_flight.fail(batch, e)
+                return
+            self._in_flight.resolve(batch, results)
+        finally:
+            self._batch_slots.release()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Queue depth and batching/coalescing counters
+        """
+        return {'queued': self._queue.qsize(), **self._in_flight.stats()}